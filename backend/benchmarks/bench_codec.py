@@ -0,0 +1,92 @@
+"""
+Snapshot codec benchmark: JSON state vs the binary codec, encode time and
+bytes per snapshot.
+
+Uses the bench_tick scenarios. The JSON path is what a JSON client costs
+today, building the state dicts and json.dumps; the binary path encodes
+straight from the game objects. Run from the backend directory:
+
+    python benchmarks/bench_codec.py [--snapshots 200] [--scenario brawl-50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+from bench_tick import SCENARIOS, build_room, replenish  # noqa: E402
+from game_engine import TICK_INTERVAL, _snapshot_codec  # noqa: E402
+
+
+def encode_json(room) -> bytes:
+    return json.dumps(room._state_message()).encode("utf-8")
+
+
+def encode_binary(room) -> bytes:
+    frame = _snapshot_codec.encode(
+        room.tick, room.players.values(),
+        [m for m in room.missiles if m.alive],
+        [b for b in room.bombardment_zones if not b.exploded],
+        room.spore_clouds,
+        [m for m in room.mutalisks if m.alive],
+        room.effects, room._roster)
+    room.effects.clear()
+    return frame
+
+
+def run_scenario(scenario: dict, snapshots: int) -> dict:
+    room = build_room(scenario, vectorized=False)
+    rng = random.Random(2)
+    samples = {"json": [], "binary": []}
+    sizes = {"json": [], "binary": []}
+    for i in range(snapshots):
+        replenish(room, scenario, rng)
+        room._process_inputs()
+        room._update(TICK_INTERVAL)
+        room.tick += 1
+        # Alternate which codec goes first so neither gets the warm cache
+        order = ("json", "binary") if i % 2 else ("binary", "json")
+        effects = list(room.effects)
+        for name in order:
+            room.effects[:] = effects
+            encode = encode_json if name == "json" else encode_binary
+            start = time.perf_counter()
+            data = encode(room)
+            samples[name].append(time.perf_counter() - start)
+            sizes[name].append(len(data))
+    result = {"scenario": scenario["name"], "players": scenario["players"]}
+    for name in samples:
+        arr = np.asarray(samples[name]) * 1e6
+        result[name] = {
+            "p50_us": round(float(np.percentile(arr, 50)), 1),
+            "p99_us": round(float(np.percentile(arr, 99)), 1),
+            "bytes_p50": int(np.percentile(sizes[name], 50)),
+        }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--snapshots", type=int, default=200)
+    parser.add_argument("--scenario", action="append", help="only run the named scenario(s)")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<16} {'json us':>9} {'binary us':>10} {'speedup':>8} "
+          f"{'json B':>9} {'binary B':>9} {'ratio':>6}")
+    for scenario in SCENARIOS:
+        if args.scenario and scenario["name"] not in args.scenario:
+            continue
+        r = run_scenario(scenario, args.snapshots)
+        j, b = r["json"], r["binary"]
+        print(f"{r['scenario']:<16} {j['p50_us']:>9.1f} {b['p50_us']:>10.1f} {j['p50_us'] / b['p50_us']:>7.1f}x "
+              f"{j['bytes_p50']:>9} {b['bytes_p50']:>9} {j['bytes_p50'] / b['bytes_p50']:>5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
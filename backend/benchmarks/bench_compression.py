@@ -0,0 +1,145 @@
+"""
+Snapshot compression benchmark: CPU per message against bytes on the wire,
+for every compression mode, over the bench_tick scenarios.
+
+Records what two clients of a running room receive, one on full JSON
+states and one on binary frames with interest management (the browser's
+default), then compresses each stream the way compression.py does:
+deflate with context takeover per connection, and zstd with and without
+the trained dictionary. Times are single-threaded compress calls; deflate
+runs once per connection, zstd once per distinct message.
+
+The shipped dictionary is trained from other seeds than the ones
+measured. To retrain it after a protocol change, run from the backend
+directory:
+
+    python benchmarks/bench_compression.py --write-dictionary
+
+and to measure:
+
+    python benchmarks/bench_compression.py [--snapshots 200] [--scenario brawl-50]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import zstandard  # noqa: E402
+
+import compression  # noqa: E402
+from bench_tick import SCENARIOS, build_room, replenish  # noqa: E402
+
+STREAMS = ("json", "binary")
+# Seeds the dictionary is trained on; measurements use seed 1
+TRAINING_SEEDS = (101, 102, 103)
+
+
+class Recorder:
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+
+def record(scenario: dict, snapshots: int, seed: int) -> dict:
+    """The messages each stream's client receives over ``snapshots`` ticks."""
+    async def run():
+        room = build_room(scenario, vectorized=False, seed=seed)
+        recorders = {name: Recorder() for name in STREAMS}
+        room.connections["p0"] = recorders["json"]
+        room.connections["p1"] = recorders["binary"]
+        room.enable_binary("p1")
+        room.enable_interest("p1")
+        rng = random.Random(seed)
+        for _ in range(snapshots):
+            replenish(room, scenario, rng)
+            room._simulate_tick()
+            room._broadcast_state()
+            await room.flush()
+        return {name: [m.encode("utf-8") if isinstance(m, str) else m for m in r.sent]
+                for name, r in recorders.items()}
+
+    return asyncio.run(run())
+
+
+def codecs(dictionary: bytes) -> dict:
+    dict_data = zstandard.ZstdCompressionDict(dictionary)
+
+    def deflate(level):
+        def new():
+            stream = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+            return lambda data: stream.compress(data) + stream.flush(zlib.Z_SYNC_FLUSH)
+        return new
+
+    def zstd(level, with_dict):
+        def new():
+            compressor = zstandard.ZstdCompressor(level=level, dict_data=dict_data if with_dict else None)
+            return compressor.compress
+        return new
+
+    return {
+        "deflate-1": deflate(1),
+        "deflate-6": deflate(compression.DEFLATE_LEVEL),
+        "zstd-3": zstd(compression.ZSTD_LEVEL, False),
+        "zstd-1+dict": zstd(1, True),
+        "zstd-3+dict": zstd(compression.ZSTD_LEVEL, True),
+    }
+
+
+def measure(messages: list, new_codec) -> tuple:
+    compress = new_codec()
+    nbytes = 0
+    start = time.perf_counter()
+    for data in messages:
+        nbytes += len(compress(data))
+    return nbytes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--snapshots", type=int, default=200)
+    parser.add_argument("--scenario", action="append", help="only run the named scenario(s)")
+    parser.add_argument("--write-dictionary", action="store_true",
+                        help=f"train a dictionary and write it to {compression.DICTIONARY_PATH.name}")
+    args = parser.parse_args()
+    scenarios = [s for s in SCENARIOS if not args.scenario or s["name"] in args.scenario]
+
+    if args.write_dictionary:
+        samples = [m for s in scenarios for seed in TRAINING_SEEDS
+                   for stream in record(s, args.snapshots, seed).values() for m in stream]
+        dictionary = compression.train_dictionary(samples)
+        compression.DICTIONARY_PATH.write_bytes(dictionary)
+        print(f"{len(dictionary)} byte dictionary from {len(samples)} messages "
+              f"written to {compression.DICTIONARY_PATH}")
+        return
+
+    dictionary = compression.load_dictionary()
+    if dictionary is None:
+        sys.exit("no dictionary; run with --write-dictionary first")
+    print(f"{'scenario':<16} {'stream':<7} {'codec':<12} {'bytes/msg':>10} {'ratio':>6} "
+          f"{'us/msg':>8} {'MB/s':>7}")
+    for scenario in scenarios:
+        streams = record(scenario, args.snapshots, seed=1)
+        for stream in STREAMS:
+            messages = streams[stream]
+            raw = sum(map(len, messages))
+            print(f"{scenario['name']:<16} {stream:<7} {'none':<12} {raw / len(messages):>10.0f} "
+                  f"{1.0:>6.2f} {'':>8} {'':>7}")
+            for name, new_codec in codecs(dictionary).items():
+                nbytes, elapsed = min((measure(messages, new_codec) for _ in range(3)), key=lambda r: r[1])
+                print(f"{'':<16} {'':<7} {name:<12} {nbytes / len(messages):>10.0f} {raw / nbytes:>6.2f} "
+                      f"{elapsed / len(messages) * 1e6:>8.1f} {raw / elapsed / 1e6:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
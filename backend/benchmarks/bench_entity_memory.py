@@ -0,0 +1,89 @@
+"""
+Per-room memory and allocation comparison for entity records.
+
+Simulates a 10-player room where vanguards fire missile barrages and
+leviathans spawn mutalisks every few ticks (cooldowns are forced to
+zero), then reports live entity counts, bytes held by the
+room's entities and how many entity objects were constructed. Run from
+the backend directory:
+
+    python benchmarks/bench_entity_memory.py
+"""
+
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import game_engine  # noqa: E402
+from game_engine import GameRoom, TICK_INTERVAL  # noqa: E402
+
+TICKS = 300
+CAST_EVERY = 5
+
+
+def count_constructions(cls, counter, key):
+    original = cls.__init__
+
+    def counting_init(self, *args, **kwargs):
+        counter[key] += 1
+        original(self, *args, **kwargs)
+
+    cls.__init__ = counting_init
+    return original
+
+
+def deep_size(obj) -> int:
+    size = sys.getsizeof(obj)
+    if hasattr(obj, "__dict__"):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main():
+    random.seed(1)
+    counter = {"Missile": 0, "Mutalisk": 0}
+    originals = {
+        name: count_constructions(getattr(game_engine, name), counter, name) for name in counter
+    }
+
+    tracemalloc.start()
+    room = GameRoom("bench")
+    room.rng.seed(1)
+    for i in range(10):
+        p = room.add_player(f"p{i}", f"p{i}", None, "vanguard" if i % 2 else "leviathan")
+        p.hull = p.max_hull = 1e12
+    for tick in range(TICKS):
+        for p in room.players.values():
+            if tick % CAST_EVERY:
+                break
+            p.missile_cooldown = 0.0
+            p.mutalisk_cd = 0.0
+            p.energy = p.max_energy
+            room.queue_message(p.id, {"type": "ability", "id": "w" if p.ship_class == "vanguard" else "e"})
+        room._process_inputs()
+        room._update(TICK_INTERVAL)
+        room.effects.clear()
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for name, init in originals.items():
+        getattr(game_engine, name).__init__ = init
+
+    entities = list(room.missiles) + list(room.mutalisks) + list(room.players.values())
+    print(f"ticks simulated           {TICKS}")
+    print(f"live missiles             {len(room.missiles)}")
+    print(f"live mutalisks            {len(room.mutalisks)}")
+    print(f"bytes per player          {deep_size(next(iter(room.players.values())))}")
+    print(f"bytes per missile         {deep_size(next(iter(room.missiles))) if room.missiles else 0}")
+    print(f"bytes per mutalisk        {deep_size(next(iter(room.mutalisks))) if room.mutalisks else 0}")
+    print(f"entity record bytes       {sum(deep_size(e) for e in entities)}")
+    print(f"traced bytes / peak       {traced} / {peak}")
+    print(f"Missile objects built     {counter['Missile']}")
+    print(f"Mutalisk objects built    {counter['Mutalisk']}")
+
+
+if __name__ == "__main__":
+    main()
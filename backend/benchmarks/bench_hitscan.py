@@ -0,0 +1,58 @@
+"""
+Laser phase benchmark: per-shooter loop versus batched matrix hit-scan.
+
+Every ship fires at a random nearby ship; hull is effectively infinite so
+the workload stays constant. Run from the backend directory:
+
+    python benchmarks/bench_hitscan.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from game_engine import GameRoom, TICK_INTERVAL  # noqa: E402
+
+
+def build_room(players: int, spread: float) -> GameRoom:
+    random.seed(3)
+    room = GameRoom("bench")
+    room.rng.seed(3)
+    for i in range(players):
+        p = room.add_player(f"p{i}", f"p{i}", None)
+        p.x = random.uniform(-spread, spread)
+        p.z = random.uniform(-spread, spread)
+        p.hull = p.max_hull = 1e12
+    ids = list(room.players.values())
+    for p in ids:
+        target = random.choice(ids)
+        p.is_firing = True
+        p.fire_target_x = target.x + 0.5
+        p.fire_target_z = target.z + 0.5
+    return room
+
+
+def time_phase(players: int, batched: bool, spread: float, rounds: int = 200) -> float:
+    room = build_room(players, spread)
+    shooters = list(room.players.values())
+    fire = room._fire_lasers_batched if batched else room._fire_lasers
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fire(shooters, TICK_INTERVAL)
+    return (time.perf_counter() - start) / rounds * 1000.0
+
+
+def main():
+    print(f"{'shooters':>9} {'spread':>7} {'loop ms':>9} {'batch ms':>9} {'speedup':>8}")
+    for players in (4, 6, 10, 20, 50):
+        for spread in (40.0, 300.0):
+            loop = time_phase(players, False, spread)
+            batch = time_phase(players, True, spread)
+            print(f"{players:>9} {spread:>7.0f} {loop:>9.4f} {batch:>9.4f} {loop / batch:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Input receive benchmark: client inputs handled per second on one core.
+
+Every player sends a few render frames per tick, each with a move and an
+aim (plus the odd press), the way a mouse-driven client does. Three
+protocols are compared:
+
+    single   one JSON message per websocket frame, json.loads and
+             queue_message each (the old receive loop)
+    array    one JSON array frame per render frame, GameRoom.receive
+    binary   one binary frame per render frame, GameRoom.receive
+
+Only decoding and queueing is timed; the event loop wakeup each websocket
+frame costs comes on top, so the per-frame protocols pay more than shown.
+Run from the backend directory:
+
+    python benchmarks/bench_inputs.py [--players 50] [--ticks 200] [--frames-per-tick 3]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from game_engine import GameRoom  # noqa: E402
+from input_frames import encode_frame  # noqa: E402
+
+MODES = ("single", "array", "binary")
+
+
+def render_frame(rng) -> list:
+    x, z = rng.uniform(-150, 150), rng.uniform(-150, 150)
+    messages = [{"type": "move", "x": x, "z": z}, {"type": "fire_aim", "x": x + 5, "z": z - 5}]
+    if rng.random() < 0.05:
+        messages.append({"type": "ability", "id": rng.choice("qwer"), "x": x, "z": z})
+    return messages
+
+
+def build_traffic(players: int, ticks: int, frames_per_tick: int) -> list:
+    """Per tick, the (player, messages) render frames that arrive during it."""
+    rng = random.Random(1)
+    return [[(f"p{i}", render_frame(rng)) for _ in range(frames_per_tick) for i in range(players)]
+            for _ in range(ticks)]
+
+
+def encode(mode: str, traffic: list) -> list:
+    seqs = {}
+    ticks = []
+    for frames in traffic:
+        wire = []
+        for player_id, messages in frames:
+            if mode == "single":
+                wire.extend((player_id, json.dumps(msg)) for msg in messages)
+                continue
+            seq = seqs[player_id] = seqs.get(player_id, 0) + 1
+            data = json.dumps([seq] + messages) if mode == "array" else encode_frame(seq, messages)
+            wire.append((player_id, data))
+        ticks.append(wire)
+    return ticks
+
+
+def run(mode: str, players: int, wire: list) -> float:
+    """Seconds spent receiving ``wire``, tick by tick."""
+    room = GameRoom("bench", seed=1)
+    for i in range(players):
+        room.add_player(f"p{i}", f"P{i}", None, "vanguard")
+    elapsed = 0.0
+    for frames in wire:
+        start = time.perf_counter()
+        if mode == "single":
+            for player_id, text in frames:
+                room.queue_message(player_id, json.loads(text))
+        else:
+            for player_id, data in frames:
+                room.receive(player_id, data)
+        elapsed += time.perf_counter() - start
+        room._pending_messages.drain()
+        room.current_time += room.tick_interval
+    assert room.metrics.inputs_dropped == 0, mode
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--players", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=200)
+    parser.add_argument("--frames-per-tick", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    traffic = build_traffic(args.players, args.ticks, args.frames_per_tick)
+    inputs = sum(len(messages) for frames in traffic for _, messages in frames)
+    print(f"{args.players} players, {args.ticks} ticks, {inputs} inputs")
+    print(f"{'mode':<8} {'frames':>8} {'bytes':>9} {'ms':>8} {'inputs/s':>12} {'frames/s':>11}")
+    for mode in MODES:
+        wire = encode(mode, traffic)
+        frames = sum(len(t) for t in wire)
+        nbytes = sum(len(data) for t in wire for _, data in t)
+        elapsed = min(run(mode, args.players, wire) for _ in range(args.repeat))
+        print(f"{mode:<8} {frames:>8} {nbytes:>9} {elapsed * 1e3:>8.1f} {inputs / elapsed:>12,.0f} "
+              f"{frames / elapsed:>11,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Movement benchmark for the vectorized ShipArrays backend.
+
+Times the movement phase on its own and the whole GameRoom._update for
+rooms of moving (non-firing) ships in scalar and vectorized mode. Run
+from the backend directory:
+
+    python benchmarks/bench_ship_arrays.py
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from game_engine import (  # noqa: E402
+    GameRoom, TICK_INTERVAL, ARENA_SIZE,
+    SHIP_MAX_SPEED, SHIP_ACCELERATION, SHIP_DRAG, SHIP_ROTATION_SPEED,
+)
+
+
+def build_room(players: int, vectorized: bool) -> GameRoom:
+    random.seed(1)
+    rng = random.Random(2)
+    room = GameRoom("bench", vectorized=vectorized)
+    room.rng.seed(1)
+    for i in range(players):
+        p = room.add_player(f"p{i}", f"p{i}", None)
+        # Far-side targets keep every ship steering for the whole run.
+        p.move_target_x = -ARENA_SIZE if p.x > 0 else ARENA_SIZE
+        p.move_target_z = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        p.has_move_target = True
+    return room
+
+
+def time_movement(players: int, vectorized: bool, ticks: int = 50) -> float:
+    room = build_room(players, vectorized)
+    movers = list(room.players.values())
+    slots = [p._slot for p in movers] if vectorized else None
+    start = time.perf_counter()
+    for _ in range(ticks):
+        if vectorized:
+            room._ships.integrate(slots, TICK_INTERVAL, ARENA_SIZE, SHIP_MAX_SPEED,
+                                  SHIP_ACCELERATION, SHIP_DRAG, SHIP_ROTATION_SPEED)
+        else:
+            for p in movers:
+                room._move_player(p, TICK_INTERVAL)
+    return (time.perf_counter() - start) / ticks * 1000.0
+
+
+def time_ticks(players: int, vectorized: bool, ticks: int = 50) -> float:
+    room = build_room(players, vectorized)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        room._update(TICK_INTERVAL)
+    return (time.perf_counter() - start) / ticks * 1000.0
+
+
+def main():
+    print(f"{'players':>8} {'phase':>9} {'scalar ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for players in (10, 50, 200, 1000):
+        for phase, fn in (("movement", time_movement), ("tick", time_ticks)):
+            scalar = fn(players, False)
+            vector = fn(players, True)
+            print(f"{players:>8} {phase:>9} {scalar:>10.3f} {vector:>10.3f} {scalar / vector:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Tick-time benchmark for the spatial grid index.
+
+Builds rooms with a range of player and entity counts and times
+GameRoom._update with the grid enabled versus forced full scans
+(the pre-index behaviour). Run from the backend directory:
+
+    python benchmarks/bench_spatial_grid.py
+"""
+
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from game_engine import (  # noqa: E402
+    GameRoom, Missile, Mutalisk, SporeCloud, BombardmentZone, TICK_INTERVAL, ARENA_SIZE,
+)
+from spatial_grid import SpatialGrid  # noqa: E402
+
+SHIP_CLASSES = ("vanguard", "dreadnought", "leviathan")
+
+
+def build_room(players: int, entities: int, seed: int = 1) -> GameRoom:
+    rng = random.Random(seed)
+    room = GameRoom("bench")
+    ids = []
+    for i in range(players):
+        pid = f"p{i}"
+        p = room.add_player(pid, pid, None, SHIP_CLASSES[i % 3])
+        p.x = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        p.z = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        p.move_target_x = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        p.move_target_z = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        p.has_move_target = True
+        if i % 2 == 0:
+            p.is_firing = True
+            p.fire_target_x = p.x + rng.uniform(-60, 60)
+            p.fire_target_z = p.z + rng.uniform(-60, 60)
+        # Keep everyone alive so the workload stays constant across ticks.
+        p.hull = p.max_hull = 1e12
+        ids.append(pid)
+    for i in range(entities):
+        owner = ids[i % players]
+        x = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        z = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+        kind = i % 4
+        if kind == 0:
+            m = Missile(f"m{i}", owner, x, z, ids[(i + 1) % players])
+            m.lifetime = 1e9
+            room.missiles.add(m)
+        elif kind == 1:
+            mu = Mutalisk(f"u{i}", owner, x, z)
+            mu.lifetime = 1e9
+            room.mutalisks.add(mu)
+        elif kind == 2:
+            c = SporeCloud(f"c{i}", owner, x, z)
+            c.timer = 1e9
+            room.spore_clouds.add(c)
+        else:
+            b = BombardmentZone(f"b{i}", owner, x, z)
+            b.timer = 1e9
+            room.bombardment_zones.add(b)
+    return room
+
+
+def time_ticks(players: int, entities: int, ticks: int, linear_max) -> float:
+    SpatialGrid.linear_scan_max = linear_max
+    room = build_room(players, entities)
+    for _ in range(5):
+        room._update(TICK_INTERVAL)
+    start = time.perf_counter()
+    for _ in range(ticks):
+        room._update(TICK_INTERVAL)
+        room.effects.clear()
+    return (time.perf_counter() - start) / ticks * 1000.0
+
+
+def main():
+    default_linear = SpatialGrid.linear_scan_max
+    print(f"{'players':>8} {'entities':>9} {'scan ms':>9} {'grid ms':>9} {'speedup':>8}")
+    for players in (10, 50, 200):
+        for entities in (0, 100, 1000):
+            ticks = 20 if players * max(entities, 1) < 50000 else 5
+            before = time_ticks(players, entities, ticks, math.inf)
+            after = time_ticks(players, entities, ticks, default_linear)
+            print(f"{players:>8} {entities:>9} {before:>9.3f} {after:>9.3f} {before / after:>7.2f}x")
+    SpatialGrid.linear_scan_max = default_linear
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Tick cost benchmark: input processing, every _update phase and broadcast
+serialization, timed separately over parameterized rooms.
+
+Each scenario fixes the player count, ship-class mix, the share of ships
+firing and sending inputs, and the number of live missiles, mutalisks
+and zones. Hull and energy are topped up and entities replenished between
+ticks (outside the timed region) so the workload stays constant. Reports
+p50/p99 per phase and writes machine-readable JSON for release-to-release
+comparison. Run from the backend directory:
+
+    python benchmarks/bench_tick.py [--ticks 400] [--output bench_tick.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy as np  # noqa: E402
+
+from game_engine import (  # noqa: E402
+    GameRoom, BombardmentZone, SporeCloud, TICK_INTERVAL,
+)
+
+CLASSES = ("vanguard", "dreadnought", "leviathan")
+
+SCENARIOS = [
+    # name, players, class mix (vanguard, dreadnought, leviathan), firing, inputs,
+    # missiles, mutalisks, bombardment zones, spore clouds, spread
+    dict(name="duel", players=2, mix=(1, 1, 0), firing=0.5, inputs=0.5,
+         missiles=5, mutalisks=0, zones=0, clouds=0, spread=60.0),
+    dict(name="5v5", players=10, mix=(1, 1, 1), firing=0.4, inputs=0.3,
+         missiles=20, mutalisks=6, zones=2, clouds=2, spread=120.0),
+    dict(name="leviathan-swarm", players=10, mix=(0, 0, 1), firing=0.3, inputs=0.3,
+         missiles=0, mutalisks=60, zones=0, clouds=6, spread=120.0),
+    dict(name="brawl-50", players=50, mix=(1, 1, 1), firing=0.5, inputs=0.3,
+         missiles=100, mutalisks=30, zones=8, clouds=8, spread=200.0),
+    dict(name="stress-200", players=200, mix=(2, 1, 1), firing=0.5, inputs=0.2,
+         missiles=500, mutalisks=100, zones=20, clouds=20, spread=290.0),
+]
+
+INPUT_PHASE = "inputs"
+SNAPSHOT_PHASE = "snapshot"
+ENCODE_PHASE = "encode"
+
+
+def build_room(scenario: dict, vectorized: bool, seed: int = 1) -> GameRoom:
+    rng = random.Random(seed)
+    room = GameRoom(scenario["name"], vectorized=vectorized, seed=seed)
+    weights = scenario["mix"]
+    for i in range(scenario["players"]):
+        ship_class = rng.choices(CLASSES, weights=weights)[0]
+        p = room.add_player(f"p{i}", f"Pilot{i}", None, ship_class)
+        spread = scenario["spread"]
+        p.x = rng.uniform(-spread, spread)
+        p.z = rng.uniform(-spread, spread)
+        p.max_hull = 1e12
+    return room
+
+
+def replenish(room: GameRoom, scenario: dict, rng: random.Random):
+    """Restore the scenario's workload; runs outside the timed region."""
+    players = list(room.players.values())
+    spread = scenario["spread"]
+    for p in players:
+        p.hull = p.max_hull
+        p.energy = p.max_energy
+        if not p.alive:
+            p.spawn(room.rng)
+    firing = int(len(players) * scenario["firing"])
+    for i, p in enumerate(players):
+        want = i < firing
+        if p.is_firing != want:
+            p.is_firing = want
+        if want:
+            target = players[(i * 7 + 1) % len(players)]
+            p.fire_target_x = target.x
+            p.fire_target_z = target.z
+    for p in rng.sample(players, int(len(players) * scenario["inputs"])):
+        roll = rng.random()
+        if roll < 0.6:
+            room.queue_message(p.id, {"type": "move", "x": rng.uniform(-spread, spread), "z": rng.uniform(-spread, spread)})
+        elif roll < 0.9:
+            room.queue_message(p.id, {"type": "fire_aim", "x": rng.uniform(-spread, spread), "z": rng.uniform(-spread, spread)})
+        else:
+            room.queue_message(p.id, {"type": "ability", "id": rng.choice("qwer"),
+                                      "x": rng.uniform(-spread, spread), "z": rng.uniform(-spread, spread)})
+
+    def owner_and_spot():
+        owner = rng.choice(players)
+        return owner, owner.x + rng.uniform(-20, 20), owner.z + rng.uniform(-20, 20)
+
+    while len(room.missiles) < scenario["missiles"]:
+        owner, x, z = owner_and_spot()
+        target = rng.choice(players)
+        room.missiles.add(room._missile_pool.acquire(room._new_entity_id(), owner.id, x, z, target.id))
+    while len(room.mutalisks) < scenario["mutalisks"]:
+        owner, x, z = owner_and_spot()
+        room.mutalisks.add(room._mutalisk_pool.acquire(room._new_entity_id(), owner.id, x, z))
+    while len(room.bombardment_zones) < scenario["zones"]:
+        owner, x, z = owner_and_spot()
+        room.bombardment_zones.add(BombardmentZone(room._new_entity_id(), owner.id, x, z))
+    while len(room.spore_clouds) < scenario["clouds"]:
+        owner, x, z = owner_and_spot()
+        room.spore_clouds.add(SporeCloud(room._new_entity_id(), owner.id, x, z))
+
+
+def instrument(room: GameRoom, samples: dict):
+    """Wrap every update phase of ``room`` with a timer feeding ``samples``."""
+    def timed(name, phase):
+        bucket = samples.setdefault(name, [])
+
+        def run(dt):
+            start = time.perf_counter()
+            phase(dt)
+            bucket.append(time.perf_counter() - start)
+        return run
+
+    room.update_phases = [(name, timed(name, phase)) for name, phase in room.update_phases]
+
+
+def summarize(values) -> dict:
+    arr = np.asarray(values) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(arr, 50)), 2),
+        "p99_us": round(float(np.percentile(arr, 99)), 2),
+        "mean_us": round(float(arr.mean()), 2),
+        "max_us": round(float(arr.max()), 2),
+    }
+
+
+def run_scenario(scenario: dict, ticks: int, warmup: int, vectorized: bool) -> dict:
+    room = build_room(scenario, vectorized)
+    rng = random.Random(2)
+    samples = {INPUT_PHASE: []}
+    instrument(room, samples)
+    tick_times = []
+    snapshot_bytes = []
+    for tick in range(warmup + ticks):
+        replenish(room, scenario, rng)
+        if tick == warmup:
+            for bucket in samples.values():
+                bucket.clear()
+            tick_times.clear()
+            snapshot_bytes.clear()
+        tick_start = time.perf_counter()
+        room._process_inputs()
+        samples[INPUT_PHASE].append(time.perf_counter() - tick_start)
+        room._update(TICK_INTERVAL)
+        start = time.perf_counter()
+        state = room._state_message()
+        samples.setdefault(SNAPSHOT_PHASE, []).append(time.perf_counter() - start)
+        start = time.perf_counter()
+        encoded = json.dumps(state)
+        samples.setdefault(ENCODE_PHASE, []).append(time.perf_counter() - start)
+        tick_times.append(time.perf_counter() - tick_start)
+        snapshot_bytes.append(len(encoded))
+        room.tick += 1
+
+    order = [INPUT_PHASE] + [name for name, _ in room.update_phases] + [SNAPSHOT_PHASE, ENCODE_PHASE]
+    return {
+        "scenario": scenario,
+        "vectorized": vectorized,
+        "ticks": ticks,
+        "phases": {name: summarize(samples[name]) for name in order},
+        "tick": summarize(tick_times),
+        "snapshot_bytes": {
+            "p50": int(np.percentile(snapshot_bytes, 50)),
+            "max": int(max(snapshot_bytes)),
+        },
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
+
+def print_result(result: dict):
+    sc = result["scenario"]
+    print(f"\n{sc['name']}: {sc['players']} players, firing {sc['firing']:.0%}, "
+          f"{sc['missiles']} missiles, {sc['mutalisks']} mutalisks, "
+          f"{sc['zones'] + sc['clouds']} zones{' (vectorized)' if result['vectorized'] else ''}")
+    print(f"  {'phase':<10} {'p50 us':>9} {'p99 us':>9} {'mean us':>9}")
+    for name, stats in result["phases"].items():
+        print(f"  {name:<10} {stats['p50_us']:>9.1f} {stats['p99_us']:>9.1f} {stats['mean_us']:>9.1f}")
+    tick = result["tick"]
+    print(f"  {'tick':<10} {tick['p50_us']:>9.1f} {tick['p99_us']:>9.1f} {tick['mean_us']:>9.1f}"
+          f"   snapshot {result['snapshot_bytes']['p50']} B")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=400)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--scenario", action="append", help="only run the named scenario(s)")
+    parser.add_argument("--vectorized", action="store_true", help="use NumPy ship arrays")
+    parser.add_argument("--output", default="bench_tick.json", help="JSON results path ('-' for stdout)")
+    args = parser.parse_args()
+
+    scenarios = [s for s in SCENARIOS if not args.scenario or s["name"] in args.scenario]
+    results = []
+    for scenario in scenarios:
+        result = run_scenario(scenario, args.ticks, args.warmup, args.vectorized)
+        print_result(result)
+        results.append(result)
+
+    doc = {"benchmark": "tick", "environment": environment(), "results": results}
+    if args.output == "-":
+        json.dump(doc, sys.stdout, indent=2)
+    else:
+        with open(args.output, "w") as f:
+            json.dump(doc, f, indent=2)
+        print(f"\nwrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
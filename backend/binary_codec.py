@@ -0,0 +1,315 @@
+"""Binary, quantized state snapshots.
+
+An alternative to the JSON ``state`` message for clients that connect with
+``?codec=binary``. Every entity type has a fixed little-endian record, so
+no field names travel; positions are fixed-point fractions of the arena,
+timers are hundredths of a second, hull/shield/energy values are tenths,
+and player ids are replaced by small integer net ids. Effects are rare
+and irregular, so they ride along as a JSON blob at the end of the frame.
+
+Frame layout::
+
+    header      version, flags, tick, roster version, five record counts,
+                effects length (HEADER)
+    players     PLAYER record, then VANGUARD / DREADNOUGHT / LEVIATHAN
+                fields for the ship's class
+    missiles    MISSILE records
+    bombards    ZONE records
+    clouds      ZONE records
+    mutalisks   MUTALISK records
+    effects     UTF-8 JSON list
+
+Net ids are resolved through a roster, sent as a JSON text message
+(``{"type": "roster", ...}``) before the first frame that uses it. The
+frontend decoder lives in frontend/src/lib/binarySnapshot.js.
+"""
+
+import json
+import math
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<BBIHHHHHHI")
+PLAYER = struct.Struct("<HBBHHHhhHHHHHHHHHHHHHH")
+VANGUARD = struct.Struct("<HH")
+DREADNOUGHT = struct.Struct("<HHHHHHH")
+LEVIATHAN = struct.Struct("<HHHHH")
+MISSILE = struct.Struct("<IHHHH")
+ZONE = struct.Struct("<IHHHH")
+MUTALISK = struct.Struct("<IHHHH")
+
+SHIP_CLASS_IDS = {"vanguard": 0, "dreadnought": 1, "leviathan": 2}
+SHIP_CLASS_NAMES = {v: k for k, v in SHIP_CLASS_IDS.items()}
+
+NO_PLAYER = 0xFFFF
+FLAG_ALIVE = 1
+FLAG_FIRING = 2
+FLAG_CHANNELING = 4
+
+U16_MAX = 0xFFFF
+I16_MAX = 0x7FFF
+TIMER_SCALE = 100.0
+AMOUNT_SCALE = 10.0
+VELOCITY_SCALE = 1000.0
+ROTATION_SCALE = 65536 / (2 * math.pi)
+
+
+def _u16(value: float) -> int:
+    if value <= 0:
+        return 0
+    value = int(value + 0.5)
+    return value if value < U16_MAX else U16_MAX
+
+
+def _i16(value: float) -> int:
+    value = int(value + 0.5) if value >= 0 else int(value - 0.5)
+    return max(-I16_MAX, min(I16_MAX, value))
+
+
+class PlayerRoster:
+    """Small integer net ids for the players of a room.
+
+    Ids are reused after a player leaves; ``version`` changes whenever the
+    mapping does, and every frame names the version it was encoded with.
+    """
+
+    def __init__(self):
+        self.net_ids: Dict[str, int] = {}
+        self._entries: Dict[int, Tuple[str, str, str]] = {}
+        self._free: List[int] = []
+        self._next = 0
+        self.version = 0
+        self._message: Optional[str] = None
+
+    def add(self, player_id: str, name: str, ship_class: str) -> int:
+        net_id = self.net_ids.get(player_id)
+        if net_id is None:
+            if self._free:
+                net_id = self._free.pop()
+            else:
+                net_id = self._next
+                self._next += 1
+            self.net_ids[player_id] = net_id
+        self._entries[net_id] = (player_id, name, ship_class)
+        self._changed()
+        return net_id
+
+    def remove(self, player_id: str):
+        net_id = self.net_ids.pop(player_id, None)
+        if net_id is not None:
+            del self._entries[net_id]
+            self._free.append(net_id)
+            self._changed()
+
+    def _changed(self):
+        self.version = (self.version + 1) & U16_MAX
+        self._message = None
+
+    def message(self) -> str:
+        """The roster as a JSON text message, encoded once per version."""
+        if self._message is None:
+            self._message = json.dumps({
+                "type": "roster",
+                "version": self.version,
+                "players": [[net_id, *entry] for net_id, entry in sorted(self._entries.items())],
+            })
+        return self._message
+
+
+class SnapshotCodec:
+    """Encoder and reference decoder for one arena size."""
+
+    def __init__(self, arena_size: float):
+        self.arena_size = float(arena_size)
+        self.position_scale = U16_MAX / (2 * self.arena_size)
+
+    def _pos(self, value: float) -> int:
+        return _u16((value + self.arena_size) * self.position_scale)
+
+    def encode(self, tick: int, players: Iterable, missiles: Iterable, bombardments: Iterable,
+               spore_clouds: Iterable, mutalisks: Iterable, effects: List[dict],
+               roster: PlayerRoster) -> bytes:
+        """Encode live game objects (not their dicts) into one frame.
+
+        Takes the same entities ``GameRoom._state_message`` would list:
+        dead missiles and mutalisks and exploded zones are filtered out by
+        the caller.
+        """
+        records = self.records(players, missiles, bombardments, spore_clouds, mutalisks, roster)
+        return self.frame(tick, records, effects, roster)
+
+    def records(self, players: Iterable, missiles: Iterable, bombardments: Iterable,
+                spore_clouds: Iterable, mutalisks: Iterable, roster: PlayerRoster) -> List[List[bytes]]:
+        """The packed record of every entity, one list per collection.
+
+        Frames for different subsets of the same entities can be joined
+        from these with ``frame`` without packing anything twice.
+        """
+        pos = self._pos
+        net_ids = roster.net_ids
+        player_records = []
+        for p in players:
+            flags = (FLAG_ALIVE if p.alive else 0) | (FLAG_FIRING if p.is_firing else 0) \
+                | (FLAG_CHANNELING if p.is_channeling else 0)
+            ship_class = p.ship_class
+            record = PLAYER.pack(
+                net_ids.get(p.id, NO_PLAYER), SHIP_CLASS_IDS[ship_class], flags,
+                pos(p.x), pos(p.z), _u16(p.rotation * ROTATION_SCALE),
+                _i16(p.vx * VELOCITY_SCALE), _i16(p.vz * VELOCITY_SCALE),
+                _u16(p.hull * AMOUNT_SCALE), _u16(p.max_hull * AMOUNT_SCALE),
+                _u16(p.shields * AMOUNT_SCALE), _u16(p.max_shields * AMOUNT_SCALE),
+                _u16(p.energy * AMOUNT_SCALE), _u16(p.max_energy * AMOUNT_SCALE),
+                pos(p.fire_target_x), pos(p.fire_target_z),
+                _u16(p.respawn_timer * TIMER_SCALE), min(p.kills, U16_MAX), min(p.deaths, U16_MAX),
+                _u16(p.stun_timer * TIMER_SCALE), _u16(p.slow_timer * TIMER_SCALE),
+                _u16(p.armor_debuff_timer * TIMER_SCALE),
+            )
+            if ship_class == "vanguard":
+                record += VANGUARD.pack(
+                    _u16(p.warp_cooldown * TIMER_SCALE), _u16(p.missile_cooldown * TIMER_SCALE))
+            elif ship_class == "dreadnought":
+                record += DREADNOUGHT.pack(
+                    _u16(p.emergency_shields_cd * TIMER_SCALE), _u16(p.yamato_cd * TIMER_SCALE),
+                    _u16(p.repair_bots_cd * TIMER_SCALE), _u16(p.bombardment_cd * TIMER_SCALE),
+                    _u16(p.channel_timer * TIMER_SCALE), net_ids.get(p.channel_target_id, NO_PLAYER),
+                    _u16(p.repair_bots_timer * TIMER_SCALE))
+            else:
+                record += LEVIATHAN.pack(
+                    _u16(p.bio_stasis_cd * TIMER_SCALE), _u16(p.spore_cloud_cd * TIMER_SCALE),
+                    _u16(p.mutalisk_cd * TIMER_SCALE), _u16(p.bile_swell_cd * TIMER_SCALE),
+                    _u16(p.bio_regen_timer * TIMER_SCALE))
+            player_records.append(record)
+
+        return [
+            player_records,
+            [MISSILE.pack(int(e.id), pos(e.x), pos(e.z), net_ids.get(e.owner_id, NO_PLAYER),
+                          net_ids.get(e.target_id, NO_PLAYER)) for e in missiles],
+            [ZONE.pack(int(e.id), pos(e.x), pos(e.z), _u16(e.radius * AMOUNT_SCALE),
+                       _u16(e.timer * TIMER_SCALE)) for e in bombardments],
+            [ZONE.pack(int(e.id), pos(e.x), pos(e.z), _u16(e.radius * AMOUNT_SCALE),
+                       _u16(e.timer * TIMER_SCALE)) for e in spore_clouds],
+            [MUTALISK.pack(int(e.id), pos(e.x), pos(e.z), net_ids.get(e.owner_id, NO_PLAYER),
+                           _u16(e.health * AMOUNT_SCALE)) for e in mutalisks],
+        ]
+
+    def frame(self, tick: int, records: List[List[bytes]], effects: List[dict], roster: PlayerRoster) -> bytes:
+        """Join packed records (see ``records``) and effects into a frame."""
+        effects_json = json.dumps(effects, separators=(",", ":")).encode("utf-8") if effects else b""
+        header = HEADER.pack(FORMAT_VERSION, 0, tick, roster.version, *map(len, records), len(effects_json))
+        return b"".join([header, *[b"".join(r) for r in records], effects_json])
+
+    def decode(self, data: bytes, roster: dict) -> dict:
+        """Rebuild a ``state`` message from a frame.
+
+        ``roster`` is the parsed roster message the frame was encoded with.
+        Numbers come back within one quantization step of the simulation
+        value, which is at least as fine as the rounding in ``to_dict``.
+        """
+        version, _, tick, roster_version, n_players, n_missiles, n_zones, n_clouds, n_mutas, \
+            effects_len = HEADER.unpack_from(data, 0)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary snapshot version {version}")
+        if roster_version != roster["version"]:
+            raise ValueError(f"Frame uses roster {roster_version}, have {roster['version']}")
+        entries = {net_id: (player_id, name) for net_id, player_id, name, _ in roster["players"]}
+        scale = self.position_scale
+        arena = self.arena_size
+
+        def pos(q):
+            return round(q / scale - arena, 2)
+
+        def ref(net_id):
+            return entries[net_id][0] if net_id in entries else None
+
+        offset = HEADER.size
+        players = []
+        for _ in range(n_players):
+            (net_id, class_id, flags, x, z, rot, vx, vz, hull, max_hull, shields, max_shields, energy, max_energy,
+             ftx, ftz, respawn, kills, deaths, stun, slow, armor) = PLAYER.unpack_from(data, offset)
+            offset += PLAYER.size
+            ship_class = SHIP_CLASS_NAMES[class_id]
+            player_id, name = entries.get(net_id, (None, None))
+            d = {
+                "id": player_id,
+                "name": name,
+                "shipClass": ship_class,
+                "x": pos(x),
+                "z": pos(z),
+                "rotation": round(rot / ROTATION_SCALE, 3),
+                "vx": vx / VELOCITY_SCALE,
+                "vz": vz / VELOCITY_SCALE,
+                "hull": hull / AMOUNT_SCALE,
+                "maxHull": max_hull / AMOUNT_SCALE,
+                "shields": shields / AMOUNT_SCALE,
+                "maxShields": max_shields / AMOUNT_SCALE,
+                "energy": energy / AMOUNT_SCALE,
+                "maxEnergy": max_energy / AMOUNT_SCALE,
+                "alive": bool(flags & FLAG_ALIVE),
+                "isFiring": bool(flags & FLAG_FIRING),
+                "fireTargetX": pos(ftx),
+                "fireTargetZ": pos(ftz),
+                "respawnTimer": respawn / TIMER_SCALE,
+                "kills": kills,
+                "deaths": deaths,
+                "stunTimer": stun / TIMER_SCALE,
+                "slowTimer": slow / TIMER_SCALE,
+                "armorDebuffTimer": armor / TIMER_SCALE,
+            }
+            if ship_class == "vanguard":
+                warp, missile = VANGUARD.unpack_from(data, offset)
+                offset += VANGUARD.size
+                d["warpCooldown"] = warp / TIMER_SCALE
+                d["missileCooldown"] = missile / TIMER_SCALE
+            elif ship_class == "dreadnought":
+                es, yamato, repair_cd, bombard, channel, target, repair = DREADNOUGHT.unpack_from(data, offset)
+                offset += DREADNOUGHT.size
+                d["emergencyShieldsCd"] = es / TIMER_SCALE
+                d["yamatoCd"] = yamato / TIMER_SCALE
+                d["repairBotsCd"] = repair_cd / TIMER_SCALE
+                d["bombardmentCd"] = bombard / TIMER_SCALE
+                d["isChanneling"] = bool(flags & FLAG_CHANNELING)
+                d["channelTimer"] = channel / TIMER_SCALE
+                d["channelTargetId"] = ref(target)
+                d["repairBotsTimer"] = repair / TIMER_SCALE
+            else:
+                stasis, spore, muta, bile, regen = LEVIATHAN.unpack_from(data, offset)
+                offset += LEVIATHAN.size
+                d["bioStasisCd"] = stasis / TIMER_SCALE
+                d["sporeCloudCd"] = spore / TIMER_SCALE
+                d["mutaliskCd"] = muta / TIMER_SCALE
+                d["bileSwellCd"] = bile / TIMER_SCALE
+                d["bioRegenTimer"] = regen / TIMER_SCALE
+            players.append(d)
+
+        missiles = []
+        for _ in range(n_missiles):
+            entity_id, x, z, owner, target = MISSILE.unpack_from(data, offset)
+            offset += MISSILE.size
+            missiles.append({"id": str(entity_id), "x": pos(x), "z": pos(z), "ownerId": ref(owner), "targetId": ref(target)})
+        zones = {}
+        for key, count in (("bombardments", n_zones), ("sporeClouds", n_clouds)):
+            zones[key] = []
+            for _ in range(count):
+                entity_id, x, z, radius, timer = ZONE.unpack_from(data, offset)
+                offset += ZONE.size
+                zones[key].append({"id": str(entity_id), "x": pos(x), "z": pos(z),
+                                   "radius": radius / AMOUNT_SCALE, "timer": timer / TIMER_SCALE})
+        mutalisks = []
+        for _ in range(n_mutas):
+            entity_id, x, z, owner, health = MUTALISK.unpack_from(data, offset)
+            offset += MUTALISK.size
+            mutalisks.append({"id": str(entity_id), "x": pos(x), "z": pos(z), "ownerId": ref(owner),
+                              "health": health / AMOUNT_SCALE})
+        effects = json.loads(data[offset:offset + effects_len]) if effects_len else []
+        return {
+            "type": "state",
+            "tick": tick,
+            "players": players,
+            "missiles": missiles,
+            "bombardments": zones["bombardments"],
+            "sporeClouds": zones["sporeClouds"],
+            "mutalisks": mutalisks,
+            "effects": effects,
+        }
@@ -0,0 +1,193 @@
+"""Optional compression of outgoing snapshot frames.
+
+Consecutive snapshots repeat the same keys, ids and names tick after tick,
+which general-purpose compressors remove well. Clients opt in per
+connection with ``?compress=``:
+
+``deflate``
+    One raw deflate stream per connection with context takeover, flushed
+    per message (the scheme of permessage-deflate, RFC 7692), so every
+    message is compressed against the ones before it. Browsers inflate it
+    with ``DecompressionStream('deflate-raw')``.
+``zstd``
+    Each message compressed on its own against a dictionary trained
+    offline from recorded snapshots (``snapshots.dict``, served at
+    ``/api/snapshot-dictionary``). Being stateless, a message shared by
+    many connections is compressed once. Needs the ``zstandard`` package
+    and a zstd decoder with dictionary support on the client.
+
+Every message the connection's writer sends, text or binary, then goes out
+as a binary frame::
+
+    header      kind (TEXT / BINARY), uncompressed length (FRAME_HEADER)
+    payload     compressed message
+
+Compression runs in the writer as messages go out, so snapshots replaced
+in the queue are never compressed; anything over ``OFFLOAD_BYTES`` is
+handed to a thread pool (zlib and zstd release the GIL) rather than run on
+the event loop.
+
+Uvicorn already negotiates transport-level permessage-deflate with clients
+that offer it, compressing inline on the event loop. Deployments that use
+``compress=`` should run it with ``--ws-per-message-deflate false`` so
+frames are not deflated twice.
+"""
+
+import asyncio
+import struct
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+try:
+    import zstandard
+except ImportError:  # optional: only the zstd mode needs it
+    zstandard = None
+
+DEFLATE = "deflate"
+ZSTD = "zstd"
+
+FRAME_HEADER = struct.Struct("<BI")
+TEXT = 0
+BINARY = 1
+
+DEFLATE_LEVEL = 6
+ZSTD_LEVEL = 3
+# Messages at least this long are compressed on the thread pool; shorter
+# ones cost less to compress than to hand over
+OFFLOAD_BYTES = 4096
+COMPRESSION_THREADS = 2
+# Messages a shared compressor remembers, to compress each only once for
+# all the connections sending it
+SHARED_RECENT = 16
+
+DICTIONARY_PATH = Path(__file__).resolve().parent / "snapshots.dict"
+DICTIONARY_SIZE = 32 * 1024
+
+_executor: Optional[ThreadPoolExecutor] = None
+_zstd: Optional["ZstdCompressor"] = None
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(COMPRESSION_THREADS, thread_name_prefix="compress")
+    return _executor
+
+
+def _frame(message, compress) -> bytes:
+    if isinstance(message, str):
+        kind, data = TEXT, message.encode("utf-8")
+    else:
+        kind, data = BINARY, message
+    return FRAME_HEADER.pack(kind, len(data)) + compress(data)
+
+
+class DeflateCompressor:
+    """The deflate stream of one connection; messages must go through in send order."""
+
+    mode = DEFLATE
+
+    def __init__(self, level: int = DEFLATE_LEVEL):
+        self._stream = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    def _compress(self, data: bytes) -> bytes:
+        return self._stream.compress(data) + self._stream.flush(zlib.Z_SYNC_FLUSH)
+
+    def compress(self, message) -> bytes:
+        return _frame(message, self._compress)
+
+    async def frame(self, message) -> bytes:
+        if len(message) < OFFLOAD_BYTES:
+            return self.compress(message)
+        return await asyncio.get_running_loop().run_in_executor(_pool(), self.compress, message)
+
+
+class ZstdCompressor:
+    """Dictionary zstd shared by every connection that asked for it."""
+
+    mode = ZSTD
+
+    def __init__(self, dictionary: bytes, level: int = ZSTD_LEVEL):
+        self.dictionary = dictionary
+        self.dict_id = zstandard.ZstdCompressionDict(dictionary).dict_id()
+        self.level = level
+        # zstandard compressors must not be used by two threads at once
+        self._local = threading.local()
+        # (message, future) of recent messages, by identity
+        self._recent: deque = deque(maxlen=SHARED_RECENT)
+
+    def _compressor(self):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = self._local.compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=zstandard.ZstdCompressionDict(self.dictionary))
+        return compressor
+
+    def compress(self, message) -> bytes:
+        return _frame(message, self._compressor().compress)
+
+    async def frame(self, message) -> bytes:
+        for recent, future in self._recent:
+            if recent is message:
+                return await future
+        loop = asyncio.get_running_loop()
+        if len(message) < OFFLOAD_BYTES:
+            future = loop.create_future()
+            future.set_result(self.compress(message))
+        else:
+            future = loop.run_in_executor(_pool(), self.compress, message)
+        self._recent.append((message, future))
+        return await future
+
+
+def load_dictionary() -> Optional[bytes]:
+    try:
+        return DICTIONARY_PATH.read_bytes()
+    except OSError:
+        return None
+
+
+def zstd_compressor() -> Optional[ZstdCompressor]:
+    """The process's shared zstd compressor; None without zstandard or a dictionary."""
+    global _zstd
+    if _zstd is None and zstandard is not None:
+        dictionary = load_dictionary()
+        if dictionary is not None:
+            _zstd = ZstdCompressor(dictionary)
+    return _zstd
+
+
+def compressor_for(mode: Optional[str]):
+    """Compressor for a ``?compress=`` value, or None to send uncompressed."""
+    if mode == DEFLATE:
+        return DeflateCompressor()
+    if mode == ZSTD:
+        return zstd_compressor()
+    return None
+
+
+def decompressor_for(mode: str, dictionary: Optional[bytes] = None):
+    """A callable turning one connection's frames back into messages, for
+    Python clients and tools."""
+    if mode == DEFLATE:
+        inflate = zlib.decompressobj(-zlib.MAX_WBITS).decompress
+    else:
+        dict_data = zstandard.ZstdCompressionDict(dictionary or load_dictionary())
+        inflate = zstandard.ZstdDecompressor(dict_data=dict_data).decompress
+
+    def decode(frame: bytes):
+        kind, _ = FRAME_HEADER.unpack_from(frame)
+        data = inflate(frame[FRAME_HEADER.size:])
+        return data.decode("utf-8") if kind == TEXT else data
+
+    return decode
+
+
+def train_dictionary(samples: Iterable, size: int = DICTIONARY_SIZE) -> bytes:
+    """A zstd dictionary for ``samples`` (text or binary messages)."""
+    data = [s.encode("utf-8") if isinstance(s, str) else s for s in samples]
+    return zstandard.train_dictionary(size, data).as_bytes()
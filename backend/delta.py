@@ -0,0 +1,150 @@
+"""Delta-compressed state snapshots.
+
+Clients that opt in acknowledge the ticks they received. Each broadcast
+is then encoded against that client's newest acknowledged snapshot, the
+baseline, and only carries what changed since:
+
+    {"type": "delta", "tick": T, "base": B, "effects": [...],
+     "<collection>": {"u": [...], "r": [...], "o": [...]}, ...}
+
+For every entity collection, ``u`` lists new entities in full and the
+changed fields (plus ``id``) of existing ones, ``r`` lists removed ids,
+and ``o`` gives the id order, sent only when it differs from "baseline
+order without the removed ids, then new ids". Collections without changes
+are omitted. Effects are per-tick events and always sent in full.
+
+A client without a usable baseline, or whose last keyframe is more than
+``KEYFRAME_INTERVAL`` ticks old, gets a regular full ``state`` message.
+The frontend decoder lives in frontend/src/lib/snapshotDelta.js.
+"""
+
+from collections import OrderedDict
+from typing import List, Optional
+
+COLLECTIONS = ("players", "missiles", "bombardments", "sporeClouds", "mutalisks")
+
+# Snapshots kept as potential baselines (2 s at 20 Hz)
+DELTA_HISTORY = 40
+# A full state at least this often, in ticks, bounds the damage of a
+# decoder bug or a dropped baseline
+KEYFRAME_INTERVAL = 100
+
+_MISSING = object()
+
+
+def _same(a, b) -> bool:
+    """Equal down to the encoding: 1 vs 1.0 and 0.0 vs -0.0 count as changes."""
+    return a == b and type(a) is type(b) and (a != 0 or repr(a) == repr(b))
+
+
+def _diff_collection(base: List[dict], current: List[dict]) -> dict:
+    base_by_id = {e["id"]: e for e in base}
+    updates = []
+    current_ids = []
+    for entity in current:
+        entity_id = entity["id"]
+        current_ids.append(entity_id)
+        old = base_by_id.get(entity_id)
+        if old is None:
+            updates.append(entity)
+            continue
+        changed = {k: v for k, v in entity.items() if not _same(old.get(k, _MISSING), v)}
+        if changed:
+            changed["id"] = entity_id
+            updates.append(changed)
+    present = set(current_ids)
+    removed = [i for i in base_by_id if i not in present]
+    natural = [i for i in base_by_id if i in present]
+    natural += [i for i in current_ids if i not in base_by_id]
+
+    diff = {}
+    if updates:
+        diff["u"] = updates
+    if removed:
+        diff["r"] = removed
+    if natural != current_ids:
+        diff["o"] = current_ids
+    return diff
+
+
+def encode_delta(base: dict, state: dict) -> dict:
+    """Delta message turning ``base`` into ``state`` (both state messages)."""
+    message = {"type": "delta", "tick": state["tick"], "base": base["tick"], "effects": state["effects"]}
+    for key in COLLECTIONS:
+        diff = _diff_collection(base[key], state[key])
+        if diff:
+            message[key] = diff
+    return message
+
+
+def apply_delta(base: dict, message: dict) -> dict:
+    """Rebuild the full state from a baseline and a delta message.
+
+    The reference implementation of the client decoder; ``base`` is not
+    modified.
+    """
+    state = {"type": "state", "tick": message["tick"]}
+    for key in COLLECTIONS:
+        diff = message.get(key)
+        if not diff:
+            state[key] = [dict(e) for e in base[key]]
+            continue
+        by_id = OrderedDict((e["id"], dict(e)) for e in base[key])
+        for entity_id in diff.get("r", ()):
+            by_id.pop(entity_id, None)
+        for update in diff.get("u", ()):
+            entity = by_id.get(update["id"])
+            if entity is None:
+                by_id[update["id"]] = dict(update)
+            else:
+                entity.update(update)
+        order = diff.get("o")
+        state[key] = [by_id[i] for i in order] if order is not None else list(by_id.values())
+    state["effects"] = message["effects"]
+    return state
+
+
+class DeltaChannel:
+    """Baseline bookkeeping for one delta-capable connection.
+
+    Connections that see the room's full state share the room's history;
+    ``history`` is only set for connections with a view of their own.
+    """
+
+    __slots__ = ("acked_tick", "last_keyframe_tick", "history")
+
+    def __init__(self):
+        self.acked_tick: Optional[int] = None
+        self.last_keyframe_tick: Optional[int] = None
+        self.history: Optional["SnapshotHistory"] = None
+
+    def ack(self, tick: int):
+        if self.acked_tick is None or tick > self.acked_tick:
+            self.acked_tick = tick
+
+    def baseline(self, tick: int, history: "SnapshotHistory") -> Optional[int]:
+        """Tick to encode against, or None when a keyframe is due."""
+        if (self.acked_tick is None or self.acked_tick not in history
+                or self.last_keyframe_tick is None
+                or tick - self.last_keyframe_tick >= KEYFRAME_INTERVAL):
+            return None
+        return self.acked_tick
+
+
+class SnapshotHistory:
+    """The last ``DELTA_HISTORY`` broadcast states of a room, by tick."""
+
+    def __init__(self, size: int = DELTA_HISTORY):
+        self.size = size
+        self.states: "OrderedDict[int, dict]" = OrderedDict()
+
+    def add(self, state: dict):
+        self.states[state["tick"]] = state
+        while len(self.states) > self.size:
+            self.states.popitem(last=False)
+
+    def __contains__(self, tick: int) -> bool:
+        return tick in self.states
+
+    def __getitem__(self, tick: int) -> dict:
+        return self.states[tick]
@@ -1,18 +1,60 @@
 import asyncio
-import uuid
 import math
+from collections import deque
 import time
 import json
 import random
 import logging
+import os
+import re
+import zlib
 from typing import Dict, List, Optional
 
+import numpy as np
+
+from binary_codec import PlayerRoster, SnapshotCodec
+from delta import COLLECTIONS as DELTA_COLLECTIONS, DeltaChannel, SnapshotHistory, encode_delta
+from hitscan import laser_hit_matrix
+from input_frames import decode_frame
+from inputs import InputQueue
+from lag_compensation import MAX_REWIND, PositionHistory
+from interest import MINIMAP_INTERVAL, encode_view, minimap_message, relevant_effects, visibility
+from metrics import RoomMetrics
+from outbound import MINIMAP, STATE, ConnectionWriter
+from replay import KEYFRAME_INTERVAL, ReplayRecorder
+from scheduler import TICK_BUDGET, TickScheduler
+from slot_arena import SlotArena
+from spatial_grid import SpatialGrid
+from ship_arrays import (
+    ShipArrays, ShipField,
+    X, Z, VX, VZ, ROTATION, MOVE_TARGET_X, MOVE_TARGET_Z, HAS_MOVE_TARGET, SLOW_AMOUNT,
+)
+
 logger = logging.getLogger(__name__)
 
 # Game Constants
+# Simulation steps per second. Rooms may run at other rates; movement
+# constants below are tuned per tick at this one.
 TICK_RATE = 20
 TICK_INTERVAL = 1.0 / TICK_RATE
+# State broadcasts per second, by default as often as the simulation steps
+SNAPSHOT_RATE = 20
+# Slowest send rate a connection may ask for, in snapshots per second. A
+# room keeps this long a backlog of effects for slow connections.
+MIN_SEND_RATE = 1.0
+# Inputs aimed at something on screen, judged against the snapshot the
+# client saw; see lag_compensation.py
+AIMED_INPUTS = ("fire_start", "fire_aim", "ability")
+# Most simulation steps a late game loop runs back to back before it
+# gives up on the backlog and drops the remaining ticks.
+MAX_CATCHUP_TICKS = 5
+# Seconds a room must have been at rest (see GameRoom._quiescent) before
+# it stops ticking until the next input; 0 keeps every room ticking
+HIBERNATE_AFTER = 2.0
+# Bumped whenever the layout written by GameRoom.snapshot changes
+SNAPSHOT_VERSION = 2
 ARENA_SIZE = 300
+GRID_CELL_SIZE = 40.0
 
 # Ship Constants
 SHIP_RADIUS = 1.5
@@ -20,6 +62,9 @@ SHIP_MAX_SPEED = 3.0
 SHIP_ACCELERATION = 0.08
 SHIP_DRAG = 0.98
 SHIP_ROTATION_SPEED = 1.5
+# Coasting ships slower than this (per base tick) stop dead; drag alone
+# would leave them drifting forever and their room never at rest
+SHIP_REST_SPEED = 0.01
 
 # Base Combat Constants
 SHIELD_REGEN_RATE = 8.0
@@ -28,6 +73,8 @@ ENERGY_REGEN_RATE = 8.0
 LASER_DAMAGE = 20.0
 LASER_ENERGY_COST = 15.0
 LASER_RANGE = 80.0
+LASER_HIT_WIDTH = SHIP_RADIUS * 2.5
+LASER_BATCH_MIN_SHOOTERS = 12
 RESPAWN_TIME = 10.0
 
 # Vanguard Ability Constants
@@ -106,8 +153,120 @@ SHIP_CLASSES = {
 }
 
 
+class RoomClock:
+    """Simulation time of a room, shared with its players."""
+
+    __slots__ = ("now",)
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+
+class TickStats:
+    """Scheduling health of a room's game loop.
+
+    Lateness is how far past its deadline a tick started. Jitter is the
+    smoothed variation in lateness between consecutive wakeups (the
+    RFC 3550 interarrival estimator). Catch-up ticks ran without their
+    own broadcast; missed ticks were dropped outright once the loop fell
+    more than ``MAX_CATCHUP_TICKS`` behind. Deferred wakeups were due but
+    postponed because the scheduler had spent its CPU budget.
+    """
+
+    __slots__ = ("wakeups", "ticks", "catchup_ticks", "missed_ticks", "skipped_broadcasts", "deferred_wakeups",
+                 "last_lateness", "max_lateness", "total_lateness", "jitter")
+
+    def __init__(self):
+        self.wakeups = 0
+        self.ticks = 0
+        self.catchup_ticks = 0
+        self.missed_ticks = 0
+        self.skipped_broadcasts = 0
+        self.deferred_wakeups = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self.jitter = 0.0
+
+    def record_wakeup(self, lateness: float, steps: int, missed: int):
+        if self.wakeups:
+            self.jitter += (abs(lateness - self.last_lateness) - self.jitter) / 16
+        self.wakeups += 1
+        self.ticks += steps
+        self.catchup_ticks += max(0, steps - 1)
+        self.skipped_broadcasts += max(0, steps - 1)
+        self.missed_ticks += missed
+        self.last_lateness = lateness
+        self.total_lateness += lateness
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+
+    def raw(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def to_dict(self):
+        return {
+            "ticks": self.ticks,
+            "catchupTicks": self.catchup_ticks,
+            "missedTicks": self.missed_ticks,
+            "skippedBroadcasts": self.skipped_broadcasts,
+            "deferredWakeups": self.deferred_wakeups,
+            "lastLatenessMs": round(self.last_lateness * 1000, 3),
+            "maxLatenessMs": round(self.max_lateness * 1000, 3),
+            "avgLatenessMs": round(self.total_lateness / self.wakeups * 1000, 3) if self.wakeups else 0.0,
+            "jitterMs": round(self.jitter * 1000, 3),
+        }
+
+
+def _cooldown(deadline_slot: str) -> property:
+    # Stored as an absolute ship-clock deadline; read and written as
+    # remaining seconds, so ability code and to_dict see a countdown.
+    def fget(self):
+        remaining = getattr(self, deadline_slot) - self.local_time()
+        return remaining if remaining > 0 else 0.0
+
+    def fset(self, value):
+        setattr(self, deadline_slot, self.local_time() + value)
+
+    return property(fget, fset)
+
+
 class Player:
-    def __init__(self, player_id: str, name: str, ship_class: str = "vanguard"):
+    __slots__ = (
+        "id", "name", "ship_class",
+        "max_hull", "max_shields", "max_energy", "damage_reduction",
+        "x", "z", "rotation", "vx", "vz", "alive", "respawn_timer",
+        "move_target_x", "move_target_z", "has_move_target",
+        "fire_target_x", "fire_target_z", "view_lag",
+        "is_channeling", "channel_timer", "channel_target_id", "repair_bots_timer",
+        "bio_regen_timer", "last_damage_time", "armor_debuff_timer", "armor_debuff_amount",
+        "stun_timer", "slow_timer", "slow_amount", "in_spore_cloud",
+        "kills", "deaths",
+        # Ship clock
+        "_clock", "_time_offset", "_paused_at",
+        # Resources: value at a timestamp plus the time regen/drain starts
+        "_hull_base", "_hull_regen_from", "_shields_base", "_shields_regen_from", "_shield_regen_at",
+        "_energy_base", "_energy_at", "_firing",
+        # Cooldown deadlines
+        "_warp_ready_at", "_missile_ready_at",
+        "_emergency_shields_ready_at", "_yamato_ready_at", "_repair_bots_ready_at", "_bombardment_ready_at",
+        "_bio_stasis_ready_at", "_spore_cloud_ready_at", "_mutalisk_ready_at", "_bile_swell_ready_at",
+    )
+
+    warp_cooldown = _cooldown("_warp_ready_at")
+    missile_cooldown = _cooldown("_missile_ready_at")
+    emergency_shields_cd = _cooldown("_emergency_shields_ready_at")
+    yamato_cd = _cooldown("_yamato_ready_at")
+    repair_bots_cd = _cooldown("_repair_bots_ready_at")
+    bombardment_cd = _cooldown("_bombardment_ready_at")
+    bio_stasis_cd = _cooldown("_bio_stasis_ready_at")
+    spore_cloud_cd = _cooldown("_spore_cloud_ready_at")
+    mutalisk_cd = _cooldown("_mutalisk_ready_at")
+    bile_swell_cd = _cooldown("_bile_swell_ready_at")
+    _cooldown_deadlines = tuple(slot for slot in __slots__ if slot.endswith("_ready_at"))
+
+    def __init__(self, player_id: str, name: str, ship_class: str = "vanguard",
+                 clock: Optional[RoomClock] = None):
         self.id = player_id
         self.name = name
         self.ship_class = ship_class
@@ -118,6 +277,16 @@ class Player:
         self.max_energy = cfg["max_energy"]
         self.damage_reduction = cfg["damage_reduction"]
 
+        # Cooldowns and regeneration are evaluated lazily against the ship
+        # clock, which is the room clock minus time spent stunned or dead.
+        self._clock = clock if clock is not None else RoomClock()
+        self._time_offset = 0.0
+        self._paused_at = None
+        self._hull_regen_from = 0.0
+        self._shields_regen_from = 0.0
+        self._shield_regen_at = 0.0
+        self._firing = False
+
         self.x = 0.0
         self.z = 0.0
         self.rotation = 0.0
@@ -131,11 +300,11 @@ class Player:
         self.move_target_x = 0.0
         self.move_target_z = 0.0
         self.has_move_target = False
-        self.is_firing = False
         self.fire_target_x = 0.0
         self.fire_target_z = 0.0
-        self.shield_broken = False
-        self.shield_regen_timer = 0.0
+        # Ticks the snapshot this ship's pilot aims from was behind the
+        # room, or None to hit-test against current positions
+        self.view_lag = None
 
         # Vanguard abilities
         self.warp_cooldown = 0.0
@@ -168,19 +337,128 @@ class Player:
         self.kills = 0
         self.deaths = 0
 
-    def spawn(self):
-        self.x = random.uniform(-ARENA_SIZE * 0.7, ARENA_SIZE * 0.7)
-        self.z = random.uniform(-ARENA_SIZE * 0.7, ARENA_SIZE * 0.7)
-        self.rotation = random.uniform(0, math.pi * 2)
+    # --- Ship clock ---
+    def local_time(self) -> float:
+        now = self._clock.now if self._paused_at is None else self._paused_at
+        return now - self._time_offset
+
+    def pause_timers(self):
+        """Freeze cooldowns and regeneration (stunned or dead)."""
+        if self._paused_at is None:
+            self._paused_at = self._clock.now
+
+    def resume_timers(self):
+        if self._paused_at is not None:
+            self._time_offset += self._clock.now - self._paused_at
+            self._paused_at = None
+
+    # --- Lazily evaluated resources ---
+    @property
+    def hull(self) -> float:
+        if self.ship_class == "leviathan" and self._hull_base < self.max_hull:
+            # Bio-Regen passive
+            elapsed = self.local_time() - self._hull_regen_from
+            if elapsed > 0:
+                return min(self.max_hull, self._hull_base + BIO_REGEN_RATE * elapsed)
+        return self._hull_base
+
+    @hull.setter
+    def hull(self, value: float):
+        self._hull_base = value
+        self._hull_regen_from = max(self.local_time(), self._hull_regen_from)
+
+    def mark_damaged(self):
+        """Record a hit, restarting the Bio-Regen delay."""
+        now = self.local_time()
+        self._hull_base = self.hull
+        self._hull_regen_from = now + BIO_REGEN_DELAY
+        self.last_damage_time = now
+
+    @property
+    def shields(self) -> float:
+        if self._shields_base >= self.max_shields:
+            return self._shields_base
+        elapsed = self.local_time() - self._shields_regen_from
+        if elapsed > 0:
+            return min(self.max_shields, self._shields_base + SHIELD_REGEN_RATE * elapsed)
+        return self._shields_base
+
+    @shields.setter
+    def shields(self, value: float):
+        self._shields_base = value
+        self._shields_regen_from = max(self.local_time(), self._shield_regen_at)
+
+    @property
+    def shield_regen_timer(self) -> float:
+        remaining = self._shield_regen_at - self.local_time()
+        return remaining if remaining > 0 else 0.0
+
+    @shield_regen_timer.setter
+    def shield_regen_timer(self, value: float):
+        now = self.local_time()
+        self._shields_base = self.shields
+        self._shield_regen_at = now + value
+        self._shields_regen_from = max(now, self._shield_regen_at)
+
+    @property
+    def shield_broken(self) -> bool:
+        return self._shield_regen_at > self.local_time()
+
+    @property
+    def energy(self) -> float:
+        if self._energy_base >= self.max_energy and not self._firing:
+            return self._energy_base
+        elapsed = self.local_time() - self._energy_at
+        if self._firing:
+            return max(0.0, self._energy_base - LASER_ENERGY_COST * elapsed)
+        return min(self.max_energy, self._energy_base + ENERGY_REGEN_RATE * elapsed)
+
+    @energy.setter
+    def energy(self, value: float):
+        self._energy_base = value
+        self._energy_at = self.local_time()
+
+    @property
+    def is_firing(self) -> bool:
+        return self._firing
+
+    @is_firing.setter
+    def is_firing(self, value: bool):
+        if value != self._firing:
+            # Energy switches between draining and regenerating
+            self.energy = self.energy
+            self._firing = value
+
+    def at_rest(self) -> bool:
+        """Whether a tick leaves this ship exactly as it is: alive, still,
+        not firing or channeling, no timers running, resources full and
+        every ability ready."""
+        if not self.alive or self.is_firing or self.has_move_target or self.is_channeling:
+            return False
+        if self.vx or self.vz:
+            return False
+        if self.stun_timer > 0 or self.slow_timer > 0 or self.armor_debuff_timer > 0 or self.repair_bots_timer > 0:
+            return False
+        if self.shields < self.max_shields or self.energy < self.max_energy:
+            return False
+        if self.ship_class == "leviathan" and self.hull < self.max_hull:
+            return False
+        now = self.local_time()
+        return all(getattr(self, deadline) <= now for deadline in self._cooldown_deadlines)
+
+    def spawn(self, rng=random):
+        self.resume_timers()
+        self.x = rng.uniform(-ARENA_SIZE * 0.7, ARENA_SIZE * 0.7)
+        self.z = rng.uniform(-ARENA_SIZE * 0.7, ARENA_SIZE * 0.7)
+        self.rotation = rng.uniform(0, math.pi * 2)
         self.vx = 0.0
         self.vz = 0.0
+        self.is_firing = False
+        self.shield_regen_timer = 0.0
         self.hull = self.max_hull
         self.shields = self.max_shields
         self.energy = self.max_energy
         self.alive = True
-        self.is_firing = False
-        self.shield_broken = False
-        self.shield_regen_timer = 0.0
         self.has_move_target = False
         self.respawn_timer = 0.0
         self.warp_cooldown = 0.0
@@ -200,6 +478,7 @@ class Player:
         self.bile_swell_cd = 0.0
         self.bio_regen_timer = 0.0
         self.last_damage_time = 0.0
+        self._hull_regen_from = self.local_time()
         self.armor_debuff_timer = 0.0
         self.armor_debuff_amount = 0.0
         self.stun_timer = 0.0
@@ -255,8 +534,39 @@ class Player:
         return d
 
 
+class ArrayPlayer(Player):
+    """Player whose kinematic state lives in the room's ShipArrays.
+
+    Ability and serialization code use it exactly like a Player; the
+    fields below are views into one column of the shared arrays.
+    """
+
+    __slots__ = ("_ships", "_slot")
+
+    x = ShipField(X)
+    z = ShipField(Z)
+    vx = ShipField(VX)
+    vz = ShipField(VZ)
+    rotation = ShipField(ROTATION)
+    move_target_x = ShipField(MOVE_TARGET_X)
+    move_target_z = ShipField(MOVE_TARGET_Z)
+    has_move_target = ShipField(HAS_MOVE_TARGET, as_bool=True)
+    slow_amount = ShipField(SLOW_AMOUNT)
+
+    def __init__(self, ships: ShipArrays, player_id: str, name: str, ship_class: str = "vanguard",
+                 clock: Optional[RoomClock] = None):
+        self._ships = ships
+        self._slot = ships.allocate()
+        super().__init__(player_id, name, ship_class, clock)
+
+
 class Missile:
+    __slots__ = ("id", "owner_id", "x", "z", "target_id", "alive", "lifetime", "handle")
+
     def __init__(self, missile_id: str, owner_id: str, x: float, z: float, target_id: str):
+        self.reset(missile_id, owner_id, x, z, target_id)
+
+    def reset(self, missile_id: str, owner_id: str, x: float, z: float, target_id: str):
         self.id = missile_id
         self.owner_id = owner_id
         self.x = x
@@ -276,6 +586,8 @@ class Missile:
 
 
 class BombardmentZone:
+    __slots__ = ("id", "owner_id", "x", "z", "radius", "timer", "exploded", "handle")
+
     def __init__(self, zone_id: str, owner_id: str, x: float, z: float):
         self.id = zone_id
         self.owner_id = owner_id
@@ -296,6 +608,8 @@ class BombardmentZone:
 
 
 class SporeCloud:
+    __slots__ = ("id", "owner_id", "x", "z", "radius", "timer", "handle")
+
     def __init__(self, cloud_id: str, owner_id: str, x: float, z: float):
         self.id = cloud_id
         self.owner_id = owner_id
@@ -315,7 +629,12 @@ class SporeCloud:
 
 
 class Mutalisk:
+    __slots__ = ("id", "owner_id", "x", "z", "health", "alive", "lifetime", "target_id", "attack_cooldown", "handle")
+
     def __init__(self, mutalisk_id: str, owner_id: str, x: float, z: float):
+        self.reset(mutalisk_id, owner_id, x, z)
+
+    def reset(self, mutalisk_id: str, owner_id: str, x: float, z: float):
         self.id = mutalisk_id
         self.owner_id = owner_id
         self.x = x
@@ -336,66 +655,593 @@ class Mutalisk:
         }
 
 
+class EntityPool:
+    """Free list of finished entities, recycled through their ``reset``."""
+
+    def __init__(self, entity_cls):
+        self.entity_cls = entity_cls
+        self._free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self._free:
+            entity = self._free.pop()
+            entity.reset(*args)
+            self.reused += 1
+            return entity
+        self.created += 1
+        return self.entity_cls(*args)
+
+    def release(self, entity):
+        self._free.append(entity)
+
+
+def _record_fields(cls) -> tuple:
+    return tuple(f for f in cls.__slots__ if f != "handle")
+
+
+def _load_record(cls, fields: tuple, values: list):
+    record = cls.__new__(cls)
+    for field, value in zip(fields, values):
+        setattr(record, field, value)
+    return record
+
+
+# Field layouts of the records in a room snapshot. Players are written
+# through their raw slots, so cooldown deadlines and regen bases are
+# copied exactly instead of being re-derived from the ship clock.
+PLAYER_STATE_FIELDS = tuple(f for f in Player.__slots__ if f not in ("id", "name", "ship_class", "_clock"))
+MISSILE_FIELDS = _record_fields(Missile)
+BOMBARDMENT_FIELDS = _record_fields(BombardmentZone)
+SPORE_CLOUD_FIELDS = _record_fields(SporeCloud)
+MUTALISK_FIELDS = _record_fields(Mutalisk)
+
+
 class GameRoom:
-    def __init__(self, room_id: str):
+    def __init__(self, room_id: str, vectorized: bool = False, seed: Optional[int] = None,
+                 tick_rate: float = TICK_RATE, snapshot_rate: float = SNAPSHOT_RATE, max_rewind: float = MAX_REWIND,
+                 hibernate_after: float = HIBERNATE_AFTER):
         self.id = room_id
+        # The simulation steps at tick_rate and broadcasts every
+        # ticks_per_snapshot ticks, so physics and bandwidth are tuned apart
+        self.tick_rate = tick_rate
+        self.tick_interval = 1.0 / tick_rate
+        self.ticks_per_snapshot = max(1, round(tick_rate / snapshot_rate))
+        self.snapshot_rate = tick_rate / self.ticks_per_snapshot
+        # Shots and targeting are judged against the ship positions the
+        # shooter's client saw, at most max_rewind seconds back; see
+        # lag_compensation.py
+        self.max_rewind = max_rewind
+        self.max_rewind_ticks = round(max_rewind * tick_rate)
+        self._history = PositionHistory(self.max_rewind_ticks + 1)
+        # Rewound targets of the current laser phase, per tick
+        self._rewind_cache: Dict[int, Optional[tuple]] = {}
+        # Latest snapshot tick each client has reported seeing
+        self._view_ticks: Dict[str, int] = {}
+        # Vectorized mode keeps ship kinematics in NumPy arrays and moves
+        # every ship in one pass; it pays off in large rooms.
+        self.vectorized = vectorized
+        self._ships = ShipArrays() if vectorized else None
         self.players: Dict[str, Player] = {}
-        self.missiles: List[Missile] = []
-        self.bombardment_zones: List[BombardmentZone] = []
-        self.spore_clouds: List[SporeCloud] = []
-        self.mutalisks: List[Mutalisk] = []
+        # Short-lived entities live in slot arenas: removal is an O(1)
+        # swap with the last element, so iteration order is not spawn order.
+        self.missiles: SlotArena[Missile] = SlotArena()
+        self.bombardment_zones: SlotArena[BombardmentZone] = SlotArena()
+        self.spore_clouds: SlotArena[SporeCloud] = SlotArena()
+        self.mutalisks: SlotArena[Mutalisk] = SlotArena()
         self.effects: List[dict] = []
         self.connections: Dict[str, any] = {}
+        # Outbound queue of each connection, created on first send; see outbound.py
+        self._writers: Dict[str, ConnectionWriter] = {}
+        # Connections that take delta-compressed state, and the recent
+        # states their deltas are encoded against
+        self._delta_channels: Dict[str, DeltaChannel] = {}
+        self._snapshot_history = SnapshotHistory()
+        # Connections on the binary codec, with the roster version each
+        # one has been sent
+        self._binary_connections: Dict[str, int] = {}
+        self._roster = PlayerRoster()
+        # Connections culled to their area of interest; see interest.py
+        self._interest_players: set = set()
+        # Tick of each interest connection's last minimap
+        self._minimap_ticks: Dict[str, int] = {}
+        self._minimap_interval = max(1, round(MINIMAP_INTERVAL * tick_rate / TICK_RATE))
+        self._last_broadcast_tick: Optional[int] = None
+        # Connections sent less often than every snapshot, as a multiple of
+        # the snapshot interval, and the tick each connection was last sent
+        self._send_divisors: Dict[str, int] = {}
+        self._last_sent: Dict[str, int] = {}
+        # Spectator relays among the connections, and the rate each asked for
+        self._relays: Dict[str, float] = {}
+        # (tick, effects) of recent broadcasts, so that a connection gets
+        # every effect since its previous send
+        self._effect_log: deque = deque(maxlen=max(1, math.ceil(self.snapshot_rate / MIN_SEND_RATE)))
         self.running = False
         self.tick = 0
-        self._task = None
-        self._pending_messages: List[tuple] = []
-        self.current_time = 0.0
+        # The TickScheduler running this room's game loop; see scheduler.py
+        self._scheduler: Optional[TickScheduler] = None
+        self.tick_stats = TickStats()
+        self.metrics = RoomMetrics()
+        # Inputs for the next tick, coalesced and rate limited per player on
+        # the simulation clock; see inputs.py
+        self._pending_messages = InputQueue(lambda: self.clock.now, self.metrics)
+        # Loop-clock deadline of the next simulation step
+        self._next_tick_at: Optional[float] = None
+        # A room at rest for hibernate_after seconds stops ticking until an
+        # input, a join or a respawn is due, then makes up the ticks it
+        # slept through in one cheap step; see _quiescent and wake
+        self._hibernate_ticks = math.ceil(hibernate_after * tick_rate) if hibernate_after > 0 else 0
+        self._quiet_ticks = 0
+        self.hibernating = False
+        # Replay log of this room, if it is being recorded; see replay.py
+        self._recorder: Optional[ReplayRecorder] = None
+        self.clock = RoomClock()
+        # Respawn positions come from the room's own generator so that a
+        # snapshot captures everything the simulation depends on.
+        self.rng = random.Random(seed)
+        # Entity ids are drawn from a per-room counter and never reused,
+        # even when the object behind them is recycled from a pool.
+        self._next_entity_handle = 0
+        self._missile_pool = EntityPool(Missile)
+        self._mutalisk_pool = EntityPool(Mutalisk)
+        self._grid = SpatialGrid(ARENA_SIZE, GRID_CELL_SIZE)
+        self._grid_dirty = True
+        # Ships that may move this tick, collected by the players phase
+        self._movers: List[Player] = []
+        # The phases of one simulation tick, in order. Benchmarks and
+        # instrumentation time them individually.
+        self.update_phases = [
+            ("players", self._update_players),
+            ("movement", self._update_movement),
+            ("lasers", self._update_lasers),
+            ("missiles", self._update_missiles),
+            ("zones", self._update_zones),
+            ("clouds", self._update_clouds),
+            ("mutalisks", self._update_mutalisks),
+        ]
+
+    @property
+    def current_time(self) -> float:
+        return self.clock.now
+
+    @current_time.setter
+    def current_time(self, value: float):
+        self.clock.now = value
 
     def add_player(self, player_id: str, name: str, websocket, ship_class: str = "vanguard") -> Player:
-        player = Player(player_id, name, ship_class)
-        player.spawn()
+        self.wake()
+        if self.vectorized:
+            player = ArrayPlayer(self._ships, player_id, name, ship_class, self.clock)
+        else:
+            player = Player(player_id, name, ship_class, self.clock)
+        player.spawn(self.rng)
         self.players[player_id] = player
-        self.connections[player_id] = websocket
+        self._roster.add(player_id, name, ship_class)
+        self._history.add(player_id, self.tick, player._slot if self.vectorized else None)
+        if websocket is not None:
+            self.connections[player_id] = websocket
+        self._grid_dirty = True
+        if self._recorder is not None:
+            self._recorder.join(self.tick, player_id, name, ship_class)
         return player
 
     def remove_player(self, player_id: str):
-        self.players.pop(player_id, None)
+        self.wake()
+        player = self.players.pop(player_id, None)
+        if isinstance(player, ArrayPlayer):
+            self._ships.release(player._slot)
+        if player is not None and self._recorder is not None:
+            self._recorder.leave(self.tick, player_id)
         self.connections.pop(player_id, None)
+        writer = self._writers.pop(player_id, None)
+        if writer is not None:
+            writer.close()
+        self._delta_channels.pop(player_id, None)
+        self._binary_connections.pop(player_id, None)
+        self._interest_players.discard(player_id)
+        self._pending_messages.remove(player_id)
+        self._minimap_ticks.pop(player_id, None)
+        self._send_divisors.pop(player_id, None)
+        self._last_sent.pop(player_id, None)
+        self._relays.pop(player_id, None)
+        self._view_ticks.pop(player_id, None)
+        self._history.remove(player_id)
+        self._roster.remove(player_id)
+        self._grid_dirty = True
+
+    def enable_delta(self, player_id: str):
+        """Send ``player_id`` deltas against its acknowledged snapshots
+        instead of full states; see delta.py."""
+        self._delta_channels.setdefault(player_id, DeltaChannel())
+
+    def delta_players(self) -> List[str]:
+        return list(self._delta_channels)
+
+    def enable_compression(self, player_id: str, compressor):
+        """Compress every frame sent to ``player_id``; see compression.py."""
+        websocket = self.connections.get(player_id)
+        if websocket is not None:
+            writer = self._writer(player_id, websocket)
+            if isinstance(writer, ConnectionWriter):
+                writer.compressor = compressor
+
+    def enable_binary(self, player_id: str):
+        """Send ``player_id`` binary snapshots instead of JSON; see
+        binary_codec.py. Takes precedence over delta compression."""
+        self._delta_channels.pop(player_id, None)
+        self._binary_connections.setdefault(player_id, -1)
+
+    def binary_players(self) -> List[str]:
+        return list(self._binary_connections)
+
+    def enable_interest(self, player_id: str):
+        """Cull ``player_id``'s snapshots to its area of interest and send
+        it a coarse minimap list instead; see interest.py."""
+        self._interest_players.add(player_id)
+
+    def interest_players(self) -> List[str]:
+        return list(self._interest_players)
+
+    def set_send_rate(self, player_id: str, rate: float):
+        """Send ``player_id`` about ``rate`` snapshots per second instead of
+        every one; it still gets every effect. Rates are rounded to a whole
+        fraction of the room's snapshot rate, at least ``MIN_SEND_RATE``.
+        A rate that is not a finite number leaves it at the room's rate."""
+        if not math.isfinite(rate):
+            rate = self.snapshot_rate
+        rate = min(max(rate, MIN_SEND_RATE), self.snapshot_rate)
+        divisor = max(1, round(self.snapshot_rate / rate))
+        if divisor == 1:
+            self._send_divisors.pop(player_id, None)
+        else:
+            self._send_divisors[player_id] = divisor
+
+    def send_rates(self) -> Dict[str, float]:
+        """Connections with a reduced send rate, in snapshots per second."""
+        return {pid: self.snapshot_rate / d for pid, d in self._send_divisors.items()}
+
+    def add_relay(self, conn_id: str, relay, rate: float):
+        """Send ``relay`` full JSON states at about ``rate`` per second. It is
+        one connection without a ship, however many spectators it serves;
+        see spectators.py."""
+        self.wake()
+        self.connections[conn_id] = relay
+        self._relays[conn_id] = rate
+        self.set_send_rate(conn_id, rate)
+
+    def remove_relay(self, conn_id: str):
+        self.remove_player(conn_id)
+
+    def relays(self) -> Dict[str, float]:
+        return dict(self._relays)
+
+    def _writer(self, player_id: str, websocket):
+        """The outbound queue of a connection. Connections that already
+        queue for themselves (shard channels) are their own writer."""
+        writer = self._writers.get(player_id)
+        if writer is None:
+            if hasattr(websocket, "enqueue"):
+                writer = websocket
+            else:
+                writer = ConnectionWriter(websocket, self.metrics)
+            self._writers[player_id] = writer
+        return writer
+
+    async def flush(self):
+        """Wait until every queued message has been written out."""
+        for writer in list(self._writers.values()):
+            await writer.drain()
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "playerCount": len(self.players),
+            "playerNames": [p.name for p in self.players.values()],
+            "tickStats": self.tick_stats.to_dict(),
+            # Snapshots each connection skipped because it fell behind
+            "droppedFrames": {pid: w.dropped for pid, w in self._writers.items()},
+            "hibernating": self.hibernating,
+        }
+
+    # --- Snapshots ---
+    def snapshot(self) -> bytes:
+        """Serialize the simulation state to a compact, self-contained blob.
+
+        Everything the next tick depends on is included: players, entities
+        in arena order, the clock, the tick, the id counter, the RNG state,
+        queued inputs and undelivered effects. Connections and scheduling
+        stats belong to the hosting process and are left out.
+        """
+        rng_version, rng_internal, rng_gauss = self.rng.getstate()
+        doc = {
+            "v": SNAPSHOT_VERSION,
+            "id": self.id,
+            "tick": self.tick,
+            "time": self.current_time,
+            "nextEntity": self._next_entity_handle,
+            "rng": [rng_version, rng_internal, rng_gauss],
+            "players": [
+                [p.id, p.name, p.ship_class, [getattr(p, f) for f in PLAYER_STATE_FIELDS]]
+                for p in self.players.values()
+            ],
+            "missiles": [[getattr(m, f) for f in MISSILE_FIELDS] for m in self.missiles],
+            "bombardments": [[getattr(b, f) for f in BOMBARDMENT_FIELDS] for b in self.bombardment_zones],
+            "sporeClouds": [[getattr(c, f) for f in SPORE_CLOUD_FIELDS] for c in self.spore_clouds],
+            "mutalisks": [[getattr(m, f) for f in MUTALISK_FIELDS] for m in self.mutalisks],
+            "effects": self.effects,
+            "pending": self._pending_messages.messages,
+            "history": self._history.to_doc(),
+        }
+        return zlib.compress(json.dumps(doc, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_snapshot(cls, data: bytes, **room_options) -> "GameRoom":
+        """Rebuild a room from ``snapshot`` output. The room is not started
+        and has no connections."""
+        doc = json.loads(zlib.decompress(data))
+        if doc["v"] != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported room snapshot version {doc['v']}")
+        room = cls(doc["id"], **room_options)
+        room.tick = doc["tick"]
+        room.current_time = doc["time"]
+        room._next_entity_handle = doc["nextEntity"]
+        rng_version, rng_internal, rng_gauss = doc["rng"]
+        room.rng.setstate((rng_version, tuple(rng_internal), rng_gauss))
+        for player_id, name, ship_class, values in doc["players"]:
+            if room.vectorized:
+                player = ArrayPlayer(room._ships, player_id, name, ship_class, room.clock)
+            else:
+                player = Player(player_id, name, ship_class, room.clock)
+            for field, value in zip(PLAYER_STATE_FIELDS, values):
+                setattr(player, field, value)
+            room.players[player_id] = player
+            room._roster.add(player_id, name, ship_class)
+        for values in doc["missiles"]:
+            room.missiles.add(_load_record(Missile, MISSILE_FIELDS, values))
+        for values in doc["bombardments"]:
+            room.bombardment_zones.add(_load_record(BombardmentZone, BOMBARDMENT_FIELDS, values))
+        for values in doc["sporeClouds"]:
+            room.spore_clouds.add(_load_record(SporeCloud, SPORE_CLOUD_FIELDS, values))
+        for values in doc["mutalisks"]:
+            room.mutalisks.add(_load_record(Mutalisk, MUTALISK_FIELDS, values))
+        room.effects = doc["effects"]
+        room._history = PositionHistory.from_doc(
+            room._history.ticks, doc["history"],
+            {pid: p._slot for pid, p in room.players.items()} if room.vectorized else None)
+        room._pending_messages.restore([tuple(m) for m in doc["pending"]])
+        return room
+
+    def _new_entity_id(self) -> str:
+        self._next_entity_handle += 1
+        return str(self._next_entity_handle)
+
+    def receive(self, player_id: str, data):
+        """Queue the inputs of one websocket frame from ``player_id``.
+
+        ``data`` is a binary input frame (bytes) or JSON text; malformed
+        frames and frames older than the player's last one are ignored.
+        """
+        try:
+            seq, ack, messages = decode_frame(data)
+        except ValueError:
+            return
+        self.metrics.input_frames += 1
+        if ack is not None:
+            self._ack(player_id, ack)
+        if messages:
+            # Before queueing, so the rate limit sees the current clock
+            self.wake()
+        self._stamp_view(player_id, messages)
+        self._pending_messages.push_frame(player_id, seq, messages)
 
     def queue_message(self, player_id: str, message: dict):
-        self._pending_messages.append((player_id, message))
+        if message.get("type") == "ack":
+            if isinstance(message.get("tick"), int):
+                self._ack(player_id, message["tick"])
+            return
+        self.wake()
+        self._stamp_view(player_id, (message,))
+        self._pending_messages.push(player_id, message)
+
+    def _ack(self, player_id: str, tick: int):
+        # Acks steer encoding, not the simulation: apply them right away
+        channel = self._delta_channels.get(player_id)
+        if channel is not None:
+            channel.ack(tick)
+        # The acked snapshot is also the one the client is aiming from
+        self._view_ticks[player_id] = min(tick, self.tick)
+
+    def _stamp_view(self, player_id: str, messages):
+        """Tag aimed inputs with the snapshot tick the client last reported
+        seeing, unless they carry their own. The tag travels with the
+        input, so replays rewind exactly as the live room did."""
+        view_tick = self._view_ticks.get(player_id)
+        if view_tick is None:
+            return
+        for message in messages:
+            if message.get("type") in AIMED_INPUTS:
+                message.setdefault("tick", view_tick)
 
-    def start(self):
+    def start(self, scheduler: Optional[TickScheduler] = None):
+        """Run the game loop on ``scheduler``, shared with other rooms, or
+        on a scheduler of this room's own."""
         if not self.running:
             self.running = True
-            self._task = asyncio.create_task(self._game_loop())
+            self._scheduler = scheduler if scheduler is not None else TickScheduler()
+            self._scheduler.add(self)
 
     def stop(self):
+        # Make up the ticks slept through, so a snapshot taken now is current
+        self.wake()
         self.running = False
-        if self._task:
-            self._task.cancel()
-
-    async def _game_loop(self):
-        logger.info(f"Game loop started for room {self.id}")
-        try:
-            while self.running:
-                start = time.monotonic()
-                self._process_inputs()
-                self._update(TICK_INTERVAL)
-                await self._broadcast_state()
-                self.tick += 1
-                elapsed = time.monotonic() - start
-                await asyncio.sleep(max(0, TICK_INTERVAL - elapsed))
-        except asyncio.CancelledError:
-            logger.info(f"Game loop cancelled for room {self.id}")
-        except Exception as e:
-            logger.error(f"Game loop error: {e}", exc_info=True)
+        if self._scheduler is not None:
+            self._scheduler.remove(self)
+            self._scheduler = None
+        self.stop_recording()
+
+    def start_recording(self, path: str, keyframe_interval: float = KEYFRAME_INTERVAL) -> ReplayRecorder:
+        """Log this room's inputs and keyframes to ``path`` from now on.
+
+        The writing happens on a background thread; see replay.py.
+        """
+        self.stop_recording()
+        info = {
+            "room": self.id,
+            "options": {"vectorized": self.vectorized, "tick_rate": self.tick_rate,
+                        "snapshot_rate": self.snapshot_rate, "max_rewind": self.max_rewind},
+            "started": time.time(),
+        }
+        self._recorder = ReplayRecorder(path, info, max(1, round(keyframe_interval * self.tick_rate)))
+        self._recorder.keyframe(self.tick, self.snapshot())
+        return self._recorder
+
+    def stop_recording(self):
+        """End the replay with a keyframe of the current tick."""
+        if self._recorder is not None:
+            self._recorder.keyframe(self.tick, self.snapshot())
+            self._recorder.close()
+            self._recorder = None
+
+    def _serve(self, now: float) -> bool:
+        """One wakeup of the game loop at ``now``, as run by the room's
+        TickScheduler: run the due ticks and broadcast if a snapshot is
+        due. True once the room has been at rest long enough to hibernate;
+        it always has just broadcast by then."""
+        steps = self._run_due_ticks(now)
+        if not steps:
+            return False
+        if self._hibernate_ticks:
+            self._quiet_ticks = self._quiet_ticks + steps if self._quiescent() else 0
+        if not self._snapshot_due():
+            return False
+        self._broadcast_state()
+        return 0 < self._hibernate_ticks <= self._quiet_ticks
+
+    def _run_due_ticks(self, now: float) -> int:
+        """Simulate every tick whose deadline has passed at ``now``.
+
+        Deadlines are absolute, so sleep overshoot never accumulates. A late
+        loop catches up with back-to-back steps (one broadcast covers them
+        all, effects included) up to ``MAX_CATCHUP_TICKS``; anything beyond
+        that is dropped and the schedule restarts from ``now``.
+        """
+        if now < self._next_tick_at:
+            return 0
+        lateness = now - self._next_tick_at
+        steps = 0
+        while now >= self._next_tick_at and steps < MAX_CATCHUP_TICKS:
+            self._simulate_tick()
+            self._next_tick_at += self.tick_interval
+            steps += 1
+        missed = 0
+        if now >= self._next_tick_at:
+            missed = int((now - self._next_tick_at) // self.tick_interval) + 1
+            self._next_tick_at += missed * self.tick_interval
+        self.tick_stats.record_wakeup(lateness, steps, missed)
+        return steps
+
+    # --- Hibernation ---
+    def _quiescent(self) -> bool:
+        """Whether the next tick can only advance the clock and the respawn
+        countdowns: nothing queued or in flight, and every live ship at
+        rest. Such ticks can be skipped and made up later; see wake."""
+        if self._pending_messages or self.effects:
+            return False
+        if self.missiles or self.bombardment_zones or self.spore_clouds or self.mutalisks:
+            return False
+        return all(p.at_rest() for p in self.players.values() if p.alive)
+
+    def hibernate(self) -> Optional[float]:
+        """Stop ticking until ``wake``. Returns the loop-clock time the room
+        must be woken at to respawn a dead ship on time, if it has any."""
+        self.hibernating = True
+        self.metrics.hibernating = 1
+        respawn = self._ticks_to_respawn()
+        if respawn is None:
+            return None
+        return self._next_tick_at + (respawn - 1) * self.tick_interval
+
+    def wake(self, now: Optional[float] = None):
+        """Resume a hibernating room at ``now`` on the loop clock (by default
+        the running loop's time): the ticks whose deadlines passed are made
+        up by ``_skip_ticks``, and the loop goes on from the next one. A
+        respawn among them is left for the loop to simulate."""
+        if not self.hibernating:
+            return
+        if now is None:
+            now = asyncio.get_running_loop().time()
+        due = 0
+        if now >= self._next_tick_at:
+            due = int((now - self._next_tick_at) // self.tick_interval) + 1
+        respawn = self._ticks_to_respawn()
+        if respawn is not None:
+            due = min(due, respawn - 1)
+        self._skip_ticks(due)
+        self._next_tick_at += due * self.tick_interval
+        self._quiet_ticks = 0
+        self.hibernating = False
+        self.metrics.hibernating = 0
+        if self._scheduler is not None:
+            self._scheduler.reschedule(self)
+
+    def _ticks_to_respawn(self) -> Optional[int]:
+        """Ticks until the first dead ship respawns, that tick included."""
+        dt = self.tick_interval
+        soonest = None
+        for player in self.players.values():
+            if player.alive:
+                continue
+            # Counted down exactly as _update_players does
+            timer = player.respawn_timer - dt
+            ticks = 1
+            while timer > 0:
+                timer -= dt
+                ticks += 1
+            if soonest is None or ticks < soonest:
+                soonest = ticks
+        return soonest
+
+    def _skip_ticks(self, n: int):
+        """Advance ``n`` quiescent ticks, making exactly the changes that
+        simulating them would: the clock, the respawn countdowns, the tick,
+        the position history and any replay keyframes."""
+        if n <= 0:
+            return
+        dt = self.tick_interval
+        dead = [p for p in self.players.values() if not p.alive]
+        recorder = self._recorder
+        history_from = n - self._history.ticks
+        for i in range(n):
+            self.current_time += dt
+            for player in dead:
+                player.respawn_timer -= dt
+            self.tick += 1
+            if self.max_rewind_ticks and i >= history_from:
+                self._history.record(self.tick, self.players.values(), self._ships)
+            if recorder is not None and self.tick % recorder.keyframe_ticks == 0:
+                recorder.keyframe(self.tick, self.snapshot())
+        self._grid_dirty = True
+        self.metrics.hibernated_ticks += n
+
+    def _simulate_tick(self):
+        queued = len(self._pending_messages)
+        start = time.perf_counter()
+        self._process_inputs()
+        self.metrics.observe("inputs", time.perf_counter() - start)
+        self._update(self.tick_interval)
+        self.tick += 1
+        if self.max_rewind_ticks:
+            self._history.record(self.tick, self.players.values(), self._ships)
+        self.metrics.record_tick(queued)
+        recorder = self._recorder
+        if recorder is not None and self.tick % recorder.keyframe_ticks == 0:
+            recorder.keyframe(self.tick, self.snapshot())
 
     def _process_inputs(self):
-        messages = self._pending_messages.copy()
-        self._pending_messages.clear()
-
+        messages = self._pending_messages.drain()
+        if messages and self._recorder is not None:
+            self._recorder.inputs(self.tick, messages)
         for player_id, msg in messages:
             player = self.players.get(player_id)
             if not player or not player.alive:
@@ -415,11 +1261,13 @@ class GameRoom:
                 player.is_firing = True
                 player.fire_target_x = float(msg.get("x", 0))
                 player.fire_target_z = float(msg.get("z", 0))
+                player.view_lag = self._view_lag(msg)
             elif msg_type == "fire_stop":
                 player.is_firing = False
             elif msg_type == "fire_aim":
                 player.fire_target_x = float(msg.get("x", 0))
                 player.fire_target_z = float(msg.get("z", 0))
+                player.view_lag = self._view_lag(msg)
             elif msg_type == "ability":
                 ability_id = msg.get("id")
                 self._handle_ability(player, ability_id, msg)
@@ -434,7 +1282,7 @@ class GameRoom:
             if ability_id == "q":
                 self._use_emergency_shields(player)
             elif ability_id == "w":
-                self._use_yamato(player)
+                self._use_yamato(player, self._view_lag(msg))
             elif ability_id == "e":
                 self._use_repair_bots(player)
             elif ability_id == "r":
@@ -443,7 +1291,7 @@ class GameRoom:
                 self._use_bombardment(player, x, z)
         elif player.ship_class == "leviathan":
             if ability_id == "q":
-                self._use_bio_stasis(player)
+                self._use_bio_stasis(player, self._view_lag(msg))
             elif ability_id == "w":
                 x = float(msg.get("x", player.x))
                 z = float(msg.get("z", player.z))
@@ -467,6 +1315,7 @@ class GameRoom:
         player.z += dz * WARP_DISTANCE
         player.x = max(-ARENA_SIZE, min(ARENA_SIZE, player.x))
         player.z = max(-ARENA_SIZE, min(ARENA_SIZE, player.z))
+        self._grid_dirty = True
         self.effects.append({"type": "warp", "playerId": player.id, "x": player.x, "z": player.z})
 
     def _use_missiles(self, player: Player):
@@ -478,27 +1327,27 @@ class GameRoom:
             return
         for i in range(MISSILE_COUNT):
             angle_offset = (i - MISSILE_COUNT // 2) * 0.3
-            missile = Missile(
-                str(uuid.uuid4())[:8], player.id,
+            missile = self._missile_pool.acquire(
+                self._new_entity_id(), player.id,
                 player.x + math.sin(player.rotation + angle_offset) * 2,
                 player.z + math.cos(player.rotation + angle_offset) * 2,
                 nearest.id
             )
-            self.missiles.append(missile)
+            self.missiles.add(missile)
 
     # --- Dreadnought Abilities ---
     def _use_emergency_shields(self, player: Player):
         if player.emergency_shields_cd > 0:
             return
         player.emergency_shields_cd = EMERGENCY_SHIELDS_CD
+        player.shield_regen_timer = 0.0
         player.shields = min(player.max_shields, player.shields + EMERGENCY_SHIELDS_RESTORE)
-        player.shield_broken = False
         self.effects.append({"type": "emergency_shields", "playerId": player.id, "x": player.x, "z": player.z})
 
-    def _use_yamato(self, player: Player):
+    def _use_yamato(self, player: Player, view_lag: Optional[int] = None):
         if player.yamato_cd > 0 or player.is_channeling:
             return
-        nearest = self._find_nearest_enemy(player, max_range=YAMATO_RANGE)
+        nearest = self._find_nearest_enemy(player, max_range=YAMATO_RANGE, view_lag=view_lag)
         if nearest is None:
             return
         player.yamato_cd = YAMATO_CD
@@ -523,20 +1372,21 @@ class GameRoom:
         player.energy -= BOMBARDMENT_ENERGY_COST
         x = max(-ARENA_SIZE, min(ARENA_SIZE, x))
         z = max(-ARENA_SIZE, min(ARENA_SIZE, z))
-        zone = BombardmentZone(str(uuid.uuid4())[:8], player.id, x, z)
-        self.bombardment_zones.append(zone)
+        zone = BombardmentZone(self._new_entity_id(), player.id, x, z)
+        self.bombardment_zones.add(zone)
         self.effects.append({"type": "bombardment_mark", "x": x, "z": z, "radius": BOMBARDMENT_RADIUS, "ownerId": player.id})
 
     # --- Leviathan Abilities ---
-    def _use_bio_stasis(self, player: Player):
+    def _use_bio_stasis(self, player: Player, view_lag: Optional[int] = None):
         if player.bio_stasis_cd > 0 or player.energy < BIO_STASIS_ENERGY:
             return
-        nearest = self._find_nearest_enemy(player, max_range=BIO_STASIS_RANGE)
+        nearest = self._find_nearest_enemy(player, max_range=BIO_STASIS_RANGE, view_lag=view_lag)
         if nearest is None:
             return
         player.bio_stasis_cd = BIO_STASIS_CD
         player.energy -= BIO_STASIS_ENERGY
         nearest.stun_timer = BIO_STASIS_DURATION
+        nearest.pause_timers()
         nearest.is_firing = False
         nearest.has_move_target = False
         nearest.vx = 0.0
@@ -556,8 +1406,8 @@ class GameRoom:
         player.energy -= SPORE_CLOUD_ENERGY
         x = max(-ARENA_SIZE, min(ARENA_SIZE, x))
         z = max(-ARENA_SIZE, min(ARENA_SIZE, z))
-        cloud = SporeCloud(str(uuid.uuid4())[:8], player.id, x, z)
-        self.spore_clouds.append(cloud)
+        cloud = SporeCloud(self._new_entity_id(), player.id, x, z)
+        self.spore_clouds.add(cloud)
         self.effects.append({
             "type": "spore_cloud_spawn",
             "x": x,
@@ -575,8 +1425,8 @@ class GameRoom:
             angle_offset = (i - 1) * 0.8
             spawn_x = player.x + math.sin(player.rotation + angle_offset) * 4
             spawn_z = player.z + math.cos(player.rotation + angle_offset) * 4
-            mutalisk = Mutalisk(str(uuid.uuid4())[:8], player.id, spawn_x, spawn_z)
-            self.mutalisks.append(mutalisk)
+            mutalisk = self._mutalisk_pool.acquire(self._new_entity_id(), player.id, spawn_x, spawn_z)
+            self.mutalisks.add(mutalisk)
         self.effects.append({
             "type": "mutalisk_spawn",
             "playerId": player.id,
@@ -592,14 +1442,10 @@ class GameRoom:
         x = max(-ARENA_SIZE, min(ARENA_SIZE, x))
         z = max(-ARENA_SIZE, min(ARENA_SIZE, z))
         # Immediate damage and debuff
-        for other in self.players.values():
-            if other.id == player.id or not other.alive:
-                continue
-            dist = math.sqrt((other.x - x) ** 2 + (other.z - z) ** 2)
-            if dist < BILE_SWELL_RADIUS:
-                self._apply_damage(other, BILE_SWELL_DAMAGE, player)
-                other.armor_debuff_timer = BILE_SWELL_DEBUFF_DURATION
-                other.armor_debuff_amount = BILE_SWELL_ARMOR_DEBUFF
+        for other in self._spatial_index().query_radius(x, z, BILE_SWELL_RADIUS, exclude_id=player.id):
+            self._apply_damage(other, BILE_SWELL_DAMAGE, player)
+            other.armor_debuff_timer = BILE_SWELL_DEBUFF_DURATION
+            other.armor_debuff_amount = BILE_SWELL_ARMOR_DEBUFF
         self.effects.append({
             "type": "bile_swell",
             "x": x,
@@ -609,27 +1455,76 @@ class GameRoom:
         })
 
     # --- Helpers ---
-    def _find_nearest_enemy(self, player: Player, max_range: float = float('inf')) -> Optional[Player]:
+    def _spatial_index(self) -> SpatialGrid:
+        # Rebuilt lazily, at most once per tick unless something teleports.
+        if self._grid_dirty:
+            self._grid.rebuild(self.players.values())
+            self._grid_dirty = False
+        return self._grid
+
+    def _find_nearest_enemy(self, player: Player, max_range: float = float('inf'),
+                            view_lag: Optional[int] = None) -> Optional[Player]:
+        """Closest live enemy within ``max_range``; with a ``view_lag``, the
+        closest where the enemies were that many ticks ago."""
+        rewound = self._rewind(self.tick - view_lag) if view_lag is not None else None
+        if rewound is None:
+            return self._spatial_index().nearest(player.x, player.z, exclude_id=player.id, max_range=max_range)
+        targets, target_x, target_z = rewound
+        dist = np.sqrt((target_x - player.x) ** 2 + (target_z - player.z) ** 2).tolist()
         nearest = None
-        nearest_dist = float('inf')
-        for other in self.players.values():
-            if other.id == player.id or not other.alive:
-                continue
-            dist = math.sqrt((other.x - player.x) ** 2 + (other.z - player.z) ** 2)
-            if dist < nearest_dist and dist < max_range:
-                nearest = other
-                nearest_dist = dist
+        nearest_dist = max_range
+        for target, d in zip(targets, dist):
+            if d < nearest_dist and target is not player:
+                nearest = target
+                nearest_dist = d
         return nearest
 
+    def _view_lag(self, msg: dict) -> Optional[int]:
+        """Ticks between now and the snapshot an input was aimed from,
+        capped at the rewind window; None if the client did not say."""
+        tick = msg.get("tick")
+        if not isinstance(tick, int) or not self.max_rewind_ticks:
+            return None
+        return min(max(self.tick - tick, 0), self.max_rewind_ticks)
+
+    def _rewind(self, tick: int) -> Optional[tuple]:
+        """``(ships, x, z)``: the ships alive now that were alive at the end
+        of ``tick``, and where they were then; None if the history no
+        longer reaches back that far."""
+        targets = [p for p in self.players.values() if p.alive]
+        found = self._history.positions(tick, targets)
+        if found is None:
+            return None
+        target_x, target_z, present = found
+        keep = present.nonzero()[0]
+        return [targets[i] for i in keep.tolist()], target_x[keep], target_z[keep]
+
+    def _rewound_targets(self, tick: int) -> Optional[tuple]:
+        # Many shooters share a lag; rewind once per laser phase
+        try:
+            return self._rewind_cache[tick]
+        except KeyError:
+            rewound = self._rewind_cache[tick] = self._rewind(tick)
+            return rewound
+
     def _update(self, dt: float):
         self.current_time += dt
-
-        # Update each player
+        self._grid_dirty = True
+        observe = self.metrics.observe
+        clock = time.perf_counter
+        for name, phase in self.update_phases:
+            start = clock()
+            phase(dt)
+            observe(name, clock() - start)
+
+    def _update_players(self, dt: float):
+        movers = self._movers
+        movers.clear()
         for player in self.players.values():
             if not player.alive:
                 player.respawn_timer -= dt
                 if player.respawn_timer <= 0:
-                    player.spawn()
+                    player.spawn(self.rng)
                     self.effects.append({"type": "respawn", "playerId": player.id})
                 continue
 
@@ -642,6 +1537,7 @@ class GameRoom:
                 player.has_move_target = False
                 if player.stun_timer <= 0:
                     player.stun_timer = 0
+                    player.resume_timers()
                 continue  # Skip all other updates while stunned
 
             # --- Slow debuff timer ---
@@ -659,12 +1555,6 @@ class GameRoom:
                     player.armor_debuff_timer = 0
                     player.armor_debuff_amount = 0
 
-            # --- Leviathan: Bio-Regen passive ---
-            if player.ship_class == "leviathan":
-                time_since_damage = self.current_time - player.last_damage_time
-                if time_since_damage >= BIO_REGEN_DELAY and player.hull < player.max_hull:
-                    player.hull = min(player.max_hull, player.hull + BIO_REGEN_RATE * dt)
-
             # --- Dreadnought: Yamato channeling ---
             if player.is_channeling:
                 player.channel_timer -= dt
@@ -689,124 +1579,36 @@ class GameRoom:
                 heal = player.max_hull * REPAIR_BOTS_HEAL_PCT * dt
                 player.hull = min(player.max_hull, player.hull + heal)
 
-            # --- Movement physics ---
-            if player.has_move_target and not player.is_channeling:
-                dx = player.move_target_x - player.x
-                dz = player.move_target_z - player.z
-                dist_to_target = math.sqrt(dx * dx + dz * dz)
-                if dist_to_target > 2.0:
-                    desired_angle = math.atan2(dx, dz)
-                    angle_diff = desired_angle - player.rotation
-                    while angle_diff > math.pi:
-                        angle_diff -= 2 * math.pi
-                    while angle_diff < -math.pi:
-                        angle_diff += 2 * math.pi
-                    rotation_amount = SHIP_ROTATION_SPEED * dt
-                    if abs(angle_diff) < rotation_amount:
-                        player.rotation = desired_angle
-                    else:
-                        player.rotation += rotation_amount * (1 if angle_diff > 0 else -1)
-                    player.rotation = player.rotation % (2 * math.pi)
-                    # Apply slow reduction if affected
-                    accel = SHIP_ACCELERATION
-                    if player.slow_amount > 0:
-                        accel *= (1 - player.slow_amount)
-                    thrust_x = math.sin(player.rotation) * accel
-                    thrust_z = math.cos(player.rotation) * accel
-                    player.vx += thrust_x
-                    player.vz += thrust_z
-                else:
-                    player.has_move_target = False
-
-            # Drag
-            player.vx *= SHIP_DRAG
-            player.vz *= SHIP_DRAG
-            # Apply max speed with slow reduction
-            max_speed = SHIP_MAX_SPEED
-            if player.slow_amount > 0:
-                max_speed *= (1 - player.slow_amount)
-            speed = math.sqrt(player.vx ** 2 + player.vz ** 2)
-            if speed > max_speed:
-                player.vx = (player.vx / speed) * max_speed
-                player.vz = (player.vz / speed) * max_speed
-
-            # Position
-            player.x += player.vx
-            player.z += player.vz
-            if abs(player.x) > ARENA_SIZE:
-                player.x = max(-ARENA_SIZE, min(ARENA_SIZE, player.x))
-                player.vx *= -0.5
-            if abs(player.z) > ARENA_SIZE:
-                player.z = max(-ARENA_SIZE, min(ARENA_SIZE, player.z))
-                player.vz *= -0.5
-
-            # Shield regen
-            if player.shield_broken:
-                player.shield_regen_timer -= dt
-                if player.shield_regen_timer <= 0:
-                    player.shield_broken = False
-            if not player.shield_broken and player.shields < player.max_shields:
-                player.shields = min(player.max_shields, player.shields + SHIELD_REGEN_RATE * dt)
-
-            # Energy
-            if player.is_firing:
-                player.energy -= LASER_ENERGY_COST * dt
-                if player.energy <= 0:
-                    player.energy = 0
-                    player.is_firing = False
-            else:
-                player.energy = min(player.max_energy, player.energy + ENERGY_REGEN_RATE * dt)
-
-            # Cooldowns - Vanguard
-            if player.warp_cooldown > 0:
-                player.warp_cooldown = max(0, player.warp_cooldown - dt)
-            if player.missile_cooldown > 0:
-                player.missile_cooldown = max(0, player.missile_cooldown - dt)
-            # Cooldowns - Dreadnought
-            if player.emergency_shields_cd > 0:
-                player.emergency_shields_cd = max(0, player.emergency_shields_cd - dt)
-            if player.yamato_cd > 0:
-                player.yamato_cd = max(0, player.yamato_cd - dt)
-            if player.repair_bots_cd > 0:
-                player.repair_bots_cd = max(0, player.repair_bots_cd - dt)
-            if player.bombardment_cd > 0:
-                player.bombardment_cd = max(0, player.bombardment_cd - dt)
-            # Cooldowns - Leviathan
-            if player.bio_stasis_cd > 0:
-                player.bio_stasis_cd = max(0, player.bio_stasis_cd - dt)
-            if player.spore_cloud_cd > 0:
-                player.spore_cloud_cd = max(0, player.spore_cloud_cd - dt)
-            if player.mutalisk_cd > 0:
-                player.mutalisk_cd = max(0, player.mutalisk_cd - dt)
-            if player.bile_swell_cd > 0:
-                player.bile_swell_cd = max(0, player.bile_swell_cd - dt)
-
-        # --- Laser damage ---
-        for player in self.players.values():
-            if not player.alive or not player.is_firing:
-                continue
-            dx = player.fire_target_x - player.x
-            dz = player.fire_target_z - player.z
-            ray_len = math.sqrt(dx * dx + dz * dz)
-            if ray_len < 0.1:
-                continue
-            ndx = dx / ray_len
-            ndz = dz / ray_len
-            for other in self.players.values():
-                if other.id == player.id or not other.alive:
-                    continue
-                to_x = other.x - player.x
-                to_z = other.z - player.z
-                t = to_x * ndx + to_z * ndz
-                if t < 0 or t > LASER_RANGE:
-                    continue
-                closest_x = player.x + ndx * t
-                closest_z = player.z + ndz * t
-                dist = math.sqrt((other.x - closest_x) ** 2 + (other.z - closest_z) ** 2)
-                if dist < SHIP_RADIUS * 2.5:
-                    self._apply_damage(other, LASER_DAMAGE * dt, player)
+            # Movement is integrated for all ships in the movement phase
+            movers.append(player)
 
-        # --- Missiles ---
+            # Shields, energy, hull regen and cooldowns are evaluated on
+            # read; only a laser running dry needs handling here. The
+            # tolerance absorbs rounding in the closed-form drain.
+            if player.is_firing and player.energy <= 1e-9:
+                player.is_firing = False
+
+    def _update_movement(self, dt: float):
+        # A Yamato shot can kill a ship that was already queued to move.
+        movers = [p for p in self._movers if p.alive]
+        if self.vectorized:
+            self._ships.integrate(
+                [p._slot for p in movers], dt, ARENA_SIZE, SHIP_MAX_SPEED,
+                SHIP_ACCELERATION, SHIP_DRAG, SHIP_ROTATION_SPEED, dt * TICK_RATE, SHIP_REST_SPEED,
+            )
+        else:
+            for player in movers:
+                self._move_player(player, dt)
+
+    def _update_lasers(self, dt: float):
+        self._rewind_cache.clear()
+        shooters = [p for p in self.players.values() if p.alive and p.is_firing]
+        if len(shooters) >= LASER_BATCH_MIN_SHOOTERS:
+            self._fire_lasers_batched(shooters, dt)
+        else:
+            self._fire_lasers(shooters, dt)
+
+    def _update_missiles(self, dt: float):
         missiles_to_remove = []
         for missile in self.missiles:
             if not missile.alive:
@@ -840,10 +1642,10 @@ class GameRoom:
                 missile.x += (mdx / dist) * MISSILE_SPEED * dt
                 missile.z += (mdz / dist) * MISSILE_SPEED * dt
         for m in missiles_to_remove:
-            if m in self.missiles:
-                self.missiles.remove(m)
+            if self.missiles.discard(m):
+                self._missile_pool.release(m)
 
-        # --- Bombardment Zones ---
+    def _update_zones(self, dt: float):
         zones_to_remove = []
         for zone in self.bombardment_zones:
             if zone.exploded:
@@ -853,19 +1655,14 @@ class GameRoom:
             if zone.timer <= 0:
                 zone.exploded = True
                 owner = self.players.get(zone.owner_id)
-                for player in self.players.values():
-                    if player.id == zone.owner_id or not player.alive:
-                        continue
-                    dist = math.sqrt((player.x - zone.x) ** 2 + (player.z - zone.z) ** 2)
-                    if dist < zone.radius:
-                        self._apply_damage(player, BOMBARDMENT_DAMAGE, owner)
+                for player in self._spatial_index().query_radius(zone.x, zone.z, zone.radius, exclude_id=zone.owner_id):
+                    self._apply_damage(player, BOMBARDMENT_DAMAGE, owner)
                 self.effects.append({"type": "bombardment_explode", "x": zone.x, "z": zone.z, "radius": zone.radius})
                 zones_to_remove.append(zone)
         for z in zones_to_remove:
-            if z in self.bombardment_zones:
-                self.bombardment_zones.remove(z)
+            self.bombardment_zones.discard(z)
 
-        # --- Spore Clouds ---
+    def _update_clouds(self, dt: float):
         clouds_to_remove = []
         for cloud in self.spore_clouds:
             cloud.timer -= dt
@@ -873,19 +1670,14 @@ class GameRoom:
                 clouds_to_remove.append(cloud)
                 continue
             # Apply slow effect to enemies in cloud
-            for player in self.players.values():
-                if player.id == cloud.owner_id or not player.alive:
-                    continue
-                dist = math.sqrt((player.x - cloud.x) ** 2 + (player.z - cloud.z) ** 2)
-                if dist < cloud.radius:
-                    player.slow_timer = 0.5  # Refreshes while in cloud
-                    player.slow_amount = SPORE_CLOUD_SLOW_PCT
-                    player.in_spore_cloud = True
+            for player in self._spatial_index().query_radius(cloud.x, cloud.z, cloud.radius, exclude_id=cloud.owner_id):
+                player.slow_timer = 0.5  # Refreshes while in cloud
+                player.slow_amount = SPORE_CLOUD_SLOW_PCT
+                player.in_spore_cloud = True
         for c in clouds_to_remove:
-            if c in self.spore_clouds:
-                self.spore_clouds.remove(c)
+            self.spore_clouds.discard(c)
 
-        # --- Mutalisks (AI-controlled) ---
+    def _update_mutalisks(self, dt: float):
         mutalisks_to_remove = []
         for mutalisk in self.mutalisks:
             if not mutalisk.alive:
@@ -898,15 +1690,7 @@ class GameRoom:
                 self.effects.append({"type": "mutalisk_death", "x": mutalisk.x, "z": mutalisk.z})
                 continue
             # Find nearest enemy
-            nearest = None
-            nearest_dist = float('inf')
-            for p in self.players.values():
-                if p.id == mutalisk.owner_id or not p.alive:
-                    continue
-                d = math.sqrt((p.x - mutalisk.x) ** 2 + (p.z - mutalisk.z) ** 2)
-                if d < nearest_dist:
-                    nearest = p
-                    nearest_dist = d
+            nearest = self._spatial_index().nearest(mutalisk.x, mutalisk.z, exclude_id=mutalisk.owner_id)
             if nearest:
                 # Move toward target
                 mdx = nearest.x - mutalisk.x
@@ -928,27 +1712,150 @@ class GameRoom:
                             "targetX": nearest.x, "targetZ": nearest.z
                         })
         for m in mutalisks_to_remove:
-            if m in self.mutalisks:
-                self.mutalisks.remove(m)
+            if self.mutalisks.discard(m):
+                self._mutalisk_pool.release(m)
+
+    def _move_player(self, player: Player, dt: float):
+        # Thrust, drag and velocity are tuned per tick at TICK_RATE; other
+        # simulation rates scale them so ships fly the same in seconds
+        step = dt * TICK_RATE
+        if player.has_move_target and not player.is_channeling:
+            dx = player.move_target_x - player.x
+            dz = player.move_target_z - player.z
+            dist_to_target = math.sqrt(dx * dx + dz * dz)
+            if dist_to_target > 2.0:
+                desired_angle = math.atan2(dx, dz)
+                angle_diff = desired_angle - player.rotation
+                while angle_diff > math.pi:
+                    angle_diff -= 2 * math.pi
+                while angle_diff < -math.pi:
+                    angle_diff += 2 * math.pi
+                rotation_amount = SHIP_ROTATION_SPEED * dt
+                if abs(angle_diff) < rotation_amount:
+                    player.rotation = desired_angle
+                else:
+                    player.rotation += rotation_amount * (1 if angle_diff > 0 else -1)
+                player.rotation = player.rotation % (2 * math.pi)
+                # Apply slow reduction if affected
+                accel = SHIP_ACCELERATION * step
+                if player.slow_amount > 0:
+                    accel *= (1 - player.slow_amount)
+                thrust_x = math.sin(player.rotation) * accel
+                thrust_z = math.cos(player.rotation) * accel
+                player.vx += thrust_x
+                player.vz += thrust_z
+            else:
+                player.has_move_target = False
 
-    def _find_nearest_enemy_for_missile(self, missile: Missile) -> Optional[Player]:
-        nearest = None
-        nearest_dist = float('inf')
-        for p in self.players.values():
-            if p.id == missile.owner_id or not p.alive:
+        # Drag
+        drag = SHIP_DRAG ** step
+        player.vx *= drag
+        player.vz *= drag
+        # Apply max speed with slow reduction
+        max_speed = SHIP_MAX_SPEED
+        if player.slow_amount > 0:
+            max_speed *= (1 - player.slow_amount)
+        speed = math.sqrt(player.vx ** 2 + player.vz ** 2)
+        if speed > max_speed:
+            player.vx = (player.vx / speed) * max_speed
+            player.vz = (player.vz / speed) * max_speed
+        elif speed < SHIP_REST_SPEED and not player.has_move_target:
+            player.vx = 0.0
+            player.vz = 0.0
+
+        # Position
+        player.x += player.vx * step
+        player.z += player.vz * step
+        if abs(player.x) > ARENA_SIZE:
+            player.x = max(-ARENA_SIZE, min(ARENA_SIZE, player.x))
+            player.vx *= -0.5
+        if abs(player.z) > ARENA_SIZE:
+            player.z = max(-ARENA_SIZE, min(ARENA_SIZE, player.z))
+            player.vz *= -0.5
+
+    def _fire_lasers(self, shooters: List[Player], dt: float):
+        for player in shooters:
+            # An earlier shooter may have killed this one
+            if not player.alive or not player.is_firing:
                 continue
-            d = math.sqrt((p.x - missile.x) ** 2 + (p.z - missile.z) ** 2)
-            if d < nearest_dist:
-                nearest = p
-                nearest_dist = d
-        return nearest
+            dx = player.fire_target_x - player.x
+            dz = player.fire_target_z - player.z
+            ray_len = math.sqrt(dx * dx + dz * dz)
+            if ray_len < 0.1:
+                continue
+            rewound = self._rewound_targets(self.tick - player.view_lag) if player.view_lag is not None else None
+            if rewound is not None:
+                # Against the ships where this pilot saw them; the same
+                # arithmetic as the batched path
+                targets, target_x, target_z = rewound
+                hit = laser_hit_matrix(
+                    np.array([player.x]), np.array([player.z]),
+                    np.array([player.fire_target_x]), np.array([player.fire_target_z]),
+                    target_x, target_z, LASER_RANGE, LASER_HIT_WIDTH,
+                )[0].tolist()
+                hits = [t for t, h in zip(targets, hit) if h and t is not player]
+            else:
+                ndx = dx / ray_len
+                ndz = dz / ray_len
+                hits = self._spatial_index().query_segment(
+                    player.x, player.z, ndx, ndz, LASER_RANGE, LASER_HIT_WIDTH, exclude_id=player.id
+                )
+            for other in hits:
+                self._apply_damage(other, LASER_DAMAGE * dt, player)
+
+    def _fire_lasers_batched(self, shooters: List[Player], dt: float):
+        # Hit-scan all shooters against all live ships in one matrix pass,
+        # then apply damage in the same order as the per-shooter loop.
+        targets = [p for p in self.players.values() if p.alive]
+        column = {p.id: i for i, p in enumerate(targets)}
+        if self.vectorized:
+            target_slots = np.fromiter((p._slot for p in targets), dtype=np.intp, count=len(targets))
+            target_x = self._ships.data[X, target_slots]
+            target_z = self._ships.data[Z, target_slots]
+        else:
+            target_x = np.fromiter((p.x for p in targets), dtype=np.float64, count=len(targets))
+            target_z = np.fromiter((p.z for p in targets), dtype=np.float64, count=len(targets))
+        shooter_cols = np.fromiter((column[p.id] for p in shooters), dtype=np.intp, count=len(shooters))
+        origin_x = target_x[shooter_cols]
+        origin_z = target_z[shooter_cols]
+        aim_x = np.fromiter((p.fire_target_x for p in shooters), dtype=np.float64, count=len(shooters))
+        aim_z = np.fromiter((p.fire_target_z for p in shooters), dtype=np.float64, count=len(shooters))
+        hits = laser_hit_matrix(origin_x, origin_z, aim_x, aim_z, target_x, target_z, LASER_RANGE, LASER_HIT_WIDTH)
+        # Lag-compensated shooters are redone against the rewound ships,
+        # one matrix per lag
+        lagged: Dict[int, List[int]] = {}
+        for s, shooter in enumerate(shooters):
+            if shooter.view_lag is not None:
+                lagged.setdefault(shooter.view_lag, []).append(s)
+        for lag, rows in lagged.items():
+            rewound = self._rewound_targets(self.tick - lag)
+            if rewound is None:
+                continue
+            rewound_targets, rewound_x, rewound_z = rewound
+            rows = np.array(rows, dtype=np.intp)
+            cols = np.fromiter((column[p.id] for p in rewound_targets), dtype=np.intp, count=len(rewound_targets))
+            hits[rows] = False
+            hits[np.ix_(rows, cols)] = laser_hit_matrix(
+                origin_x[rows], origin_z[rows], aim_x[rows], aim_z[rows],
+                rewound_x, rewound_z, LASER_RANGE, LASER_HIT_WIDTH,
+            )
+        hits[np.arange(len(shooters)), shooter_cols] = False
+
+        damage = LASER_DAMAGE * dt
+        for s, t in zip(*np.nonzero(hits)):
+            shooter = shooters[s]
+            if shooter.alive and shooter.is_firing:
+                self._apply_damage(targets[t], damage, shooter)
+
+    def _find_nearest_enemy_for_missile(self, missile: Missile) -> Optional[Player]:
+        return self._spatial_index().nearest(missile.x, missile.z, exclude_id=missile.owner_id)
 
     def _apply_damage(self, target: Player, damage: float, attacker: Optional[Player] = None):
         if not target.alive:
             return
 
         # Track last damage time for Leviathan Bio-Regen
-        target.last_damage_time = self.current_time
+        target.mark_damaged()
 
         # Dreadnought passive: Reinforced Hull - 15% damage reduction
         damage *= (1 - target.damage_reduction)
@@ -962,7 +1869,6 @@ class GameRoom:
             target.shields -= shield_dmg
             damage -= shield_dmg
             if target.shields <= 0:
-                target.shield_broken = True
                 target.shield_regen_timer = SHIELD_REGEN_DELAY
         if damage > 0:
             target.hull -= damage
@@ -972,6 +1878,7 @@ class GameRoom:
             target.respawn_timer = RESPAWN_TIME
             target.deaths += 1
             target.is_firing = False
+            target.pause_timers()
             target.is_channeling = False
             target.channel_target_id = None
             target.repair_bots_timer = 0
@@ -983,47 +1890,291 @@ class GameRoom:
             self.effects.append({"type": "explosion", "x": target.x, "z": target.z, "size": "large"})
             self.effects.append({"type": "kill", "killer": attacker.name if attacker else "Unknown", "victim": target.name})
 
-    async def _broadcast_state(self):
+    def step(self, inputs=()) -> dict:
+        """Advance one tick on the virtual clock without any I/O.
+
+        ``inputs`` are ``(player_id, message)`` pairs in the same format the
+        websocket handler queues. Returns the state message a client would
+        have received for this tick, effects included.
+        """
+        for player_id, msg in inputs:
+            self.queue_message(player_id, msg)
+        self._simulate_tick()
+        return self._state_message()
+
+    def _live_entities(self) -> tuple:
+        """Players, missiles, zones, clouds and mutalisks a snapshot lists,
+        in the order of the state message collections."""
+        return (
+            list(self.players.values()),
+            [m for m in self.missiles if m.alive],
+            [b for b in self.bombardment_zones if not b.exploded],
+            list(self.spore_clouds),
+            [m for m in self.mutalisks if m.alive],
+        )
+
+    def _state_message(self, live: Optional[tuple] = None) -> dict:
+        players, missiles, bombardments, clouds, mutalisks = live or self._live_entities()
         state = {
             "type": "state",
             "tick": self.tick,
-            "players": [p.to_dict() for p in self.players.values()],
-            "missiles": [m.to_dict() for m in self.missiles if m.alive],
-            "bombardments": [b.to_dict() for b in self.bombardment_zones if not b.exploded],
-            "sporeClouds": [c.to_dict() for c in self.spore_clouds],
-            "mutalisks": [m.to_dict() for m in self.mutalisks if m.alive],
+            "players": [p.to_dict() for p in players],
+            "missiles": [m.to_dict() for m in missiles],
+            "bombardments": [b.to_dict() for b in bombardments],
+            "sporeClouds": [c.to_dict() for c in clouds],
+            "mutalisks": [m.to_dict() for m in mutalisks],
             "effects": self.effects.copy(),
         }
         self.effects.clear()
-        state_json = json.dumps(state)
-        disconnected = []
-        # Create a copy of connections to avoid dictionary changed size during iteration
+        return state
+
+    def _snapshot_due(self) -> bool:
+        """Whether the ticks run since the last broadcast crossed a snapshot
+        boundary; snapshots fall on multiples of ``ticks_per_snapshot``."""
+        last = self._last_broadcast_tick
+        return last is None or self.tick // self.ticks_per_snapshot != last // self.ticks_per_snapshot
+
+    def _send_due(self, player_id: str) -> bool:
+        divisor = self._send_divisors.get(player_id)
+        if divisor is None:
+            return True
+        last = self._last_sent.get(player_id)
+        # Aligned to the room's ticks, so connections at the same rate are
+        # sent together and share their encoded messages
+        period = divisor * self.ticks_per_snapshot
+        return last is None or self.tick // period != last // period
+
+    def _effects_since(self, tick: int) -> List[dict]:
+        return [e for t, batch in self._effect_log if t > tick for e in batch]
+
+    def _broadcast_state(self):
+        """Encode this snapshot's messages and queue them on the writers of
+        the connections due a send. Never waits on a socket; a slow client
+        only delays itself."""
+        metrics = self.metrics
         connections_copy = dict(self.connections)
-        for player_id, ws in connections_copy.items():
-            try:
-                await ws.send_text(state_json)
-            except Exception:
-                disconnected.append(player_id)
+        start = time.perf_counter()
+        live = self._live_entities()
+        due = {pid: ws for pid, ws in connections_copy.items() if self._send_due(pid)}
+        # Binary frames are encoded straight from the game objects, so the
+        # state dicts are only built when a JSON client needs them
+        if not due or any(pid not in self._binary_connections for pid in due):
+            state = self._state_message(live)
+            effects = state["effects"]
+        else:
+            state = None
+            effects = self.effects.copy()
+            self.effects.clear()
+        previous = self._last_broadcast_tick
+        self._effect_log.append((self.tick, effects))
+        self._last_broadcast_tick = self.tick
+        # Connections last sent at the same tick are owed the same effects
+        groups: Dict[Optional[int], dict] = {}
+        for player_id, ws in due.items():
+            groups.setdefault(self._last_sent.get(player_id), {})[player_id] = ws
+            self._last_sent[player_id] = self.tick
+        batches = [
+            (group, effects if last is None or last == previous else self._effects_since(last))
+            for last, group in groups.items()
+        ]
+        built = time.perf_counter()
+        outgoing, encoded_bytes = self._encode_messages(batches, live, state)
+        encoded = time.perf_counter()
+        metrics.observe("snapshot", built - start)
+        metrics.observe("encode", encoded - built)
+        disconnected = set()
+        for player_id, message, key, message_effects in outgoing:
+            writer = self._writer(player_id, connections_copy[player_id])
+            if writer.closed:
+                # Its socket failed, or it fell too far behind
+                disconnected.add(player_id)
+            else:
+                writer.enqueue(message, key, message_effects)
+        metrics.observe("send", time.perf_counter() - encoded)
+        metrics.record_snapshot(encoded_bytes, len(effects), len(connections_copy))
         for player_id in disconnected:
             self.remove_player(player_id)
 
+    def _interest_views(self, connections: dict, live: tuple, effects: List[dict]) -> dict:
+        """``{player_id: (indices per collection, effects)}`` for the
+        connections that only see their area of interest."""
+        viewers = [pid for pid in connections if pid in self._interest_players and pid in self.players]
+        if not viewers:
+            return {}
+        ships = [self.players[pid] for pid in viewers]
+        masks = visibility(np.array([(s.x, s.z) for s in ships]), live)
+        # Visible column indices of every row, split from one nonzero() per collection
+        rows_bounds = np.arange(len(viewers) + 1)
+        per_collection = []
+        for mask in masks:
+            rows, cols = mask.nonzero()
+            bounds = np.searchsorted(rows, rows_bounds).tolist()
+            cols = cols.tolist()
+            per_collection.append([cols[bounds[r]:bounds[r + 1]] for r in range(len(viewers))])
+        return {
+            pid: ([indices[row] for indices in per_collection],
+                  relevant_effects(effects, pid, ship.x, ship.z, self.players))
+            for row, (pid, ship) in enumerate(zip(viewers, ships))
+        }
+
+    def _encode_messages(self, batches: List[tuple], live: tuple, state: Optional[dict]) -> tuple:
+        """Encode the messages of one broadcast: ``([(player_id, message,
+        key, effects)], distinct encoded bytes)``, where ``key`` and
+        ``effects`` are what the connection writer needs to drop it.
+
+        ``batches`` are ``(connections, effects)`` pairs: connections owed
+        the same effects. Shared messages are encoded once per batch: the
+        full state for plain connections and keyframes, one delta per
+        acknowledged baseline, one binary frame. Area-of-interest
+        connections each get their own, joined from entities serialized
+        once per broadcast.
+        """
+        binary = self._binary_connections
+        shared_history = self._snapshot_history
+        minimap_text = None
+        records = None
+        fragments = None
+        encoded_bytes = 0
+        outgoing = []
+        for connections, effects in batches:
+            views = self._interest_views(connections, live, effects)
+            batch_state = state if state is None or effects is state["effects"] else dict(state, effects=effects)
+            state_json = None
+            frame = None
+            deltas: Dict[int, str] = {}
+            for player_id in connections:
+                view = views.get(player_id)
+                if view is not None:
+                    indices, view_effects = view
+                    last_minimap = self._minimap_ticks.get(player_id)
+                    if last_minimap is None or self.tick - last_minimap >= self._minimap_interval:
+                        if minimap_text is None:
+                            minimap_text = json.dumps(minimap_message(self.tick, live[0]))
+                            encoded_bytes += len(minimap_text)
+                        outgoing.append((player_id, minimap_text, MINIMAP, None))
+                        self._minimap_ticks[player_id] = self.tick
+                roster_version = binary.get(player_id)
+                if roster_version is not None:
+                    if roster_version != self._roster.version:
+                        outgoing.append((player_id, self._roster.message(), None, None))
+                        binary[player_id] = self._roster.version
+                    if records is None:
+                        records = _snapshot_codec.records(*live, self._roster)
+                    if view is not None:
+                        message = _snapshot_codec.frame(
+                            self.tick, [[r[i] for i in idx] for r, idx in zip(records, indices)],
+                            view_effects, self._roster)
+                        encoded_bytes += len(message)
+                    else:
+                        if frame is None:
+                            frame = _snapshot_codec.frame(self.tick, records, effects, self._roster)
+                            encoded_bytes += len(frame)
+                        message = frame
+                    outgoing.append((player_id, message, STATE, effects if view is None else view_effects))
+                    continue
+
+                channel = self._delta_channels.get(player_id)
+                if view is not None:
+                    # Culled states differ per connection, and so do baselines
+                    if channel is not None:
+                        if channel.history is None:
+                            channel.history = SnapshotHistory()
+                        view_state = {"type": "state", "tick": self.tick}
+                        for key, idx in zip(DELTA_COLLECTIONS, indices):
+                            items = state[key]
+                            view_state[key] = [items[i] for i in idx]
+                        view_state["effects"] = view_effects
+                        base = channel.baseline(self.tick, channel.history)
+                        channel.history.add(view_state)
+                    else:
+                        base = None
+                    if base is None:
+                        if fragments is None:
+                            fragments = [[json.dumps(d) for d in state[key]] for key in DELTA_COLLECTIONS]
+                        text = encode_view(self.tick, fragments, indices, view_effects)
+                        if channel is not None:
+                            channel.last_keyframe_tick = self.tick
+                    else:
+                        text = json.dumps(encode_delta(channel.history[base], view_state))
+                    # json.dumps escapes to ASCII, so characters are bytes
+                    encoded_bytes += len(text)
+                else:
+                    base = channel.baseline(self.tick, shared_history) if channel is not None else None
+                    if base is None:
+                        if state_json is None:
+                            state_json = json.dumps(batch_state)
+                            encoded_bytes += len(state_json)
+                        text = state_json
+                        if channel is not None:
+                            channel.last_keyframe_tick = self.tick
+                    else:
+                        text = deltas.get(base)
+                        if text is None:
+                            text = deltas[base] = json.dumps(encode_delta(shared_history[base], batch_state))
+                            encoded_bytes += len(text)
+                outgoing.append((player_id, text, STATE, effects if view is None else view_effects))
+        if state is not None and any(c.history is None for c in self._delta_channels.values()):
+            shared_history.add(state)
+        return outgoing, encoded_bytes
+
+
+_snapshot_codec = SnapshotCodec(ARENA_SIZE)
+
 
 class RoomManager:
-    def __init__(self):
+    def __init__(self, replay_dir: Optional[str] = None, tick_budget: float = TICK_BUDGET, **room_options):
         self.rooms: Dict[str, GameRoom] = {}
+        # Keyword arguments passed to every GameRoom this manager creates
+        self.room_options = room_options
+        # Directory every room records a replay to, if any
+        self.replay_dir = replay_dir
+        # Metrics of rooms that closed or moved away, so totals stay monotonic
+        self.retired_metrics = RoomMetrics()
+        # Runs the game loops of all of this manager's rooms
+        self.scheduler = TickScheduler(tick_budget)
 
     def get_or_create_room(self, room_id: str = "default") -> GameRoom:
         if room_id not in self.rooms:
-            room = GameRoom(room_id)
+            room = GameRoom(room_id, **self.room_options)
             self.rooms[room_id] = room
-            room.start()
+            self._record(room)
+            room.start(self.scheduler)
         return self.rooms[room_id]
 
+    def _record(self, room: GameRoom):
+        if self.replay_dir is not None:
+            name = re.sub(r"[^A-Za-z0-9_-]", "_", room.id)
+            room.start_recording(os.path.join(self.replay_dir, f"{name}-{int(time.time() * 1000)}.replay"))
+
+    def export_room(self, room_id: str) -> bytes:
+        """Stop a room and take it out of this manager, returning its snapshot."""
+        room = self.rooms.pop(room_id)
+        room.stop()
+        self.retired_metrics.merge(room.metrics, gauges=False)
+        return room.snapshot()
+
+    def import_room(self, data: bytes, connections: Optional[dict] = None) -> GameRoom:
+        """Resume a room exported by another manager, possibly in another process."""
+        room = GameRoom.from_snapshot(data, **self.room_options)
+        if room.id in self.rooms:
+            raise ValueError(f"Room {room.id} already exists")
+        room.connections.update(connections or {})
+        self.rooms[room.id] = room
+        self._record(room)
+        room.start(self.scheduler)
+        return room
+
     def remove_empty_rooms(self):
-        empty = [rid for rid, room in self.rooms.items() if not room.players]
+        # A room with spectators but no players keeps running for them
+        empty = [rid for rid, room in self.rooms.items() if not room.players and not room.connections]
         for rid in empty:
             self.rooms[rid].stop()
+            self.retired_metrics.merge(self.rooms[rid].metrics, gauges=False)
             del self.rooms[rid]
 
+    def metric_series(self) -> list:
+        """``(room_id, metrics, tick_stats)`` for every room, as metrics.render expects."""
+        return [(room.id, room.metrics, room.tick_stats.raw()) for room in self.rooms.values()]
+
 
 room_manager = RoomManager()
@@ -0,0 +1,77 @@
+"""Headless, deterministic match simulation.
+
+A ``HeadlessEngine`` drives one ``GameRoom`` on its virtual clock with no
+event loop and no sockets. Given the same seed, player list and inputs it
+produces the same snapshots on every run, so matches can be replayed and
+hours of gameplay simulated in seconds for tests and balance tuning.
+"""
+
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from game_engine import GameRoom
+
+Inputs = Iterable[Tuple[str, dict]]
+
+
+class HeadlessEngine:
+    def __init__(self, seed: int = 0, room_id: str = "headless", **room_options):
+        self.room = GameRoom(room_id, seed=seed, **room_options)
+        self._next_player = 0
+
+    @property
+    def tick(self) -> int:
+        return self.room.tick
+
+    @property
+    def time(self) -> float:
+        return self.room.current_time
+
+    def add_player(self, name: Optional[str] = None, ship_class: str = "vanguard",
+                   player_id: Optional[str] = None) -> str:
+        """Add a ship and return its id; ids default to p0, p1, ..."""
+        if player_id is None:
+            player_id = f"p{self._next_player}"
+            while player_id in self.room.players:
+                self._next_player += 1
+                player_id = f"p{self._next_player}"
+            self._next_player += 1
+        self.room.add_player(player_id, name or player_id, None, ship_class)
+        return player_id
+
+    def remove_player(self, player_id: str):
+        self.room.remove_player(player_id)
+
+    def step(self, inputs: Inputs = ()) -> dict:
+        """Advance one tick and return the state message for it."""
+        return self.room.step(inputs)
+
+    def run(self, ticks: int, inputs: Optional[Callable[["HeadlessEngine"], Inputs]] = None,
+            on_state: Optional[Callable[[dict], None]] = None) -> dict:
+        """Advance ``ticks`` ticks, asking ``inputs`` for each tick's messages.
+
+        Returns the last state; ``on_state`` sees every one of them.
+        """
+        state = None
+        for _ in range(ticks):
+            state = self.room.step(inputs(self) if inputs else ())
+            if on_state:
+                on_state(state)
+        return state
+
+    def run_for(self, seconds: float, inputs: Optional[Callable[["HeadlessEngine"], Inputs]] = None,
+                on_state: Optional[Callable[[dict], None]] = None) -> dict:
+        """Advance ``seconds`` of game time; see ``run``."""
+        return self.run(int(round(seconds / self.room.tick_interval)), inputs, on_state)
+
+    def snapshot(self) -> bytes:
+        return self.room.snapshot()
+
+    @classmethod
+    def from_snapshot(cls, data: bytes, **room_options) -> "HeadlessEngine":
+        engine = cls.__new__(cls)
+        engine.room = GameRoom.from_snapshot(data, **room_options)
+        engine._next_player = 0
+        return engine
+
+    def players(self) -> List[str]:
+        return list(self.room.players)
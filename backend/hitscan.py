@@ -0,0 +1,29 @@
+import numpy as np
+
+
+def laser_hit_matrix(origin_x, origin_z, aim_x, aim_z, target_x, target_z,
+                     max_range: float, width: float) -> np.ndarray:
+    """Resolve every shooter ray against every target position at once.
+
+    Shooter arrays have length S and target arrays length T; the result is
+    an (S, T) boolean matrix. The arithmetic mirrors the scalar hit test
+    step for step, so both paths agree on every hit. Rays shorter than 0.1
+    (aiming at your own ship) never hit.
+    """
+    dx = aim_x - origin_x
+    dz = aim_z - origin_z
+    ray_len = np.sqrt(dx * dx + dz * dz)
+    valid = ray_len >= 0.1
+    safe_len = np.where(valid, ray_len, 1.0)
+    ndx = (dx / safe_len)[:, None]
+    ndz = (dz / safe_len)[:, None]
+    ox = origin_x[:, None]
+    oz = origin_z[:, None]
+    tx = target_x[None, :]
+    tz = target_z[None, :]
+
+    t = (tx - ox) * ndx + (tz - oz) * ndz
+    closest_x = ox + ndx * t
+    closest_z = oz + ndz * t
+    dist = np.sqrt((tx - closest_x) ** 2 + (tz - closest_z) ** 2)
+    return valid[:, None] & (t >= 0) & (t <= max_range) & (dist < width)
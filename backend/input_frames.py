@@ -0,0 +1,113 @@
+"""Batched client input frames.
+
+Clients send everything they have for a render frame in one websocket
+frame, with a sequence number, instead of one frame per mouse event.
+Frames come in two forms:
+
+Binary (the client's default)::
+
+    header      sequence number, acked snapshot tick or 0 (HEADER)
+    commands    COMMAND records: op, ability key, flags, x, z
+
+The acked tick is the latest snapshot the client has received, which is
+also the one its aim is judged against (see lag_compensation.py).
+
+Every command has the same 12-byte record, so a frame decodes with one
+``struct.iter_unpack`` call and no parsing. An ability's x and z are only
+meaningful with the ``TARGETED`` flag; without it the ability decodes
+with no coordinates and goes off at the ship, as in the JSON form.
+
+JSON, for tools and tests, is a single array ``[seq, message, message,
+...]`` of the messages the one-per-frame protocol sends. A bare message
+object is still accepted as a frame of its own, without a sequence
+number.
+
+The frontend encoder lives in frontend/src/lib/inputFrames.js.
+"""
+
+import json
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+HEADER = struct.Struct("<II")
+COMMAND = struct.Struct("<BBBxff")
+
+# Command ops of the binary form
+MOVE = 1
+FIRE_START = 2
+FIRE_STOP = 3
+FIRE_AIM = 4
+ABILITY = 5
+
+# Command flags
+TARGETED = 1
+
+OPS = {"move": MOVE, "fire_start": FIRE_START, "fire_stop": FIRE_STOP, "fire_aim": FIRE_AIM, "ability": ABILITY}
+
+
+def decode_frame(data) -> Tuple[Optional[int], Optional[int], List[dict]]:
+    """Sequence number (None for a bare message), acked tick and messages.
+
+    Acks are split off from the simulation inputs, since the room applies
+    them at once. Raises ValueError for anything malformed; commands with
+    unknown ops are skipped.
+    """
+    if isinstance(data, str):
+        return _decode_json(data)
+    try:
+        seq, ack = HEADER.unpack_from(data)
+        records = struct.iter_unpack(COMMAND.format, memoryview(data)[HEADER.size:])
+        messages = []
+        for op, key, flags, x, z in records:
+            if op == MOVE:
+                messages.append({"type": "move", "x": x, "z": z})
+            elif op == FIRE_AIM:
+                messages.append({"type": "fire_aim", "x": x, "z": z})
+            elif op == FIRE_START:
+                messages.append({"type": "fire_start", "x": x, "z": z})
+            elif op == FIRE_STOP:
+                messages.append({"type": "fire_stop"})
+            elif op == ABILITY:
+                if flags & TARGETED:
+                    messages.append({"type": "ability", "id": chr(key), "x": x, "z": z})
+                else:
+                    messages.append({"type": "ability", "id": chr(key)})
+    except struct.error as e:
+        raise ValueError(f"bad input frame: {e}") from None
+    return seq, ack or None, messages
+
+
+def _decode_json(text: str) -> Tuple[Optional[int], Optional[int], List[dict]]:
+    frame = json.loads(text)
+    if isinstance(frame, dict):
+        seq, frame = None, [frame]
+    elif isinstance(frame, list) and frame and isinstance(frame[0], int):
+        seq, frame = frame[0], frame[1:]
+    else:
+        raise ValueError("input frame must be [seq, message, ...]")
+    ack = None
+    messages = []
+    for message in frame:
+        if not isinstance(message, dict):
+            raise ValueError("input frame messages must be objects")
+        if message.get("type") != "ack":
+            messages.append(message)
+        elif isinstance(message.get("tick"), int):
+            ack = message["tick"] if ack is None else max(ack, message["tick"])
+    return seq, ack, messages
+
+
+def encode_frame(seq: int, messages: Iterable[dict]) -> bytes:
+    """The binary frame for ``messages``; an ack among them goes in the header."""
+    ack = 0
+    commands = []
+    for message in messages:
+        msg_type = message.get("type")
+        if msg_type == "ack":
+            ack = message["tick"]
+        elif msg_type in OPS:
+            key = message.get("id", "\0") if msg_type == "ability" else "\0"
+            flags = TARGETED if "x" in message else 0
+            commands.append(COMMAND.pack(OPS[msg_type], ord(key), flags,
+                                         message.get("x", 0.0), message.get("z", 0.0)))
+    return HEADER.pack(seq, ack) + b"".join(commands)
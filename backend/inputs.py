@@ -0,0 +1,154 @@
+"""Per-player input buffering between ticks.
+
+Clients send ``move`` and ``fire_aim`` on every mouse move, many times per
+tick. They only set the player's move and aim targets, so only the last
+of each matters: a new one overwrites the previous one queued by the same
+player, in place, unless a message it must not jump ahead of came in
+between (any ability press; ``fire_start`` and ``fire_stop`` for aims).
+Everything else is kept in order, and each player ends up with a few
+messages per tick.
+
+Each player also has a token bucket, refilled on the room's simulation
+clock, and at most ``MAX_QUEUED_INPUTS`` messages per tick; anything over
+either is dropped, so a misbehaving client cannot grow the queue. Batched
+frames (see input_frames.py) carry sequence numbers, and a frame that is
+not newer than the last one seen from the player is dropped whole.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Message types where only the latest one per tick counts
+COALESCED = ("move", "fire_aim")
+# Messages that set the aim themselves; a later aim must stay after them.
+# Anything else (ability presses) keeps every message after it in place.
+AIM_BARRIERS = ("fire_start", "fire_stop")
+
+# Messages per second a player may send, sustained and in a burst
+INPUT_RATE = 120.0
+INPUT_BURST = 240.0
+# Messages one player may have queued for a single tick
+MAX_QUEUED_INPUTS = 32
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class _PlayerInputs:
+    __slots__ = ("bucket", "seq", "queued", "slots")
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        # Sequence number of the last input frame taken
+        self.seq = -1
+        # Messages queued for this tick
+        self.queued = 0
+        # Queue index of this tick's coalescable messages, by type, since
+        # the last order-sensitive one
+        self.slots: Dict[str, int] = {}
+
+
+class InputQueue:
+    """Inputs for the next tick, in arrival order across players."""
+
+    def __init__(self, clock: Callable[[], float], metrics=None, rate: float = INPUT_RATE,
+                 burst: float = INPUT_BURST, max_queued: int = MAX_QUEUED_INPUTS):
+        self.clock = clock
+        # RoomMetrics credited with coalesced and dropped inputs, if any
+        self.metrics = metrics
+        self.rate = rate
+        self.burst = burst
+        self.max_queued = max_queued
+        self.messages: List[Tuple[str, dict]] = []
+        self._players: Dict[str, _PlayerInputs] = {}
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def push(self, player_id: str, message: dict) -> bool:
+        """Queue ``message``; False if it was dropped."""
+        now = self.clock()
+        return self._push(self._player(player_id, now), player_id, message, now)
+
+    def push_frame(self, player_id: str, seq: Optional[int], messages: List[dict]) -> bool:
+        """Queue the messages of one input frame; False if it was stale.
+
+        ``seq`` must be newer than the player's last frame, or the whole
+        frame is dropped; a frame without one (None) is always taken.
+        """
+        now = self.clock()
+        player = self._player(player_id, now)
+        if seq is not None:
+            if seq <= player.seq:
+                if self.metrics is not None:
+                    self.metrics.inputs_dropped += len(messages)
+                return False
+            player.seq = seq
+        for message in messages:
+            self._push(player, player_id, message, now)
+        return True
+
+    def drain(self) -> List[Tuple[str, dict]]:
+        """Take this tick's messages and start the next tick's buffer."""
+        messages = self.messages
+        self.messages = []
+        for player in self._players.values():
+            player.queued = 0
+            player.slots.clear()
+        return messages
+
+    def restore(self, messages: List[Tuple[str, dict]]):
+        """Put back messages from a room snapshot; they are not coalesced further."""
+        self.messages = list(messages)
+
+    def remove(self, player_id: str):
+        self._players.pop(player_id, None)
+
+    def _push(self, player: _PlayerInputs, player_id: str, message: dict, now: float) -> bool:
+        if not player.bucket.take(now):
+            return self._drop()
+        msg_type = message.get("type")
+        if msg_type in COALESCED:
+            index = player.slots.get(msg_type)
+            if index is not None:
+                self.messages[index] = (player_id, message)
+                if self.metrics is not None:
+                    self.metrics.inputs_coalesced += 1
+                return True
+        if player.queued >= self.max_queued:
+            return self._drop()
+        if msg_type in COALESCED:
+            player.slots[msg_type] = len(self.messages)
+        elif msg_type in AIM_BARRIERS:
+            player.slots.pop("fire_aim", None)
+        else:
+            player.slots.clear()
+        player.queued += 1
+        self.messages.append((player_id, message))
+        return True
+
+    def _player(self, player_id: str, now: float) -> _PlayerInputs:
+        player = self._players.get(player_id)
+        if player is None:
+            player = self._players[player_id] = _PlayerInputs(TokenBucket(self.rate, self.burst, now))
+        return player
+
+    def _drop(self) -> bool:
+        if self.metrics is not None:
+            self.metrics.inputs_dropped += 1
+        return False
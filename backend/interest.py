@@ -0,0 +1,104 @@
+"""Per-client area of interest.
+
+Connections that opt in (``?interest=1``) only receive the ships, missiles,
+zones, clouds and mutalisks within ``INTEREST_RADIUS`` of their own ship,
+plus the effects relevant to them. Every ``MINIMAP_INTERVAL`` ticks they
+also get a coarse position list of all live ships for the minimap:
+
+    {"type": "minimap", "tick": T, "players": [[id, x, z], ...]}
+
+Visibility is computed for all viewers at once: one distance matrix per
+broadcast over every live entity, so the cost grows with viewers times
+entities but stays in NumPy. Each entity is serialized once per broadcast
+and a connection's message is joined from the pieces it can see.
+"""
+
+import json
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from delta import COLLECTIONS
+
+# World units; the camera shows about 75 units around the ship, and the
+# longest targeted ability (Yamato) reaches 100
+INTEREST_RADIUS = 120.0
+# Ticks between minimap updates (2 Hz at 20 Hz)
+MINIMAP_INTERVAL = 10
+
+# Effect fields that name a ship and coordinate pairs that place an effect
+EFFECT_PLAYER_KEYS = ("playerId", "targetId", "ownerId")
+EFFECT_POINTS = (("x", "z"), ("startX", "startZ"), ("endX", "endZ"), ("targetX", "targetZ"))
+
+
+def visibility(viewers: np.ndarray, collections: Sequence[Sequence], radius: float = INTEREST_RADIUS) -> List[np.ndarray]:
+    """Visibility masks, one (viewers, entities) boolean array per collection.
+
+    ``viewers`` is an (n, 2) array of viewer positions; each collection is
+    a list of objects with ``x`` and ``z``.
+    """
+    sizes = [len(c) for c in collections]
+    positions = np.array([(e.x, e.z) for collection in collections for e in collection]).reshape(-1, 2)
+    dx = viewers[:, 0:1] - positions[:, 0]
+    dz = viewers[:, 1:2] - positions[:, 1]
+    visible = dx * dx + dz * dz <= radius * radius
+    return np.split(visible, np.cumsum(sizes)[:-1], axis=1)
+
+
+def relevant_effects(effects: List[dict], viewer_id: str, x: float, z: float, players: Dict,
+                     radius: float = INTEREST_RADIUS) -> List[dict]:
+    """The effects a viewer at (x, z) should see.
+
+    Effects that involve the viewer, or that happen within ``radius``, are
+    kept. Effects without any position (kills, joins) are global. An effect
+    placed only by the ships it names is as close as the nearest of them.
+    """
+    r2 = radius * radius
+    out = []
+    for effect in effects:
+        placed = False
+        near = False
+        for key in EFFECT_PLAYER_KEYS:
+            player_id = effect.get(key)
+            if player_id is None:
+                continue
+            if player_id == viewer_id:
+                near = True
+                break
+            ship = players.get(player_id)
+            if ship is not None and "x" not in effect:
+                placed = True
+                if (ship.x - x) ** 2 + (ship.z - z) ** 2 <= r2:
+                    near = True
+                    break
+        if not near:
+            for kx, kz in EFFECT_POINTS:
+                if kx in effect:
+                    placed = True
+                    if (effect[kx] - x) ** 2 + (effect[kz] - z) ** 2 <= r2:
+                        near = True
+                        break
+        if near or not placed:
+            out.append(effect)
+    return out
+
+
+def minimap_message(tick: int, players) -> dict:
+    return {
+        "type": "minimap",
+        "tick": tick,
+        "players": [[p.id, round(p.x), round(p.z)] for p in players if p.alive],
+    }
+
+
+def encode_view(tick: int, fragments: List[List[str]], indices: Sequence, effects: List[dict]) -> str:
+    """A state message joined from per-entity JSON ``fragments``.
+
+    Same text as ``json.dumps`` of the state holding only the entities at
+    ``indices`` of each collection, without encoding any of them again.
+    """
+    parts = ['{"type": "state", "tick": %d' % tick]
+    for key, items, idx in zip(COLLECTIONS, fragments, indices):
+        parts.append(', "%s": [%s]' % (key, ", ".join([items[i] for i in idx])))
+    parts.append(', "effects": %s}' % json.dumps(effects))
+    return "".join(parts)
@@ -0,0 +1,134 @@
+"""Lag compensation: where every ship was over the last few ticks.
+
+A client on a slow link aims at ships as they were in the last snapshot
+it received, which is already some ticks old when its input arrives.
+Clients report that snapshot's tick (the ack of their input frames), and
+the room evaluates laser hits and Yamato / Bio-Stasis targeting against
+the ships' positions at that tick instead of their current ones. Only the
+targets are rewound; the shooter fires from where it is now.
+
+``PositionHistory`` is a ring buffer of the last ``ticks`` ticks of ship
+positions, one column per ship. Its arrays are allocated up front and
+only grow when a join needs more columns, so recording a tick allocates
+nothing. In vectorized rooms a ship's column is its ShipArrays slot, so
+a tick is recorded with two row copies. How far back a client may reach
+is capped by the room's ``max_rewind``; a ship is only hittable in the
+past if it was alive then and already in the room.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ship_arrays import X, Z
+
+# Seconds a client's view may be rewound: beyond this, a laggy client
+# aims at where ships were this long ago
+MAX_REWIND = 0.25
+# Ship columns allocated up front; doubled as rooms fill
+INITIAL_SHIPS = 16
+
+
+class PositionHistory:
+    """Ring buffer of per-ship positions for the last ``ticks`` ticks."""
+
+    def __init__(self, ticks: int, ships: int = INITIAL_SHIPS):
+        self.ticks = ticks
+        # Tick held by each row; -1 for rows never written
+        self._row_ticks = np.full(ticks, -1, dtype=np.int64)
+        self._x = np.zeros((ticks, ships))
+        self._z = np.zeros((ticks, ships))
+        self._alive = np.zeros((ticks, ships), dtype=bool)
+        # Column of each ship, and the tick it joined at, per column
+        self._columns: Dict[str, int] = {}
+        self._since = np.zeros(ships, dtype=np.int64)
+        self._free: List[int] = list(range(ships - 1, -1, -1))
+
+    def add(self, player_id: str, tick: int, column: Optional[int] = None):
+        """Track a ship from ``tick`` on, in ``column`` if given (its
+        ShipArrays slot) or in a free one."""
+        if column is None:
+            if not self._free:
+                self._grow()
+            column = self._free.pop()
+        else:
+            while column >= len(self._since):
+                self._grow()
+        self._columns[player_id] = column
+        # Rows before the join hold whoever had the column before
+        self._since[column] = tick
+
+    def remove(self, player_id: str):
+        column = self._columns.pop(player_id, None)
+        if column is not None:
+            self._free.append(column)
+
+    def _grow(self):
+        ships = len(self._since)
+        pad = ((0, 0), (0, ships))
+        self._x = np.pad(self._x, pad)
+        self._z = np.pad(self._z, pad)
+        self._alive = np.pad(self._alive, pad)
+        self._since = np.pad(self._since, (0, ships))
+        self._free = list(range(2 * ships - 1, ships - 1, -1))
+
+    def record(self, tick: int, players, ships=None):
+        """Store where ``players`` are at the end of ``tick``. Pass the
+        room's ShipArrays if the ships' columns are their slots."""
+        row = tick % self.ticks
+        self._row_ticks[row] = tick
+        xs = self._x[row]
+        zs = self._z[row]
+        alive = self._alive[row]
+        alive.fill(False)
+        columns = self._columns
+        if ships is not None:
+            n = min(len(xs), ships.capacity)
+            np.copyto(xs[:n], ships.data[X, :n])
+            np.copyto(zs[:n], ships.data[Z, :n])
+            for player in players:
+                alive[columns[player.id]] = player.alive
+            return
+        for player in players:
+            column = columns[player.id]
+            xs[column] = player.x
+            zs[column] = player.z
+            alive[column] = player.alive
+
+    def positions(self, tick: int, players: list) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """``(x, z, present)`` of ``players`` at the end of ``tick``, where
+        ``present`` is whether each was in the room and alive then; None if
+        the tick is no longer (or not yet) in the buffer."""
+        row = tick % self.ticks
+        if tick < 0 or self._row_ticks[row] != tick:
+            return None
+        columns = np.fromiter((self._columns[p.id] for p in players), dtype=np.intp, count=len(players))
+        present = self._alive[row, columns] & (self._since[columns] <= tick)
+        return self._x[row, columns], self._z[row, columns], present
+
+    # --- Snapshots ---
+    def to_doc(self) -> dict:
+        rows = [r for r in np.argsort(self._row_ticks).tolist() if self._row_ticks[r] >= 0]
+        return {
+            "columns": {pid: [c, int(self._since[c])] for pid, c in self._columns.items()},
+            "rows": [[int(self._row_ticks[r]), self._x[r].tolist(), self._z[r].tolist(), self._alive[r].tolist()]
+                     for r in rows],
+        }
+
+    @classmethod
+    def from_doc(cls, ticks: int, doc: dict, columns: Optional[Dict[str, int]] = None) -> "PositionHistory":
+        """Rebuild ``to_doc`` output. Ships are given new columns: those in
+        ``columns`` (the restored room's ShipArrays slots), or packed."""
+        history = cls(ticks)
+        moves = []
+        for player_id, (old, since) in doc["columns"].items():
+            history.add(player_id, since, None if columns is None else columns[player_id])
+            moves.append((old, history._columns[player_id]))
+        for tick, xs, zs, alive in doc["rows"]:
+            row = tick % ticks
+            history._row_ticks[row] = tick
+            for old, new in moves:
+                history._x[row, new] = xs[old]
+                history._z[row, new] = zs[old]
+                history._alive[row, new] = alive[old]
+        return history
@@ -0,0 +1,230 @@
+"""Per-room tick instrumentation and Prometheus text exposition.
+
+Each ``GameRoom`` owns a ``RoomMetrics``: a histogram per tick phase and a
+handful of counters and gauges. Recording is a ``bisect`` plus a few
+integer adds, cheap enough to leave on for every tick. ``render`` turns
+the metrics of all rooms into the Prometheus text format, per room and
+aggregated; metrics of rooms that have closed are folded into a retired
+aggregate so process-wide counters never go backwards.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds; the last bucket is +Inf
+PHASE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+
+PREFIX = "starbattle"
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(PHASE_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(PHASE_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+
+    def to_dict(self) -> dict:
+        return {"counts": self.counts, "sum": self.sum, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Histogram":
+        hist = cls()
+        hist.counts = list(data["counts"])
+        hist.sum = data["sum"]
+        hist.count = data["count"]
+        return hist
+
+
+class RoomMetrics:
+    """Counters, gauges and phase timings of one room."""
+
+    COUNTERS = ("ticks", "input_frames", "inputs", "inputs_coalesced", "inputs_dropped", "snapshots",
+                "snapshot_bytes", "bytes_sent", "compressed_input_bytes", "effects", "dropped_frames", "laggards",
+                "hibernated_ticks")
+    GAUGES = ("connections", "queued_inputs", "last_snapshot_bytes", "hibernating")
+
+    def __init__(self):
+        self.phases: Dict[str, Histogram] = {}
+        self.ticks = 0
+        self.input_frames = 0
+        self.inputs = 0
+        self.inputs_coalesced = 0
+        self.inputs_dropped = 0
+        self.snapshots = 0
+        self.snapshot_bytes = 0
+        self.bytes_sent = 0
+        self.compressed_input_bytes = 0
+        self.effects = 0
+        self.dropped_frames = 0
+        self.laggards = 0
+        self.hibernated_ticks = 0
+        self.connections = 0
+        self.queued_inputs = 0
+        self.last_snapshot_bytes = 0
+        self.hibernating = 0
+
+    def observe(self, phase: str, seconds: float):
+        hist = self.phases.get(phase)
+        if hist is None:
+            hist = self.phases[phase] = Histogram()
+        hist.observe(seconds)
+
+    def record_tick(self, queued_inputs: int):
+        self.ticks += 1
+        self.inputs += queued_inputs
+        self.queued_inputs = queued_inputs
+
+    def record_snapshot(self, nbytes: int, effects: int, connections: int):
+        # bytes_sent is credited by the connection writers as frames go out
+        self.snapshots += 1
+        self.snapshot_bytes += nbytes
+        self.last_snapshot_bytes = nbytes
+        self.effects += effects
+        self.connections = connections
+
+    def merge(self, other: "RoomMetrics", gauges: bool = True):
+        for name, hist in other.phases.items():
+            mine = self.phases.get(name)
+            if mine is None:
+                mine = self.phases[name] = Histogram()
+            mine.merge(hist)
+        for name in self.COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if gauges:
+            for name in self.GAUGES:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self) -> dict:
+        data = {name: getattr(self, name) for name in self.COUNTERS + self.GAUGES}
+        data["phases"] = {name: hist.to_dict() for name, hist in self.phases.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RoomMetrics":
+        metrics = cls()
+        for name in cls.COUNTERS + cls.GAUGES:
+            setattr(metrics, name, data[name])
+        metrics.phases = {name: Histogram.from_dict(h) for name, h in data["phases"].items()}
+        return metrics
+
+
+def _labels(**labels) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _histogram_lines(name: str, hist: Histogram, labels: str) -> List[str]:
+    lines = []
+    cumulative = 0
+    base = labels[1:-1] + "," if labels else ""
+    for bound, count in zip(PHASE_BUCKETS + (float("inf"),), hist.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else repr(bound)
+        lines.append(f'{name}_bucket{{{base}le="{le}"}} {cumulative}')
+    lines.append(f"{name}_sum{labels} {hist.sum!r}")
+    lines.append(f"{name}_count{labels} {hist.count}")
+    return lines
+
+
+COUNTER_HELP = {
+    "ticks": "Simulation ticks run",
+    "input_frames": "Websocket frames of client inputs received",
+    "inputs": "Client inputs processed",
+    "inputs_coalesced": "Move and aim inputs overwritten by a newer one in the same tick",
+    "inputs_dropped": "Client inputs dropped by the rate limit, the per-tick queue cap or a stale frame",
+    "snapshots": "State snapshots broadcast",
+    "snapshot_bytes": "Encoded state message bytes, once per distinct full state or delta, not per client",
+    "bytes_sent": "Message bytes written to client sockets, summed over clients",
+    "compressed_input_bytes": "Message bytes before compression, for clients that asked for it",
+    "effects": "Effects included in snapshots",
+    "dropped_frames": "Queued snapshots replaced by a newer one before a slow client got them",
+    "laggards": "Clients disconnected for falling too far behind",
+    "hibernated_ticks": "Ticks skipped while the room was at rest and made up on waking",
+}
+GAUGE_HELP = {
+    "connections": "Connections the last snapshot was sent to",
+    "queued_inputs": "Inputs queued for the last tick",
+    "last_snapshot_bytes": "Size of the last encoded snapshot",
+    "hibernating": "Rooms at rest that stopped ticking until the next input",
+}
+TICK_STATS = (
+    ("missed_ticks", "counter", "Ticks dropped because the loop fell too far behind"),
+    ("catchup_ticks", "counter", "Ticks run back to back to catch up"),
+    ("deferred_wakeups", "counter", "Wakeups postponed to the next tick because the scheduler's CPU budget was spent"),
+    ("last_lateness", "gauge", "Tick start lateness of the latest wakeup in seconds"),
+    ("max_lateness", "gauge", "Worst tick start lateness in seconds"),
+    ("jitter", "gauge", "Smoothed tick start jitter in seconds"),
+)
+
+
+def render(rooms: Iterable[Tuple[str, RoomMetrics, Optional[dict]]], retired: Optional[RoomMetrics] = None) -> str:
+    """Prometheus text for ``(room_id, metrics, tick_stats)`` triples.
+
+    ``tick_stats`` is the raw TickStats attribute dict (or None). Series
+    named ``starbattle_room_*`` carry a ``room`` label; the unprefixed
+    ``starbattle_*`` series aggregate every room, closed ones included.
+    """
+    rooms = list(rooms)
+    total = RoomMetrics()
+    if retired is not None:
+        total.merge(retired, gauges=False)
+    for _, metrics, _ in rooms:
+        total.merge(metrics)
+
+    out = [f"# HELP {PREFIX}_rooms Rooms hosted", f"# TYPE {PREFIX}_rooms gauge", f"{PREFIX}_rooms {len(rooms)}"]
+
+    name = f"{PREFIX}_phase_seconds"
+    out += [f"# HELP {name} Time spent per tick phase, all rooms", f"# TYPE {name} histogram"]
+    for phase, hist in total.phases.items():
+        out += _histogram_lines(name, hist, _labels(phase=phase))
+    name = f"{PREFIX}_room_phase_seconds"
+    out += [f"# HELP {name} Time spent per tick phase", f"# TYPE {name} histogram"]
+    for room_id, metrics, _ in rooms:
+        for phase, hist in metrics.phases.items():
+            out += _histogram_lines(name, hist, _labels(room=room_id, phase=phase))
+
+    for field, help_text in COUNTER_HELP.items():
+        for scope, series in (("", [("", total)]), ("room_", [(r, m) for r, m, _ in rooms])):
+            name = f"{PREFIX}_{scope}{field}_total"
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            for room_id, metrics in series:
+                labels = _labels(room=room_id) if scope else ""
+                out.append(f"{name}{labels} {getattr(metrics, field)}")
+
+    for field, help_text in GAUGE_HELP.items():
+        for scope, series in (("", [("", total)]), ("room_", [(r, m) for r, m, _ in rooms])):
+            name = f"{PREFIX}_{scope}{field}"
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for room_id, metrics in series:
+                labels = _labels(room=room_id) if scope else ""
+                out.append(f"{name}{labels} {getattr(metrics, field)}")
+
+    for field, kind, help_text in TICK_STATS:
+        name = f"{PREFIX}_room_{field}" + ("_total" if kind == "counter" else "_seconds")
+        out += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for room_id, _, stats in rooms:
+            if stats is not None:
+                out.append(f"{name}{_labels(room=room_id)} {stats[field]!r}")
+
+    return "\n".join(out) + "\n"
@@ -0,0 +1,170 @@
+"""Per-connection outbound queues.
+
+The game loop never awaits a websocket. Each connection gets a
+``ConnectionWriter``: ``enqueue`` appends to a small queue and returns, and
+a task of the writer's own does the sending, so a slow client only delays
+itself.
+
+Messages are either reliable (rosters, event lists), which are always
+delivered in order, or carry a ``key`` (``STATE``, ``MINIMAP``): a newer
+message with the same key replaces one still waiting in the queue, so a
+client that falls behind skips straight to the latest snapshot. The
+reliable effects of a replaced state (kills, joins, leaves) are not lost;
+they take its place in the queue as an events message:
+
+    {"type": "events", "effects": [...]}
+
+A client that stays behind for ``MAX_BEHIND`` seconds, or whose reliable
+backlog outgrows ``OUTBOUND_QUEUE``, is disconnected.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import List, Optional
+
+from compression import FRAME_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Messages waiting per connection before it is given up on. Keyed messages
+# replace each other, so only reliable ones can pile up to this.
+OUTBOUND_QUEUE = 64
+# Seconds a connection may keep skipping snapshots before it is dropped
+MAX_BEHIND = 5.0
+# WebSocket close code sent to connections that could not keep up
+LAGGARD_CLOSE_CODE = 1008
+
+# Message keys; the latest message of a key wins
+STATE = "state"
+MINIMAP = "minimap"
+
+# Effects a client must see even when the snapshot carrying them is skipped
+RELIABLE_EFFECTS = ("kill", "player_joined", "player_left")
+
+
+def reliable_effects(effects: Optional[List[dict]]) -> List[dict]:
+    return [e for e in effects or () if e.get("type") in RELIABLE_EFFECTS]
+
+
+class ConnectionWriter:
+    """Bounded, latest-state-wins send queue of one websocket."""
+
+    __slots__ = ("websocket", "metrics", "compressor", "max_queue", "max_behind", "dropped", "closed",
+                 "_queue", "_task", "_behind_since", "_clock")
+
+    def __init__(self, websocket, metrics=None, max_queue: int = OUTBOUND_QUEUE,
+                 max_behind: float = MAX_BEHIND, clock=time.monotonic, compressor=None):
+        self.websocket = websocket
+        # RoomMetrics credited with bytes sent, drops and laggards, if any
+        self.metrics = metrics
+        # Compresses every message into a binary frame, if set; see compression.py
+        self.compressor = compressor
+        self.max_queue = max_queue
+        self.max_behind = max_behind
+        # Keyed messages replaced before they were sent
+        self.dropped = 0
+        self.closed = False
+        # [message, key, effects] entries, oldest first
+        self._queue: deque = deque()
+        self._task: Optional[asyncio.Task] = None
+        # Clock time of the first drop since the queue last ran empty
+        self._behind_since: Optional[float] = None
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, message, key: Optional[str] = None, effects: Optional[List[dict]] = None):
+        """Queue ``message`` (text or bytes) without waiting for the socket.
+
+        ``effects`` are those the message carries; only used if it is
+        replaced, to forward the reliable ones.
+        """
+        if self.closed:
+            return
+        queue = self._queue
+        if key is not None:
+            for i, entry in enumerate(queue):
+                if entry[1] == key:
+                    self._replace(i)
+                    break
+        queue.append([message, key, effects])
+        if len(queue) > self.max_queue:
+            self._give_up(f"{len(queue)} messages queued")
+        elif self._behind_since is not None and self._clock() - self._behind_since > self.max_behind:
+            self._give_up(f"behind for {self.max_behind:g}s")
+        elif self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _replace(self, index: int):
+        _, _, effects = self._queue[index]
+        events = reliable_effects(effects)
+        if events:
+            self._queue[index] = [json.dumps({"type": "events", "effects": events}), None, None]
+        else:
+            del self._queue[index]
+        self.dropped += 1
+        if self.metrics is not None:
+            self.metrics.dropped_frames += 1
+        if self._behind_since is None:
+            self._behind_since = self._clock()
+
+    async def _run(self):
+        ws = self.websocket
+        queue = self._queue
+        try:
+            while queue:
+                message = queue.popleft()[0]
+                if self.compressor is not None:
+                    message = await self.compressor.frame(message)
+                    if self.metrics is not None:
+                        # The encoded length the compressor was handed, from
+                        # the frame header
+                        self.metrics.compressed_input_bytes += FRAME_HEADER.unpack_from(message)[1]
+                if isinstance(message, bytes):
+                    await ws.send_bytes(message)
+                else:
+                    await ws.send_text(message)
+                if self.metrics is not None:
+                    self.metrics.bytes_sent += len(message)
+            self._behind_since = None
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            # The socket is gone; its handler notices and cleans up
+            self._task = None
+            self.close()
+        finally:
+            self._task = None
+
+    async def drain(self):
+        """Wait until everything queued so far has been sent."""
+        while self._task is not None:
+            await asyncio.shield(self._task)
+
+    def close(self):
+        """Stop sending; anything still queued is discarded."""
+        self.closed = True
+        self._queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _give_up(self, reason: str):
+        logger.info(f"Disconnecting slow client: {reason}, {self.dropped} snapshots dropped")
+        if self.metrics is not None:
+            self.metrics.laggards += 1
+        self.close()
+        close = getattr(self.websocket, "close", None)
+        if close is not None:
+            asyncio.get_running_loop().create_task(_close_quietly(close))
+
+
+async def _close_quietly(close):
+    try:
+        await close(code=LAGGARD_CLOSE_CODE)
+    except Exception:
+        pass
@@ -0,0 +1,206 @@
+"""Match replays: a compact, append-only log of what a room simulated.
+
+A replay holds the inputs each tick drained, the players who joined and
+left between ticks, and a full room snapshot (a keyframe) every
+``KEYFRAME_INTERVAL`` seconds. Given a snapshot and the inputs after it
+the simulation is deterministic, so ``ReplayReader`` rebuilds the room at
+any tick by restoring the nearest earlier keyframe and replaying from
+there, without anything like a 20 Hz log of full states.
+
+File layout::
+
+    header      MAGIC, version, info length (FILE_HEADER), info JSON
+    records     kind, tick, payload length (RECORD), payload
+
+Payloads are a ``GameRoom.snapshot`` (KEYFRAME) or compact JSON: the
+drained ``[player_id, message]`` pairs (INPUTS), ``[player_id, name,
+ship_class]`` (JOIN) or the player id (LEAVE). Ticks nobody sent input for
+write nothing. A record cut short by a crash ends the replay at the one
+before it.
+
+``ReplayRecorder`` hands records to a writer thread, which also does the
+JSON encoding, so the game loop never waits on the disk.
+"""
+
+import bisect
+import json
+import logging
+import mmap
+import queue
+import struct
+import threading
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"SBRP"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<BII")
+
+KEYFRAME = 1
+INPUTS = 2
+JOIN = 3
+LEAVE = 4
+
+# Seconds of play between keyframes: the most a seek has to replay
+KEYFRAME_INTERVAL = 10.0
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+class ReplayRecorder:
+    """Appends one room's records to ``path`` from a background thread."""
+
+    def __init__(self, path: str, info: dict, keyframe_ticks: int):
+        self.path = path
+        # Ticks between keyframes
+        self.keyframe_ticks = keyframe_ticks
+        # (kind, tick, payload) records; payloads other than bytes are
+        # JSON-encoded by the writer. None closes the file.
+        self._queue: "queue.SimpleQueue[Optional[tuple]]" = queue.SimpleQueue()
+        header = _dumps(info)
+        self._queue.put(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, len(header)) + header)
+        self._thread = threading.Thread(target=self._write, name=f"replay {path}", daemon=True)
+        self._thread.start()
+
+    def keyframe(self, tick: int, snapshot: bytes):
+        self._queue.put((KEYFRAME, tick, snapshot))
+
+    def inputs(self, tick: int, messages: List[Tuple[str, dict]]):
+        self._queue.put((INPUTS, tick, messages))
+
+    def join(self, tick: int, player_id: str, name: str, ship_class: str):
+        self._queue.put((JOIN, tick, [player_id, name, ship_class]))
+
+    def leave(self, tick: int, player_id: str):
+        self._queue.put((LEAVE, tick, player_id))
+
+    def close(self):
+        """Finish the file once everything queued is written; does not wait."""
+        self._queue.put(None)
+
+    def wait(self, timeout: Optional[float] = None):
+        self._thread.join(timeout)
+
+    def _write(self):
+        try:
+            with open(self.path, "wb") as f:
+                while True:
+                    item = self._queue.get()
+                    # Write whatever has piled up, then flush once
+                    while item is not None:
+                        if isinstance(item, bytes):
+                            f.write(item)
+                        else:
+                            kind, tick, payload = item
+                            if not isinstance(payload, bytes):
+                                payload = _dumps(payload)
+                            f.write(RECORD.pack(kind, tick, len(payload)))
+                            f.write(payload)
+                        try:
+                            item = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    f.flush()
+                    if item is None:
+                        return
+        except OSError as e:
+            logger.error(f"Replay {self.path} stopped: {e}")
+
+
+class ReplayReader:
+    """Seeks a replay file by memory-mapping it and indexing its records."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, header_len = FILE_HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} replay")
+        # Room id, GameRoom options and start time of the recording
+        self.info = json.loads(self._map[FILE_HEADER.size:FILE_HEADER.size + header_len])
+        # (kind, tick, payload offset, payload length) of every whole record
+        self._records: List[Tuple[int, int, int, int]] = []
+        # Ticks of the keyframe records, and their indexes in _records
+        self._keyframe_ticks: List[int] = []
+        self._keyframe_records: List[int] = []
+        self.end_tick = 0
+        self._index(FILE_HEADER.size + header_len)
+
+    def _index(self, offset: int):
+        data = self._map
+        size = len(data)
+        while offset + RECORD.size <= size:
+            kind, tick, length = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if offset + length > size:
+                break
+            if kind == KEYFRAME:
+                self._keyframe_ticks.append(tick)
+                self._keyframe_records.append(len(self._records))
+            self._records.append((kind, tick, offset, length))
+            self.end_tick = max(self.end_tick, tick + 1 if kind == INPUTS else tick)
+            offset += length
+        if not self._keyframe_ticks:
+            raise ValueError(f"{self.path} has no keyframe")
+
+    @property
+    def start_tick(self) -> int:
+        return self._keyframe_ticks[0]
+
+    def seek(self, tick: int):
+        """The room as it was once ``tick`` ticks had been simulated."""
+        return self._seek(tick)[0]
+
+    def states(self, start: Optional[int] = None, end: Optional[int] = None) -> Iterator[dict]:
+        """The state message of every tick after ``start`` up to ``end``."""
+        room, i = self._seek(self.start_tick if start is None else start)
+        room.effects.clear()
+        for tick in range(room.tick + 1, (self.end_tick if end is None else end) + 1):
+            i = self._play(room, i, tick)
+            yield room._state_message()
+
+    def _seek(self, tick: int):
+        from game_engine import GameRoom
+
+        if not self.start_tick <= tick <= self.end_tick:
+            raise ValueError(f"Tick {tick} is outside the replay ({self.start_tick}-{self.end_tick})")
+        i = self._keyframe_records[bisect.bisect_right(self._keyframe_ticks, tick) - 1]
+        _, _, offset, length = self._records[i]
+        room = GameRoom.from_snapshot(self._map[offset:offset + length], **self.info["options"])
+        return room, self._play(room, i + 1, tick)
+
+    def _play(self, room, i: int, target: int) -> int:
+        """Apply records from index ``i`` until ``room`` reaches tick
+        ``target``; returns the index of the first record not applied."""
+        records = self._records
+        while i < len(records) and records[i][1] < target:
+            kind, tick, offset, length = records[i]
+            while room.tick < tick:
+                room._simulate_tick()
+            if kind == INPUTS:
+                messages = json.loads(self._map[offset:offset + length])
+                room._pending_messages.restore([tuple(m) for m in messages])
+                room._simulate_tick()
+            elif kind == JOIN:
+                player_id, name, ship_class = json.loads(self._map[offset:offset + length])
+                room.add_player(player_id, name, None, ship_class)
+            elif kind == LEAVE:
+                room.remove_player(json.loads(self._map[offset:offset + length]))
+            i += 1
+        while room.tick < target:
+            room._simulate_tick()
+        return i
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self) -> "ReplayReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
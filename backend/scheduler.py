@@ -0,0 +1,183 @@
+"""One tick scheduler drives every room in a process.
+
+Rather than each room sleeping on its own timer, a ``TickScheduler`` task
+keeps the rooms in a heap ordered by their next tick deadline, sleeps
+until the earliest one and serves every room that is due (see
+``GameRoom._serve``). Rooms keep their own absolute deadlines, catch-up
+rules and lateness stats; the scheduler only decides when each runs.
+
+Phases: a room joining the scheduler is given the phase (offset within its
+tick interval) in the middle of the widest gap between the phases already
+taken, so rooms tick spread across the interval instead of in one burst.
+
+Budget: the scheduler yields to the event loop after every room, so I/O
+never waits on more than one room's wakeup, and spends at most
+``budget`` of each tick interval serving rooms. Rooms still due once it
+is spent wait for the next interval, oldest deadline first, and count a
+deferred wakeup; their lateness shows it, and their own catch-up makes
+up the ticks. Websocket I/O therefore always gets the rest of every
+interval, however many rooms there are.
+
+Hibernating rooms (see ``GameRoom.hibernate``) leave the heap, or sit in
+it until a respawn is due, and come back through ``reschedule`` when an
+input wakes them.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Fraction of every tick interval the scheduler may spend running rooms
+TICK_BUDGET = 0.5
+# Interval the budget is accounted over, in seconds: a tick at the default rate
+BUDGET_INTERVAL = 0.05
+
+
+class TickScheduler:
+    """Runs the game loops of many rooms on a single asyncio task."""
+
+    def __init__(self, budget: float = TICK_BUDGET, interval: float = BUDGET_INTERVAL):
+        self.budget = budget
+        self.interval = interval
+        # Phase of each room, as a fraction of its tick interval
+        self._phases: Dict[object, float] = {}
+        # [deadline, order, room] entries; a room's live entry is the one in
+        # _entries, others are stale and skipped when popped
+        self._heap: List[list] = []
+        self._entries: Dict[object, list] = {}
+        self._order = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._poke: Optional[asyncio.Event] = None
+        self._epoch: Optional[float] = None
+        # Busy time charged to the budget interval that started at _window
+        self._window = 0.0
+        self._spent = 0.0
+
+    def __len__(self) -> int:
+        return len(self._phases)
+
+    def phase(self, room) -> Optional[float]:
+        """Offset of ``room``'s ticks into its tick interval, in seconds."""
+        phase = self._phases.get(room)
+        return None if phase is None else phase * room.tick_interval
+
+    def add(self, room):
+        """Start ticking ``room`` at the free phase nearest the middle of
+        the widest gap between the other rooms' phases."""
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._epoch is None:
+            self._epoch = self._window = now
+        phase = self._free_phase()
+        self._phases[room] = phase
+        interval = room.tick_interval
+        first = self._epoch + phase * interval
+        room._next_tick_at = first + max(0, math.ceil((now - first) / interval)) * interval
+        logger.info(f"Game loop started for room {room.id} at phase {phase * interval * 1000:.1f} ms")
+        self._push(room, room._next_tick_at)
+        if self._task is None:
+            self._poke = asyncio.Event()
+            self._task = loop.create_task(self._run())
+
+    def remove(self, room):
+        if self._phases.pop(room, None) is None:
+            return
+        self._entries.pop(room, None)
+        if not self._phases and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def reschedule(self, room):
+        """``room`` woke from hibernation: tick it from its next deadline."""
+        if room in self._phases:
+            self._push(room, room._next_tick_at)
+
+    def _free_phase(self) -> float:
+        phases = sorted(self._phases.values())
+        if not phases:
+            return 0.0
+        best, widest = 0.0, -1.0
+        for a, b in zip(phases, phases[1:] + [phases[0] + 1.0]):
+            if b - a > widest:
+                best, widest = (a + b) / 2, b - a
+        return best % 1.0
+
+    def _push(self, room, deadline: float):
+        entry = [deadline, next(self._order), room]
+        self._entries[room] = entry
+        heapq.heappush(self._heap, entry)
+        if self._poke is not None and self._heap[0] is entry:
+            # Earlier than what the scheduler is sleeping for
+            self._poke.set()
+
+    def _peek(self) -> Optional[list]:
+        heap = self._heap
+        while heap and self._entries.get(heap[0][2]) is not heap[0]:
+            heapq.heappop(heap)
+        return heap[0] if heap else None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        allowance = self.budget * self.interval
+        clock = time.perf_counter
+        try:
+            while True:
+                entry = self._peek()
+                now = loop.time()
+                wait = None if entry is None else entry[0] - now
+                if wait is None or wait > 0:
+                    self._poke.clear()
+                    try:
+                        await asyncio.wait_for(self._poke.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if now - self._window >= self.interval:
+                    # Overspending (the room that crossed the budget) is
+                    # paid back from the following intervals
+                    windows = (now - self._window) // self.interval
+                    self._window += windows * self.interval
+                    self._spent = max(0.0, self._spent - windows * allowance)
+                if self._spent >= allowance:
+                    self._defer(now)
+                    await asyncio.sleep(self._window + self.interval - now)
+                    continue
+                heapq.heappop(self._heap)
+                room = entry[2]
+                del self._entries[room]
+                start = clock()
+                try:
+                    self._serve(room, now)
+                except Exception as e:
+                    logger.error(f"Game loop error in room {room.id}: {e}", exc_info=True)
+                    self.remove(room)
+                self._spent += clock() - start
+                # Websocket I/O runs between any two rooms
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            pass
+
+    def _serve(self, room, now: float):
+        if not room.running:
+            self.remove(room)
+            return
+        if room.hibernating:
+            # Its respawn is due
+            room.wake(now)
+        if room._serve(now):
+            deadline = room.hibernate()
+            if deadline is not None:
+                self._push(room, deadline)
+        else:
+            self._push(room, room._next_tick_at)
+
+    def _defer(self, now: float):
+        for entry in self._heap:
+            if entry[0] <= now and self._entries.get(entry[2]) is entry:
+                entry[2].tick_stats.deferred_wakeups += 1
@@ -1,14 +1,21 @@
 from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
+import math
 import uuid
-import json
 from pathlib import Path
 
-from game_engine import room_manager, ARENA_SIZE
+from game_engine import room_manager, ARENA_SIZE, HIBERNATE_AFTER, SNAPSHOT_RATE, TICK_RATE
+from lag_compensation import MAX_REWIND
+from scheduler import TICK_BUDGET
+from shards import ShardRouter
+from spectators import SPECTATOR_DELAY, SPECTATOR_RATE, SpectatorRelay, relay_id
+import compression
+import metrics
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -17,6 +24,33 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+room_manager.room_options["vectorized"] = os.environ.get('VECTORIZED_PHYSICS', '0') == '1'
+# Simulation steps and state broadcasts per second, set independently
+room_manager.room_options["tick_rate"] = float(os.environ.get('SIM_TICK_RATE', TICK_RATE))
+room_manager.room_options["snapshot_rate"] = float(os.environ.get('SNAPSHOT_RATE', SNAPSHOT_RATE))
+# Seconds of ship history lagging clients' shots are judged against; 0 disables
+room_manager.room_options["max_rewind"] = float(os.environ.get('MAX_REWIND', MAX_REWIND))
+# Seconds at rest after which a room stops ticking until the next input; 0 disables
+room_manager.room_options["hibernate_after"] = float(os.environ.get('HIBERNATE_AFTER', HIBERNATE_AFTER))
+# Fraction of each tick interval a process's rooms may spend simulating
+tick_budget = float(os.environ.get('TICK_BUDGET', TICK_BUDGET))
+room_manager.scheduler.budget = tick_budget
+
+# Every room records a replay into REPLAY_DIR, if set; see replay.py
+room_manager.replay_dir = os.environ.get('REPLAY_DIR') or None
+
+# ROOM_SHARDS > 0 runs rooms in that many worker processes instead of on
+# this process's event loop.
+ROOM_SHARDS = int(os.environ.get('ROOM_SHARDS', '0'))
+shard_router = (ShardRouter(ROOM_SHARDS, room_manager.room_options, room_manager.replay_dir, tick_budget)
+                if ROOM_SHARDS > 0 else None)
+
+# States per second sent to spectators, and seconds they are held back
+spectator_rate = float(os.environ.get('SPECTATOR_RATE', SPECTATOR_RATE))
+spectator_delay = float(os.environ.get('SPECTATOR_DELAY', SPECTATOR_DELAY))
+# Spectator relay of each room someone is watching, when rooms run here
+spectator_relays = {}
+
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
@@ -34,14 +68,28 @@ async def root():
 
 @api_router.get("/rooms")
 async def get_rooms():
-    rooms = []
-    for room in room_manager.rooms.values():
-        rooms.append({
-            "id": room.id,
-            "playerCount": len(room.players),
-            "playerNames": [p.name for p in room.players.values()]
-        })
-    return rooms
+    if shard_router:
+        return await shard_router.list_rooms()
+    return [room.summary() for room in room_manager.rooms.values()]
+
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    if shard_router:
+        series, retired = await shard_router.collect_metrics()
+    else:
+        series, retired = room_manager.metric_series(), room_manager.retired_metrics
+    return PlainTextResponse(metrics.render(series, retired), media_type="text/plain; version=0.0.4")
+
+
+@api_router.get("/snapshot-dictionary")
+async def get_snapshot_dictionary():
+    """The zstd dictionary ``compress=zstd`` connections are compressed with."""
+    compressor = compression.zstd_compressor()
+    if compressor is None:
+        return Response(status_code=404)
+    return Response(compressor.dictionary, media_type="application/octet-stream",
+                    headers={"X-Dictionary-Id": str(compressor.dict_id)})
 
 
 app.include_router(api_router)
@@ -52,28 +100,44 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
     await websocket.accept()
     name = websocket.query_params.get("name", "Pilot")
     ship_class = websocket.query_params.get("ship_class", "vanguard")
+    # Snapshot encoding: "binary" frames, or JSON (the default), which
+    # clients that ack snapshots may ask to be delta-compressed
+    codec = websocket.query_params.get("codec", "json")
+    delta = websocket.query_params.get("delta") == "1"
+    # Only entities near the ship, plus a coarse minimap list
+    interest = websocket.query_params.get("interest") == "1"
+    # Snapshots per second this client wants, below the room's rate
+    rate = _float_param(websocket, "rate")
+    # Frames compressed with "deflate" or "zstd"; None if unsupported here
+    compressor = compression.compressor_for(websocket.query_params.get("compress"))
     player_id = str(uuid.uuid4())[:8]
 
-    room = room_manager.get_or_create_room(room_id)
-    room.add_player(player_id, name, websocket, ship_class)
+    if shard_router:
+        await _sharded_websocket(websocket, room_id, player_id, name, ship_class, delta, codec, interest, rate,
+                                 compressor)
+        return
 
-    try:
-        await websocket.send_json({
-            "type": "init",
-            "playerId": player_id,
-            "arenaSize": ARENA_SIZE,
-            "shipClass": ship_class,
-        })
+    # Sent before joining, so that it goes out ahead of the first snapshot
+    # the room's writer queues for this connection
+    await websocket.send_json(_init_message(player_id, ship_class, compressor))
 
+    room = room_manager.get_or_create_room(room_id)
+    try:
+        room.add_player(player_id, name, websocket, ship_class)
+        if compressor is not None:
+            room.enable_compression(player_id, compressor)
+        if codec == "binary":
+            room.enable_binary(player_id)
+        elif delta:
+            room.enable_delta(player_id)
+        if interest:
+            room.enable_interest(player_id)
+        if rate is not None:
+            room.set_send_rate(player_id, rate)
         room.effects.append({"type": "player_joined", "name": name})
 
         while True:
-            data = await websocket.receive_text()
-            try:
-                msg = json.loads(data)
-                room.queue_message(player_id, msg)
-            except json.JSONDecodeError:
-                pass
+            room.receive(player_id, await _receive_frame(websocket))
     except WebSocketDisconnect:
         pass
     except Exception as e:
@@ -87,6 +151,104 @@ async def websocket_endpoint(websocket: WebSocket, room_id: str):
             room_manager.remove_empty_rooms()
 
 
+@app.websocket("/api/ws/{room_id}/spectate")
+async def spectate_endpoint(websocket: WebSocket, room_id: str):
+    """Watch a room without a ship. All of a room's spectators share one
+    relay, which the room sends each state to once; see spectators.py."""
+    await websocket.accept()
+    viewer_id = str(uuid.uuid4())[:8]
+    await websocket.send_json({
+        "type": "spectate",
+        "arenaSize": ARENA_SIZE,
+        "rate": spectator_rate,
+        "delay": spectator_delay,
+    })
+    if shard_router:
+        shard_router.spectate(websocket, room_id, viewer_id, spectator_rate, spectator_delay)
+    else:
+        relay = spectator_relays.get(room_id)
+        if relay is None:
+            room = room_manager.get_or_create_room(room_id)
+            relay = spectator_relays[room_id] = SpectatorRelay(spectator_rate, spectator_delay, room.metrics)
+            room.add_relay(relay_id(room_id), relay, spectator_rate)
+        relay.add(viewer_id, websocket)
+    try:
+        # Spectators send nothing; wait for them to go
+        while True:
+            await _receive_frame(websocket)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+    finally:
+        if shard_router:
+            shard_router.unspectate(room_id, viewer_id)
+        else:
+            _unspectate(room_id, viewer_id)
+
+
+def _unspectate(room_id: str, viewer_id: str):
+    relay = spectator_relays.get(room_id)
+    if relay is None:
+        return
+    relay.remove(viewer_id)
+    if not relay.viewers:
+        del spectator_relays[room_id]
+        relay.close()
+        room = room_manager.rooms.get(room_id)
+        if room is not None:
+            room.remove_relay(relay_id(room_id))
+            if not room.players:
+                room_manager.remove_empty_rooms()
+
+
+async def _receive_frame(websocket: WebSocket):
+    """The next frame's bytes or text, whichever the client sent."""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    data = message.get("bytes")
+    return data if data is not None else message.get("text", "")
+
+
+def _float_param(websocket: WebSocket, name: str):
+    try:
+        value = float(websocket.query_params[name])
+    except (KeyError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _init_message(player_id: str, ship_class: str, compressor) -> dict:
+    message = {
+        "type": "init",
+        "playerId": player_id,
+        "arenaSize": ARENA_SIZE,
+        "shipClass": ship_class,
+        # How the frames that follow are compressed, if at all
+        "compression": compressor.mode if compressor is not None else None,
+    }
+    if compressor is not None and compressor.mode == compression.ZSTD:
+        message["dictionaryId"] = compressor.dict_id
+    return message
+
+
+async def _sharded_websocket(websocket: WebSocket, room_id: str, player_id: str, name: str, ship_class: str,
+                             delta: bool = False, codec: str = "json", interest: bool = False, rate=None,
+                             compressor=None):
+    await websocket.send_json(_init_message(player_id, ship_class, compressor))
+    shard_router.join(websocket, room_id, player_id, name, ship_class, delta, codec, interest, rate, compressor)
+    try:
+        while True:
+            shard_router.send_input(room_id, player_id, await _receive_frame(websocket))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"WebSocket error: {e}")
+    finally:
+        shard_router.leave(room_id, player_id)
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -96,8 +258,16 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+async def startup():
+    if shard_router:
+        await shard_router.start()
+
+
 @app.on_event("shutdown")
 async def shutdown():
     for room in room_manager.rooms.values():
         room.stop()
+    if shard_router:
+        await shard_router.stop()
     client.close()
@@ -0,0 +1,569 @@
+"""Multi-process room sharding.
+
+Rooms are assigned to N worker processes by a stable hash of the room id.
+Each worker runs its own ``RoomManager`` on its own event loop, so a busy
+room only slows the rooms that share its shard. The front process (the
+FastAPI app) keeps the client websockets and talks to each worker over a
+Unix domain socket:
+
+    front -> worker   join, input, leave, spectate, unspectate, rooms,
+                      metrics, export, import
+    worker -> front   send (a frame for one client), replies to requests
+                      (tagged with the request's ``req``)
+
+Frames are ``!II`` (header length, payload length) followed by a JSON
+header and a raw payload. State snapshots and client inputs travel as the
+payload, so they are never re-encoded on the way through. Workers write
+sends without waiting; the front hands each one to the client's
+``ConnectionWriter``, which applies the drop policy (see outbound.py) with
+the ``key`` and reliable ``events`` the worker puts in the send header.
+
+Rooms can be moved between workers while players are connected
+(``ShardRouter.migrate_room``): the owning worker exports a snapshot, the
+target imports it and resumes the loop, and the front buffers the room's
+inputs in between, so clients only see a short pause in state updates.
+
+Spectators stay in the front: a room's worker sends its one spectator
+relay connection (see spectators.py) a frame per state, and the relay
+fans it out to the viewers there.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import struct
+import tempfile
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+from metrics import RoomMetrics
+from outbound import ConnectionWriter, reliable_effects
+from scheduler import TICK_BUDGET
+from spectators import SPECTATOR_DELAY, SPECTATOR_RATE, SpectatorRelay, relay_id
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!II")
+CONNECT_TIMEOUT = 10.0
+
+
+def shard_for(room_id: str, shard_count: int) -> int:
+    """Stable shard index of a room; identical across processes and restarts."""
+    return zlib.crc32(room_id.encode("utf-8")) % shard_count
+
+
+def write_frame(writer: asyncio.StreamWriter, header: dict, payload: bytes = b""):
+    head = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    writer.write(FRAME_HEADER.pack(len(head), len(payload)) + head + payload)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[dict, bytes]:
+    head_len, payload_len = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    data = await reader.readexactly(head_len + payload_len)
+    return json.loads(data[:head_len]), data[head_len:]
+
+
+# --- Worker side ---
+
+class ShardConnection:
+    """Stands in for a player's websocket inside a worker process.
+
+    It is its own outbound writer: sends go straight into the channel to
+    the front, which queues and drops per client.
+    """
+
+    __slots__ = ("player_id", "metrics", "dropped", "_writer")
+
+    def __init__(self, player_id: str, writer: asyncio.StreamWriter, metrics: Optional[RoomMetrics] = None):
+        self.player_id = player_id
+        self.metrics = metrics
+        # Drops happen in the front, where the client socket is
+        self.dropped = 0
+        self._writer = writer
+
+    @property
+    def closed(self) -> bool:
+        return self._writer.is_closing()
+
+    def enqueue(self, message, key: Optional[str] = None, effects: Optional[List[dict]] = None):
+        if self._writer.is_closing():
+            return
+        header = {"op": "send", "conn": self.player_id}
+        if isinstance(message, bytes):
+            header["binary"] = True
+            payload = message
+        else:
+            payload = message.encode("utf-8")
+        if key is not None:
+            header["key"] = key
+            events = reliable_effects(effects)
+            if events:
+                header["events"] = events
+        write_frame(self._writer, header, payload)
+        if self.metrics is not None:
+            self.metrics.bytes_sent += len(payload)
+
+    async def drain(self):
+        await self._writer.drain()
+
+    def close(self):
+        pass
+
+
+class ShardWorker:
+    """Serves one front process over a Unix socket with a private RoomManager."""
+
+    def __init__(self, index: int, socket_path: str, room_options: dict, replay_dir: Optional[str] = None,
+                 tick_budget: float = TICK_BUDGET):
+        from game_engine import RoomManager
+
+        self.index = index
+        self.socket_path = socket_path
+        self.room_manager = RoomManager(replay_dir, tick_budget, **room_options)
+        self._player_rooms: Dict[str, str] = {}
+        # Room of each spectator relay connection
+        self._relay_rooms: Dict[str, str] = {}
+
+    async def serve(self):
+        server = await asyncio.start_unix_server(self._handle_front, path=self.socket_path)
+        logger.info(f"Shard {self.index} listening on {self.socket_path}")
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_front(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                header, payload = await read_frame(reader)
+                try:
+                    self._dispatch(header, payload, writer)
+                except Exception as e:
+                    # One bad frame must not cut off every room on the shard
+                    logger.error(f"Shard {self.index} failed on {header.get('op')} frame: {e}", exc_info=True)
+        except asyncio.IncompleteReadError:
+            pass
+        finally:
+            # The front went away; nobody can reach these players any more
+            for player_id in list(self._player_rooms):
+                self._leave(player_id)
+            for conn_id in list(self._relay_rooms):
+                self._unspectate(conn_id)
+            writer.close()
+
+    def _dispatch(self, header: dict, payload: bytes, writer: asyncio.StreamWriter):
+        op = header["op"]
+        if op == "input":
+            room = self.room_manager.rooms.get(self._player_rooms.get(header["conn"]))
+            if room is None:
+                return
+            room.receive(header["conn"], payload if header.get("binary") else payload.decode("utf-8", "replace"))
+        elif op == "join":
+            player_id = header["conn"]
+            room = self.room_manager.get_or_create_room(header["room"])
+            room.add_player(player_id, header["name"], ShardConnection(player_id, writer, room.metrics),
+                            header["ship_class"])
+            # Registered first, so the front's leave removes the player even
+            # if the rest of the setup fails
+            self._player_rooms[player_id] = room.id
+            if header.get("codec") == "binary":
+                room.enable_binary(player_id)
+            elif header.get("delta"):
+                room.enable_delta(player_id)
+            if header.get("interest"):
+                room.enable_interest(player_id)
+            if header.get("rate") is not None:
+                room.set_send_rate(player_id, header["rate"])
+            room.effects.append({"type": "player_joined", "name": header["name"]})
+        elif op == "leave":
+            self._leave(header["conn"])
+        elif op == "spectate":
+            room = self.room_manager.get_or_create_room(header["room"])
+            room.add_relay(header["conn"], ShardConnection(header["conn"], writer, room.metrics), header["rate"])
+            self._relay_rooms[header["conn"]] = room.id
+        elif op == "unspectate":
+            self._unspectate(header["conn"])
+        elif op == "rooms":
+            rooms = [dict(room.summary(), shard=self.index) for room in self.room_manager.rooms.values()]
+            write_frame(writer, {"req": header["req"]}, json.dumps(rooms).encode("utf-8"))
+        elif op == "metrics":
+            doc = {
+                "rooms": [[rid, m.to_dict(), stats] for rid, m, stats in self.room_manager.metric_series()],
+                "retired": self.room_manager.retired_metrics.to_dict(),
+            }
+            write_frame(writer, {"req": header["req"]}, json.dumps(doc).encode("utf-8"))
+        elif op == "export":
+            room_id = header["room"]
+            if room_id not in self.room_manager.rooms:
+                write_frame(writer, {"req": header["req"], "error": f"room {room_id} is not on shard {self.index}"})
+                return
+            room = self.room_manager.rooms[room_id]
+            players = list(room.players)
+            modes = {"delta": room.delta_players(), "binary": room.binary_players(),
+                     "interest": room.interest_players(), "rates": room.send_rates(), "relays": room.relays()}
+            data = self.room_manager.export_room(room_id)
+            for player_id in players:
+                self._player_rooms.pop(player_id, None)
+            for conn_id in modes["relays"]:
+                self._relay_rooms.pop(conn_id, None)
+            write_frame(writer, {"req": header["req"], "players": players, "modes": modes}, data)
+        elif op == "import":
+            try:
+                room = self.room_manager.import_room(payload)
+            except ValueError as e:
+                write_frame(writer, {"req": header["req"], "error": str(e)})
+                return
+            for player_id in room.players:
+                room.connections[player_id] = ShardConnection(player_id, writer, room.metrics)
+                self._player_rooms[player_id] = room.id
+            # Per-connection encoding modes travel with the room; delta
+            # baselines stay behind, so the first broadcast is a keyframe
+            modes = header.get("modes", {})
+            for player_id in modes.get("delta", ()):
+                room.enable_delta(player_id)
+            for player_id in modes.get("binary", ()):
+                room.enable_binary(player_id)
+            for player_id in modes.get("interest", ()):
+                room.enable_interest(player_id)
+            for player_id, rate in modes.get("rates", {}).items():
+                room.set_send_rate(player_id, rate)
+            for conn_id, rate in modes.get("relays", {}).items():
+                room.add_relay(conn_id, ShardConnection(conn_id, writer, room.metrics), rate)
+                self._relay_rooms[conn_id] = room.id
+            write_frame(writer, {"req": header["req"], "room": room.id})
+
+    def _leave(self, player_id: str):
+        room_id = self._player_rooms.pop(player_id, None)
+        room = self.room_manager.rooms.get(room_id)
+        if room is None:
+            return
+        player_obj = room.players.get(player_id)
+        player_name = player_obj.name if player_obj else "Unknown"
+        room.remove_player(player_id)
+        room.effects.append({"type": "player_left", "name": player_name})
+        if not room.players:
+            self.room_manager.remove_empty_rooms()
+
+    def _unspectate(self, conn_id: str):
+        room = self.room_manager.rooms.get(self._relay_rooms.pop(conn_id, None))
+        if room is None:
+            return
+        room.remove_relay(conn_id)
+        if not room.players:
+            self.room_manager.remove_empty_rooms()
+
+
+def run_shard(index: int, socket_path: str, room_options: dict, replay_dir: Optional[str] = None,
+              tick_budget: float = TICK_BUDGET):
+    """Entry point of a worker process."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f'%(asctime)s - shard{index} - %(name)s - %(levelname)s - %(message)s'
+    )
+    try:
+        asyncio.run(ShardWorker(index, socket_path, room_options, replay_dir, tick_budget).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+# --- Front side ---
+
+class ShardClient:
+    """Front-process end of the channel to one worker."""
+
+    def __init__(self, index: int, socket_path: str):
+        self.index = index
+        self.socket_path = socket_path
+        # Outbound writers of the client websockets routed through this shard
+        self.writers: Dict[str, ConnectionWriter] = {}
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+
+    async def connect(self, timeout: float = CONNECT_TIMEOUT):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if loop.time() >= deadline:
+                    raise
+                await asyncio.sleep(0.05)
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    def send(self, header: dict, payload: bytes = b""):
+        write_frame(self._writer, header, payload)
+
+    async def request(self, header: dict, payload: bytes = b"") -> Tuple[dict, bytes]:
+        req = next(self._request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[req] = future
+        self.send(dict(header, req=req), payload)
+        reply, reply_payload = await future
+        if "error" in reply:
+            raise KeyError(reply["error"])
+        return reply, reply_payload
+
+    async def request_rooms(self) -> List[dict]:
+        _, payload = await self.request({"op": "rooms"})
+        return json.loads(payload)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                header, payload = await read_frame(self._reader)
+                if "req" in header:
+                    future = self._pending.pop(header["req"], None)
+                    if future is not None and not future.done():
+                        future.set_result((header, payload))
+                elif header["op"] == "send":
+                    writer = self.writers.get(header["conn"])
+                    if writer is None:
+                        continue
+                    if writer.closed:
+                        # The websocket handler notices the disconnect and leaves
+                        self.writers.pop(header["conn"], None)
+                        continue
+                    message = payload if header.get("binary") else payload.decode("utf-8")
+                    writer.enqueue(message, header.get("key"), header.get("events"))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.error(f"Lost connection to shard {self.index}")
+        except asyncio.CancelledError:
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"shard {self.index} unavailable"))
+            self._pending.clear()
+
+    async def close(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+        if self._writer:
+            self._writer.close()
+
+
+class ShardRouter:
+    """Spawns the worker processes and routes room traffic to them."""
+
+    def __init__(self, shard_count: int, room_options: Optional[dict] = None, replay_dir: Optional[str] = None,
+                 tick_budget: float = TICK_BUDGET):
+        self.shard_count = shard_count
+        self.room_options = dict(room_options or {})
+        # Where the workers record room replays, if anywhere
+        self.replay_dir = replay_dir
+        # Share of each tick interval a worker's rooms may simulate for
+        self.tick_budget = tick_budget
+        self._socket_dir: Optional[str] = None
+        self._processes: List[multiprocessing.Process] = []
+        self.shards: List[ShardClient] = []
+        # Rooms that were migrated away from their hashed shard
+        self.placements: Dict[str, int] = {}
+        # Players and relay feeds routed to each room; a room's worker drops
+        # it once they have all left, and with it any placement
+        self._members: Dict[str, Set[str]] = {}
+        # room id -> (target shard, frames held back while the room moves)
+        self._migrating: Dict[str, Tuple[ShardClient, list]] = {}
+        # Spectator relay of each room someone is watching
+        self.relays: Dict[str, SpectatorRelay] = {}
+
+    async def start(self):
+        # spawn, not fork: the front process already has a running event loop
+        ctx = multiprocessing.get_context("spawn")
+        self._socket_dir = tempfile.mkdtemp(prefix="starbattle-shards-")
+        for index in range(self.shard_count):
+            path = os.path.join(self._socket_dir, f"shard{index}.sock")
+            process = ctx.Process(target=run_shard, args=(index, path, self.room_options, self.replay_dir, self.tick_budget),
+                                  name=f"room-shard-{index}", daemon=True)
+            process.start()
+            self._processes.append(process)
+            self.shards.append(ShardClient(index, path))
+        await asyncio.gather(*(shard.connect() for shard in self.shards))
+        logger.info(f"Started {self.shard_count} room shards")
+
+    async def stop(self):
+        for shard in self.shards:
+            await shard.close()
+        for process in self._processes:
+            process.terminate()
+        for process in self._processes:
+            process.join(timeout=5)
+        if self._socket_dir:
+            for name in os.listdir(self._socket_dir):
+                os.unlink(os.path.join(self._socket_dir, name))
+            os.rmdir(self._socket_dir)
+            self._socket_dir = None
+        self._processes.clear()
+        self.shards.clear()
+        self.placements.clear()
+        self._members.clear()
+
+    def shard_of(self, room_id: str) -> ShardClient:
+        index = self.placements.get(room_id)
+        if index is None:
+            index = shard_for(room_id, self.shard_count)
+        return self.shards[index]
+
+    def _route(self, room_id: str, header: dict, payload: bytes = b""):
+        migration = self._migrating.get(room_id)
+        if migration is not None:
+            migration[1].append((header, payload))
+        else:
+            self.shard_of(room_id).send(header, payload)
+
+    def join(self, websocket, room_id: str, player_id: str, name: str, ship_class: str, delta: bool = False,
+             codec: str = "json", interest: bool = False, rate: Optional[float] = None, compressor=None):
+        migration = self._migrating.get(room_id)
+        shard = migration[0] if migration is not None else self.shard_of(room_id)
+        # Frames are compressed here in the front, off the room's worker
+        shard.writers[player_id] = ConnectionWriter(websocket, compressor=compressor)
+        self._members.setdefault(room_id, set()).add(player_id)
+        self._route(room_id, {"op": "join", "conn": player_id, "room": room_id, "name": name,
+                              "ship_class": ship_class, "delta": delta, "codec": codec, "interest": interest,
+                              "rate": rate})
+
+    def send_input(self, room_id: str, player_id: str, data):
+        """Forward one input frame, binary or text, to the room's worker."""
+        if isinstance(data, str):
+            self._route(room_id, {"op": "input", "conn": player_id}, data.encode("utf-8"))
+        else:
+            self._route(room_id, {"op": "input", "conn": player_id, "binary": True}, data)
+
+    def leave(self, room_id: str, player_id: str):
+        self._drop_writer(room_id, player_id)
+        self._route(room_id, {"op": "leave", "conn": player_id})
+        self._forget(room_id, player_id)
+
+    def spectate(self, websocket, room_id: str, viewer_id: str, rate: float = SPECTATOR_RATE,
+                 delay: float = SPECTATOR_DELAY):
+        """Add a viewer to the room's spectator relay, starting the relay's
+        feed from the worker if it is the first."""
+        relay = self.relays.get(room_id)
+        if relay is None:
+            migration = self._migrating.get(room_id)
+            shard = migration[0] if migration is not None else self.shard_of(room_id)
+            relay = self.relays[room_id] = SpectatorRelay(rate, delay)
+            shard.writers[relay_id(room_id)] = relay
+            self._members.setdefault(room_id, set()).add(relay_id(room_id))
+            self._route(room_id, {"op": "spectate", "conn": relay_id(room_id), "room": room_id, "rate": rate})
+        relay.add(viewer_id, websocket)
+
+    def unspectate(self, room_id: str, viewer_id: str):
+        """Remove a viewer; the last one out stops the room's feed."""
+        relay = self.relays.get(room_id)
+        if relay is None:
+            return
+        relay.remove(viewer_id)
+        if not relay.viewers:
+            del self.relays[room_id]
+            self._drop_writer(room_id, relay_id(room_id))
+            self._route(room_id, {"op": "unspectate", "conn": relay_id(room_id)})
+            self._forget(room_id, relay_id(room_id))
+
+    def _forget(self, room_id: str, conn_id: str):
+        members = self._members.get(room_id, set())
+        members.discard(conn_id)
+        if members:
+            return
+        self._members.pop(room_id, None)
+        # The worker removes the room on this last leave; a later join
+        # creates it afresh on its hashed shard. A moving room keeps its
+        # placement until the held leave has reached the target.
+        if room_id not in self._migrating:
+            self.placements.pop(room_id, None)
+
+    def _drop_writer(self, room_id: str, conn_id: str):
+        writer = self.shard_of(room_id).writers.pop(conn_id, None)
+        migration = self._migrating.get(room_id)
+        if migration is not None:
+            writer = migration[0].writers.pop(conn_id, None) or writer
+        if writer is not None:
+            writer.close()
+
+    async def migrate_room(self, room_id: str, target_index: int):
+        """Move a live room to another worker without dropping its players.
+
+        Inputs, joins and leaves for the room are held in the front while
+        the snapshot is in flight and replayed on the target afterwards.
+        """
+        source = self.shard_of(room_id)
+        target = self.shards[target_index]
+        if source is target or room_id in self._migrating:
+            return
+        self._migrating[room_id] = (target, [])
+        try:
+            reply, snapshot = await source.request({"op": "export", "room": room_id})
+            # Hand the websockets over first so the target's first broadcast
+            # already reaches them
+            moved = {}
+            for conn_id in reply["players"] + list(reply["modes"]["relays"]):
+                writer = source.writers.pop(conn_id, None)
+                if writer is not None:
+                    moved[conn_id] = writer
+            target.writers.update(moved)
+            try:
+                await target.request({"op": "import", "modes": reply["modes"]}, snapshot)
+            except Exception:
+                # Put the room back where it was rather than lose the match
+                for player_id in moved:
+                    target.writers.pop(player_id, None)
+                source.writers.update(moved)
+                await source.request({"op": "import", "modes": reply["modes"]}, snapshot)
+                raise
+            self.placements[room_id] = target_index
+        finally:
+            _, held = self._migrating.pop(room_id)
+            owner = self.shard_of(room_id)
+            for header, payload in held:
+                owner.send(header, payload)
+            if room_id not in self._members:
+                # Everyone left while it moved
+                self.placements.pop(room_id, None)
+        logger.info(f"Migrated room {room_id} from shard {source.index} to shard {target_index} "
+                    f"({len(snapshot)} byte snapshot)")
+
+    async def drain_shard(self, index: int):
+        """Migrate every room off one worker, to the least loaded others."""
+        rooms = await self.list_rooms()
+        load = {i: 0 for i in range(self.shard_count) if i != index}
+        for room in rooms:
+            if room["shard"] in load:
+                load[room["shard"]] += room["playerCount"]
+        for room in rooms:
+            if room["shard"] != index:
+                continue
+            target = min(load, key=load.get)
+            await self.migrate_room(room["id"], target)
+            load[target] += room["playerCount"]
+
+    async def collect_metrics(self) -> Tuple[list, RoomMetrics]:
+        """Metric series of every room on every shard, plus the shards'
+        combined retired metrics; the arguments of ``metrics.render``."""
+        replies = await asyncio.gather(*(shard.request({"op": "metrics"}) for shard in self.shards),
+                                       return_exceptions=True)
+        series = []
+        retired = RoomMetrics()
+        for shard, reply in zip(self.shards, replies):
+            if isinstance(reply, Exception):
+                logger.error(f"Shard {shard.index} did not report metrics: {reply}")
+                continue
+            doc = json.loads(reply[1])
+            series.extend((rid, RoomMetrics.from_dict(m), stats) for rid, m, stats in doc["rooms"])
+            retired.merge(RoomMetrics.from_dict(doc["retired"]), gauges=False)
+        return series, retired
+
+    async def list_rooms(self) -> List[dict]:
+        results = await asyncio.gather(*(shard.request_rooms() for shard in self.shards),
+                                       return_exceptions=True)
+        rooms = []
+        for shard, result in zip(self.shards, results):
+            if isinstance(result, Exception):
+                logger.error(f"Shard {shard.index} did not report its rooms: {result}")
+                continue
+            rooms.extend(result)
+        return rooms
@@ -0,0 +1,135 @@
+import math
+
+import numpy as np
+
+# Row layout of ShipArrays.data. Each row is one contiguous float64 field.
+X, Z, VX, VZ, ROTATION, MOVE_TARGET_X, MOVE_TARGET_Z, HAS_MOVE_TARGET, SLOW_AMOUNT = range(9)
+FIELD_ROWS = {
+    "x": X,
+    "z": Z,
+    "vx": VX,
+    "vz": VZ,
+    "rotation": ROTATION,
+    "move_target_x": MOVE_TARGET_X,
+    "move_target_z": MOVE_TARGET_Z,
+    "has_move_target": HAS_MOVE_TARGET,
+    "slow_amount": SLOW_AMOUNT,
+}
+
+TWO_PI = 2 * math.pi
+
+
+class ShipArrays:
+    """Structure-of-arrays storage for ship kinematics.
+
+    Ships own a slot (column) for their lifetime in the room; freed slots
+    are reused. ``integrate`` advances the movement physics of many ships
+    in one vectorized pass and mirrors the scalar path in
+    ``GameRoom._move_player`` operation for operation.
+    """
+
+    def __init__(self, capacity: int = 16):
+        self.data = np.zeros((len(FIELD_ROWS), capacity), dtype=np.float64)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    @property
+    def capacity(self) -> int:
+        return self.data.shape[1]
+
+    def allocate(self) -> int:
+        if not self._free:
+            old = self.capacity
+            grown = np.zeros((self.data.shape[0], old * 2), dtype=np.float64)
+            grown[:, :old] = self.data
+            self.data = grown
+            self._free = list(range(old * 2 - 1, old - 1, -1))
+        return self._free.pop()
+
+    def release(self, slot: int):
+        self.data[:, slot] = 0.0
+        self._free.append(slot)
+
+    def integrate(self, slots, dt: float, arena_size: float, max_speed: float,
+                  acceleration: float, drag: float, rotation_speed: float, step: float = 1.0,
+                  rest_speed: float = 0.0):
+        """Move the ships in ``slots``. Thrust, drag and velocity are per
+        ``step``-scaled base tick; coasting ships slower than ``rest_speed``
+        stop. See GameRoom._move_player."""
+        if len(slots) == 0:
+            return
+        idx = np.asarray(slots, dtype=np.intp)
+        x, z, vx, vz, rot, tx, tz, has_target, slow = self.data[:, idx]
+
+        # Steering toward the move target
+        dx = tx - x
+        dz = tz - z
+        dist_to_target = np.sqrt(dx * dx + dz * dz)
+        moving = has_target != 0.0
+        steering = moving & (dist_to_target > 2.0)
+        has_target = np.where(moving & ~steering, 0.0, has_target)
+
+        desired = np.arctan2(dx, dz)
+        angle_diff = desired - rot
+        while np.any(angle_diff > math.pi):
+            angle_diff = np.where(angle_diff > math.pi, angle_diff - TWO_PI, angle_diff)
+        while np.any(angle_diff < -math.pi):
+            angle_diff = np.where(angle_diff < -math.pi, angle_diff + TWO_PI, angle_diff)
+        rotation_amount = rotation_speed * dt
+        turned = np.where(
+            np.abs(angle_diff) < rotation_amount,
+            desired,
+            rot + rotation_amount * np.where(angle_diff > 0, 1.0, -1.0),
+        )
+        rot = np.where(steering, np.mod(turned, TWO_PI), rot)
+
+        slow_factor = np.where(slow > 0, 1 - slow, 1.0)
+        accel = acceleration * slow_factor * step
+        vx = vx + np.where(steering, np.sin(rot) * accel, 0.0)
+        vz = vz + np.where(steering, np.cos(rot) * accel, 0.0)
+
+        # Drag and max speed
+        vx = vx * drag ** step
+        vz = vz * drag ** step
+        limit = max_speed * slow_factor
+        speed = np.sqrt(vx ** 2 + vz ** 2)
+        over = speed > limit
+        safe_speed = np.where(over, speed, 1.0)
+        vx = np.where(over, (vx / safe_speed) * limit, vx)
+        vz = np.where(over, (vz / safe_speed) * limit, vz)
+        rest = ~over & (speed < rest_speed) & (has_target == 0.0)
+        vx = np.where(rest, 0.0, vx)
+        vz = np.where(rest, 0.0, vz)
+
+        # Position and arena bounce
+        x = x + vx * step
+        z = z + vz * step
+        out_x = np.abs(x) > arena_size
+        out_z = np.abs(z) > arena_size
+        x = np.clip(x, -arena_size, arena_size)
+        z = np.clip(z, -arena_size, arena_size)
+        vx = np.where(out_x, vx * -0.5, vx)
+        vz = np.where(out_z, vz * -0.5, vz)
+
+        self.data[X, idx] = x
+        self.data[Z, idx] = z
+        self.data[VX, idx] = vx
+        self.data[VZ, idx] = vz
+        self.data[ROTATION, idx] = rot
+        self.data[HAS_MOVE_TARGET, idx] = has_target
+
+
+class ShipField:
+    """Attribute that reads and writes one ship's column in ShipArrays."""
+
+    def __init__(self, row: int, as_bool: bool = False):
+        self.row = row
+        self.as_bool = as_bool
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj._ships.data[self.row, obj._slot]
+        return bool(value) if self.as_bool else float(value)
+
+    def __set__(self, obj, value):
+        obj._ships.data[self.row, obj._slot] = value
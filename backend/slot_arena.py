@@ -0,0 +1,82 @@
+from typing import Generic, Iterator, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+SLOT_BITS = 32
+SLOT_MASK = (1 << SLOT_BITS) - 1
+
+
+class SlotArena(Generic[T]):
+    """Dense entity storage with stable generational handles.
+
+    Items are kept packed in a list for fast iteration. Each item gets an
+    integer handle (generation << 32 | slot) that stays valid until the
+    item is removed; afterwards the slot's generation moves on, so stale
+    handles resolve to None instead of whichever item reuses the slot.
+    Removal swaps the last item into the hole, which makes it O(1) but
+    means iteration order is not insertion order.
+
+    Items must have a writable ``handle`` attribute.
+    """
+
+    def __init__(self):
+        self._items: List[T] = []
+        self._item_slots: List[int] = []
+        self._slot_index: List[int] = []
+        self._slot_generation: List[int] = []
+        self._free_slots: List[int] = []
+
+    def add(self, item: T) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._slot_index)
+            self._slot_index.append(-1)
+            self._slot_generation.append(0)
+        self._slot_index[slot] = len(self._items)
+        self._items.append(item)
+        self._item_slots.append(slot)
+        handle = (self._slot_generation[slot] << SLOT_BITS) | slot
+        item.handle = handle
+        return handle
+
+    def get(self, handle: int) -> Optional[T]:
+        slot = handle & SLOT_MASK
+        if slot >= len(self._slot_index) or self._slot_generation[slot] != handle >> SLOT_BITS:
+            return None
+        index = self._slot_index[slot]
+        return self._items[index] if index >= 0 else None
+
+    def discard(self, item: T) -> bool:
+        """Remove ``item`` if it is still live; returns whether it was."""
+        handle = item.handle
+        if self.get(handle) is not item:
+            return False
+        slot = handle & SLOT_MASK
+        index = self._slot_index[slot]
+        last = len(self._items) - 1
+        if index != last:
+            moved = self._items[last]
+            moved_slot = self._item_slots[last]
+            self._items[index] = moved
+            self._item_slots[index] = moved_slot
+            self._slot_index[moved_slot] = index
+        self._items.pop()
+        self._item_slots.pop()
+        self._slot_index[slot] = -1
+        self._slot_generation[slot] += 1
+        self._free_slots.append(slot)
+        return True
+
+    def clear(self):
+        for item in list(self._items):
+            self.discard(item)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._items)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __bool__(self) -> bool:
+        return bool(self._items)
@@ -0,0 +1,175 @@
+import math
+from typing import Iterable, List, Optional
+
+
+class SpatialGrid:
+    """Uniform spatial hash over the square arena plane.
+
+    Entities are bucketed by cell once per tick (``rebuild``) and every
+    proximity query only visits the cells that can contain a hit. Query
+    results are returned in insertion order, so callers that apply damage
+    or emit effects behave exactly like a scan over ``GameRoom.players``.
+
+    Liveness is checked at query time, which means deaths during a tick do
+    not invalidate the index; only position changes do.
+    """
+
+    # Below this population a flat scan is cheaper than walking cells.
+    linear_scan_max = 16
+
+    def __init__(self, half_extent: float, cell_size: float):
+        self.half_extent = half_extent
+        self.cell_size = cell_size
+        self.cells_per_axis = max(1, int(math.ceil(2 * half_extent / cell_size)))
+        self._cells: List[list] = [[] for _ in range(self.cells_per_axis * self.cells_per_axis)]
+        self._occupied: List[int] = []
+        self._entries: List[tuple] = []
+
+    def _cell_coord(self, v: float) -> int:
+        c = int((v + self.half_extent) // self.cell_size)
+        if c < 0:
+            return 0
+        if c >= self.cells_per_axis:
+            return self.cells_per_axis - 1
+        return c
+
+    def rebuild(self, entities: Iterable):
+        for idx in self._occupied:
+            self._cells[idx].clear()
+        self._occupied.clear()
+        self._entries = []
+        n = self.cells_per_axis
+        for order, ent in enumerate(entities):
+            entry = (order, ent)
+            self._entries.append(entry)
+            idx = self._cell_coord(ent.z) * n + self._cell_coord(ent.x)
+            cell = self._cells[idx]
+            if not cell:
+                self._occupied.append(idx)
+            cell.append(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _is_linear(self) -> bool:
+        return len(self._entries) <= self.linear_scan_max
+
+    def _block(self, cx0: int, cz0: int, cx1: int, cz1: int) -> List[tuple]:
+        n = self.cells_per_axis
+        cells = self._cells
+        found = []
+        for cz in range(max(0, cz0), min(n - 1, cz1) + 1):
+            row = cz * n
+            for cx in range(max(0, cx0), min(n - 1, cx1) + 1):
+                cell = cells[row + cx]
+                if cell:
+                    found.extend(cell)
+        if len(found) > 1:
+            found.sort(key=lambda e: e[0])
+        return found
+
+    def nearest(self, x: float, z: float, exclude_id: Optional[str] = None,
+                max_range: float = float('inf')):
+        """Closest live entity to (x, z) strictly within ``max_range``."""
+        if self._is_linear():
+            nearest = None
+            nearest_dist = float('inf')
+            for _, ent in self._entries:
+                if ent.id == exclude_id or not ent.alive:
+                    continue
+                dist = math.sqrt((ent.x - x) ** 2 + (ent.z - z) ** 2)
+                if dist < nearest_dist and dist < max_range:
+                    nearest = ent
+                    nearest_dist = dist
+            return nearest
+
+        n = self.cells_per_axis
+        size = self.cell_size
+        cx = self._cell_coord(x)
+        cz = self._cell_coord(z)
+        cells = self._cells
+        nearest = None
+        nearest_order = -1
+        nearest_dist = float('inf')
+        for r in range(n):
+            for gz in range(cz - r, cz + r + 1):
+                if gz < 0 or gz >= n:
+                    continue
+                edge = gz == cz - r or gz == cz + r
+                step = 1 if edge else 2 * r
+                for gx in range(cx - r, cx + r + 1, step if r else 1):
+                    if gx < 0 or gx >= n:
+                        continue
+                    for order, ent in cells[gz * n + gx]:
+                        if ent.id == exclude_id or not ent.alive:
+                            continue
+                        dist = math.sqrt((ent.x - x) ** 2 + (ent.z - z) ** 2)
+                        if dist >= max_range:
+                            continue
+                        if dist < nearest_dist or (dist == nearest_dist and order < nearest_order):
+                            nearest = ent
+                            nearest_dist = dist
+                            nearest_order = order
+            # Everything not yet visited lies outside this block of cells.
+            inf = float('inf')
+            lo_x = (cx - r) * size - self.half_extent
+            hi_x = (cx + r + 1) * size - self.half_extent
+            lo_z = (cz - r) * size - self.half_extent
+            hi_z = (cz + r + 1) * size - self.half_extent
+            bound = min(
+                x - lo_x if cx - r > 0 else inf,
+                hi_x - x if cx + r < n - 1 else inf,
+                z - lo_z if cz - r > 0 else inf,
+                hi_z - z if cz + r < n - 1 else inf,
+            )
+            if bound == inf or nearest_dist < bound or bound >= max_range:
+                break
+        return nearest
+
+    def query_radius(self, x: float, z: float, radius: float,
+                     exclude_id: Optional[str] = None) -> list:
+        """Live entities strictly within ``radius`` of (x, z), in insertion order."""
+        if self._is_linear():
+            candidates = self._entries
+        else:
+            candidates = self._block(
+                self._cell_coord(x - radius), self._cell_coord(z - radius),
+                self._cell_coord(x + radius), self._cell_coord(z + radius),
+            )
+        hits = []
+        for _, ent in candidates:
+            if ent.id == exclude_id or not ent.alive:
+                continue
+            dist = math.sqrt((ent.x - x) ** 2 + (ent.z - z) ** 2)
+            if dist < radius:
+                hits.append(ent)
+        return hits
+
+    def query_segment(self, x: float, z: float, ndx: float, ndz: float, length: float,
+                      width: float, exclude_id: Optional[str] = None) -> list:
+        """Live entities within ``width`` of the ray from (x, z) along the unit
+        direction (ndx, ndz), projected between 0 and ``length``."""
+        if self._is_linear():
+            candidates = self._entries
+        else:
+            ex = x + ndx * length
+            ez = z + ndz * length
+            candidates = self._block(
+                self._cell_coord(min(x, ex) - width), self._cell_coord(min(z, ez) - width),
+                self._cell_coord(max(x, ex) + width), self._cell_coord(max(z, ez) + width),
+            )
+        hits = []
+        for _, ent in candidates:
+            if ent.id == exclude_id or not ent.alive:
+                continue
+            to_x = ent.x - x
+            to_z = ent.z - z
+            t = to_x * ndx + to_z * ndz
+            if t < 0 or t > length:
+                continue
+            closest_x = x + ndx * t
+            closest_z = z + ndz * t
+            dist = math.sqrt((ent.x - closest_x) ** 2 + (ent.z - closest_z) ** 2)
+            if dist < width:
+                hits.append(ent)
+        return hits
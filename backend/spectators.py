@@ -0,0 +1,121 @@
+"""Spectator relays: one room connection fanned out to many viewers.
+
+A room treats a ``SpectatorRelay`` as a single connection with no ship: it
+is sent one full JSON state per snapshot at its own, lower rate (see
+``GameRoom.set_send_rate``), encoded once however many viewers it has.
+``enqueue`` only appends to a buffer, so the room's tick cost does not
+depend on the audience. The relay's own task then hands each message,
+``delay`` seconds later, to every viewer's ``ConnectionWriter``, which
+applies the usual latest-state-wins drop policy (see outbound.py) per
+viewer.
+
+In sharded mode the relay lives in the front process, next to the viewer
+websockets, and the room's worker sends it one frame per state.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from outbound import ConnectionWriter
+
+logger = logging.getLogger(__name__)
+
+# States per second sent to spectators, and how far behind the match they
+# are shown, in seconds; tournament streams usually want a delay
+SPECTATOR_RATE = 10.0
+SPECTATOR_DELAY = 0.0
+
+
+def relay_id(room_id: str) -> str:
+    """Connection id of a room's relay; player ids never contain a colon."""
+    return f"spectate:{room_id}"
+
+
+class SpectatorRelay:
+    """Buffers a room's spectator states and fans them out to the viewers."""
+
+    def __init__(self, rate: float = SPECTATOR_RATE, delay: float = SPECTATOR_DELAY, metrics=None,
+                 clock=time.monotonic):
+        self.rate = rate
+        self.delay = delay
+        # RoomMetrics the viewers' writers credit, if any
+        self.metrics = metrics
+        self.viewers: Dict[str, ConnectionWriter] = {}
+        self.closed = False
+        # (due time, message, key, effects), oldest first
+        self._buffer: deque = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return len(self.viewers)
+
+    @property
+    def dropped(self) -> int:
+        return sum(writer.dropped for writer in self.viewers.values())
+
+    def add(self, viewer_id: str, websocket) -> ConnectionWriter:
+        writer = ConnectionWriter(websocket, self.metrics)
+        self.viewers[viewer_id] = writer
+        return writer
+
+    def remove(self, viewer_id: str):
+        writer = self.viewers.pop(viewer_id, None)
+        if writer is not None:
+            writer.close()
+
+    def enqueue(self, message, key: Optional[str] = None, effects: Optional[List[dict]] = None):
+        """Hold ``message`` for ``delay`` seconds, then queue it on every
+        viewer. Never touches a viewer from the caller."""
+        if self.closed:
+            return
+        self._buffer.append((self._clock() + self.delay, message, key, effects))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        buffer = self._buffer
+        try:
+            while buffer:
+                wait = buffer[0][0] - self._clock()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                _, message, key, effects = buffer.popleft()
+                self._fan_out(message, key, effects)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._task = None
+
+    def _fan_out(self, message, key: Optional[str], effects: Optional[List[dict]]):
+        closed = []
+        for viewer_id, writer in self.viewers.items():
+            if writer.closed:
+                # Its socket failed or it fell behind; the handler cleans up
+                closed.append(viewer_id)
+            else:
+                writer.enqueue(message, key, effects)
+        for viewer_id in closed:
+            del self.viewers[viewer_id]
+
+    async def drain(self):
+        """Wait until everything enqueued so far has been sent to every viewer."""
+        while self._task is not None:
+            await asyncio.shield(self._task)
+        for writer in list(self.viewers.values()):
+            await writer.drain()
+
+    def close(self):
+        """Stop relaying and close every viewer's writer."""
+        self.closed = True
+        self._buffer.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for writer in self.viewers.values():
+            writer.close()
+        self.viewers.clear()
@@ -0,0 +1,20 @@
+"""
+Stand-ins shared by the tests
+"""
+
+
+class FakeWebSocket:
+    """Records every frame a room sends to one client, text or binary"""
+
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+
+    async def send_text(self, text):
+        self.sent.append(text)
+
+    async def send_bytes(self, data):
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.closed_with = code
@@ -0,0 +1,155 @@
+"""
+Tests for the binary snapshot codec and its per-connection negotiation
+"""
+
+import asyncio
+import json
+import random
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from binary_codec import SnapshotCodec  # noqa: E402
+from game_engine import ARENA_SIZE, GameRoom  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+# One step of the coarsest rounding on either side: JSON and the codec
+# both round hull, shields and energy to 0.1, but not always the same way
+TOLERANCE = 0.1 + 1e-9
+
+
+def brawl_room(seed=4):
+    room = GameRoom("binary", seed=seed)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(9):
+        p = room.add_player(f"p{i}", f"Pilot {i}", FakeWebSocket(), classes[i % 3])
+        p.x = (i - 4) * 10.0
+        p.z = (i % 3) * 8.0
+    return room
+
+
+def play(room, rng, ticks):
+    for _ in range(ticks):
+        for player_id in room.players:
+            roll = rng.random()
+            if roll < 0.3:
+                room.queue_message(player_id, {"type": "move", "x": rng.uniform(-60, 60), "z": rng.uniform(-60, 60)})
+            elif roll < 0.5:
+                room.queue_message(player_id, {"type": "fire_start", "x": rng.uniform(-40, 40), "z": rng.uniform(-40, 40)})
+            elif roll < 0.6:
+                room.queue_message(player_id, {"type": "ability", "id": rng.choice("qwer"),
+                                               "x": rng.uniform(-40, 40), "z": rng.uniform(-40, 40)})
+        room._simulate_tick()
+
+
+def assert_close(decoded, expected, path="state"):
+    if isinstance(expected, dict):
+        assert list(decoded) == list(expected), path
+        for key in expected:
+            assert_close(decoded[key], expected[key], f"{path}.{key}")
+    elif isinstance(expected, list):
+        assert len(decoded) == len(expected), path
+        for i, (d, e) in enumerate(zip(decoded, expected)):
+            assert_close(d, e, f"{path}[{i}]")
+    elif isinstance(expected, float) or (isinstance(expected, int) and isinstance(decoded, float)):
+        assert abs(decoded - expected) <= TOLERANCE, (path, decoded, expected)
+    else:
+        assert decoded == expected, (path, decoded, expected)
+
+
+class TestCodec:
+    """Frames decode to the JSON state within quantization error"""
+
+    def test_round_trip_matches_json_state(self):
+        room = brawl_room()
+        codec = SnapshotCodec(ARENA_SIZE)
+        rng = random.Random(1)
+        checked = 0
+        for _ in range(30):
+            play(room, rng, 5)
+            frame = codec.encode(
+                room.tick, room.players.values(), [m for m in room.missiles if m.alive],
+                [b for b in room.bombardment_zones if not b.exploded], room.spore_clouds,
+                [m for m in room.mutalisks if m.alive], list(room.effects), room._roster)
+            state = room._state_message()
+            roster = json.loads(room._roster.message())
+            assert_close(codec.decode(frame, roster), state)
+            assert len(frame) < len(json.dumps(state)) / 4
+            checked += len(state["missiles"]) + len(state["mutalisks"]) + len(state["sporeClouds"])
+        assert checked > 0
+        print(f"SUCCESS: 30 frames decoded within {TOLERANCE}, {checked} entities checked")
+
+    def test_quantization_clamps_out_of_range_values(self):
+        room = GameRoom("clamp", seed=1)
+        p = room.add_player("a", "A", None, "vanguard")
+        p.x = ARENA_SIZE * 5
+        p.z = -ARENA_SIZE * 5
+        p.vx = 1e6
+        p.max_hull = 1e12
+        codec = SnapshotCodec(ARENA_SIZE)
+        frame = codec.encode(0, room.players.values(), [], [], [], [], [], room._roster)
+        player = codec.decode(frame, json.loads(room._roster.message()))["players"][0]
+        assert player["x"] == ARENA_SIZE and player["z"] == -ARENA_SIZE
+        assert player["vx"] == 32.767
+        assert player["maxHull"] == 6553.5
+        print("SUCCESS: out-of-range values saturate instead of wrapping")
+
+
+class TestNegotiation:
+    """Binary connections get a roster, then frames; JSON is unchanged"""
+
+    def test_binary_and_json_connections(self):
+        async def run():
+            room = brawl_room()
+            sockets = list(room.connections.values())
+            room.enable_binary("p0")
+            codec = SnapshotCodec(ARENA_SIZE)
+            rng = random.Random(2)
+            play(room, rng, 3)
+            room._broadcast_state()
+            await room.flush()
+            binary_ws, json_ws = room.connections["p0"], room.connections["p1"]
+            roster_text, frame = binary_ws.sent
+            roster = json.loads(roster_text)
+            assert roster["type"] == "roster"
+            assert [entry[1] for entry in roster["players"]] == list(room.players)
+            assert_close(codec.decode(frame, roster), json.loads(json_ws.sent[-1]))
+
+            # No roster while nobody joins or leaves
+            play(room, rng, 1)
+            room._broadcast_state()
+            await room.flush()
+            assert len(binary_ws.sent) == 3 and isinstance(binary_ws.sent[-1], bytes)
+
+            room.remove_player("p4")
+            sockets.append(FakeWebSocket())
+            room.add_player("late", "Late", sockets[-1], "leviathan")
+            play(room, rng, 1)
+            room._broadcast_state()
+            await room.flush()
+            roster = json.loads(binary_ws.sent[-2])
+            assert "late" in [entry[1] for entry in roster["players"]]
+            assert_close(codec.decode(binary_ws.sent[-1], roster), json.loads(json_ws.sent[-1]))
+            return room, sockets
+
+        room, sockets = asyncio.run(run())
+        binary_bytes = sum(len(m) for m in room.connections["p0"].sent)
+        json_bytes = sum(len(m) for m in room.connections["p1"].sent)
+        assert room.metrics.bytes_sent == sum(sum(map(len, ws.sent)) for ws in sockets)
+        print(f"SUCCESS: binary {binary_bytes} B vs JSON {json_bytes} B over 3 snapshots")
+
+    def test_binary_only_room_skips_state_dicts(self):
+        async def run():
+            room = brawl_room()
+            for player_id in room.players:
+                room.enable_binary(player_id)
+            room._state_message = None  # would raise if called
+            play(room, random.Random(3), 2)
+            room._broadcast_state()
+            await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        assert all(isinstance(ws.sent[-1], bytes) for ws in room.connections.values())
+        assert not room.effects
+        print("SUCCESS: a binary-only room never builds JSON state")
@@ -0,0 +1,128 @@
+"""
+Tests for per-connection snapshot compression: deflate streams, shared
+dictionary zstd, and off-loop compression of large frames
+"""
+
+import asyncio
+import json
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, '/app/backend')
+
+import compression  # noqa: E402
+from compression import DEFLATE, ZSTD, DeflateCompressor, compressor_for, decompressor_for  # noqa: E402
+from game_engine import GameRoom  # noqa: E402
+from metrics import RoomMetrics  # noqa: E402
+from outbound import ConnectionWriter  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def brawl_room():
+    room = GameRoom("compress", seed=11)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(6):
+        p = room.add_player(f"p{i}", f"P{i}", FakeWebSocket(), classes[i % 3])
+        p.x = (i - 3) * 10.0
+        p.z = (i % 2) * 8.0
+    return room
+
+
+def run_brawl(room, ticks=40):
+    async def run():
+        rng = random.Random(6)
+        for _ in range(ticks):
+            for player_id in room.players:
+                if rng.random() < 0.4:
+                    room.queue_message(player_id, {"type": "fire_start",
+                                                   "x": rng.uniform(-30, 30), "z": rng.uniform(-30, 30)})
+            room._simulate_tick()
+            room._broadcast_state()
+            await room.flush()
+
+    asyncio.run(run())
+
+
+class TestDeflate:
+    """A deflate connection inflates to exactly what plain connections get"""
+
+    def test_stream_round_trip(self):
+        room = brawl_room()
+        room.enable_compression("p0", compressor_for(DEFLATE))
+        room.enable_binary("p1")
+        room.enable_compression("p1", compressor_for(DEFLATE))
+        room.enable_binary("p2")
+        run_brawl(room)
+        inflate = decompressor_for(DEFLATE)
+        assert all(isinstance(f, bytes) for f in room.connections["p0"].sent)
+        assert [inflate(f) for f in room.connections["p0"].sent] == room.connections["p3"].sent
+        inflate = decompressor_for(DEFLATE)
+        assert [inflate(f) for f in room.connections["p1"].sent] == room.connections["p2"].sent
+        plain = sum(len(t) for t in room.connections["p3"].sent)
+        packed = sum(map(len, room.connections["p0"].sent))
+        assert packed < plain / 4
+        assert room.metrics.compressed_input_bytes == plain + sum(map(len, room.connections["p2"].sent))
+        print(f"SUCCESS: {plain} bytes of JSON states sent as {packed}")
+
+    def test_input_bytes_encoded(self):
+        async def run():
+            metrics = RoomMetrics()
+            writer = ConnectionWriter(FakeWebSocket(), metrics, compressor=compressor_for(DEFLATE))
+            writer.enqueue(json.dumps({"type": "player_joined", "name": "Zoë ★"}, ensure_ascii=False))
+            writer.enqueue(b"\x01\x02\x03")
+            await writer.drain()
+            return metrics.compressed_input_bytes
+
+        text = json.dumps({"type": "player_joined", "name": "Zoë ★"}, ensure_ascii=False)
+        assert asyncio.run(run()) == len(text.encode("utf-8")) + 3 > len(text) + 3
+        print("SUCCESS: compression input counted in encoded bytes")
+
+    def test_large_frames_compressed_off_loop(self, monkeypatch):
+        monkeypatch.setattr(compression, "OFFLOAD_BYTES", 0)
+        monkeypatch.setattr(compression, "_executor", None)
+        room = brawl_room()
+        room.enable_compression("p0", DeflateCompressor())
+        run_brawl(room, ticks=10)
+        inflate = decompressor_for(DEFLATE)
+        assert [inflate(f) for f in room.connections["p0"].sent] == room.connections["p1"].sent
+        assert compression._executor is not None
+        print("SUCCESS: frames compressed on the thread pool arrive whole and in order")
+
+    def test_unknown_mode_sends_plain(self):
+        assert compressor_for(None) is None
+        assert compressor_for("brotli") is None
+        print("SUCCESS: unknown compression modes leave the connection uncompressed")
+
+
+class TestZstd:
+    """Dictionary zstd is compressed once per message for every connection"""
+
+    def test_shared_message_compressed_once(self, monkeypatch):
+        zstandard = pytest.importorskip("zstandard")
+        samples = [json.dumps({"type": "state", "tick": i, "players": [{"id": f"p{j}", "name": f"P{j}",
+                                                                        "x": i * j} for j in range(6)]})
+                   for i in range(200)]
+        shared = compression.ZstdCompressor(compression.train_dictionary(samples, 4096))
+        calls = []
+        compress = shared.compress
+        monkeypatch.setattr(shared, "compress", lambda message: calls.append(1) or compress(message))
+        room = brawl_room()
+        for player_id in ("p0", "p1", "p2"):
+            room.enable_compression(player_id, shared)
+        run_brawl(room)
+        frames = room.connections["p0"].sent
+        assert room.connections["p1"].sent == room.connections["p2"].sent == frames
+        assert len(calls) == len(frames)
+        unzstd = decompressor_for(ZSTD, shared.dictionary)
+        assert [unzstd(f) for f in frames] == room.connections["p3"].sent
+        assert zstandard.get_frame_parameters(frames[0][compression.FRAME_HEADER.size:]).dict_id == shared.dict_id
+        print(f"SUCCESS: {len(frames)} messages compressed once each for three connections")
+
+    def test_shipped_dictionary(self):
+        pytest.importorskip("zstandard")
+        shared = compressor_for(ZSTD)
+        assert shared is not None and shared.dictionary == compression.load_dictionary()
+        assert compressor_for(ZSTD) is shared
+        print(f"SUCCESS: dictionary {shared.dict_id} loaded from {compression.DICTIONARY_PATH.name}")
@@ -0,0 +1,127 @@
+"""
+Tests for delta-compressed state: reconstruction, keyframes and acks
+"""
+
+import asyncio
+import json
+import random
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from delta import KEYFRAME_INTERVAL, apply_delta, encode_delta  # noqa: E402
+from game_engine import GameRoom  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def brawl_room(seed=3):
+    room = GameRoom("delta", seed=seed)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(6):
+        p = room.add_player(f"p{i}", f"P{i}", FakeWebSocket(), classes[i % 3])
+        p.x = (i - 3) * 12.0
+        p.z = (i % 2) * 10.0
+    room.enable_delta("p0")
+    room.enable_delta("p1")
+    return room
+
+
+def brawl_inputs(room, rng):
+    for player_id in room.players:
+        roll = rng.random()
+        if roll < 0.3:
+            room.queue_message(player_id, {"type": "move", "x": rng.uniform(-60, 60), "z": rng.uniform(-60, 60)})
+        elif roll < 0.5:
+            room.queue_message(player_id, {"type": "fire_start", "x": rng.uniform(-40, 40), "z": rng.uniform(-40, 40)})
+        elif roll < 0.55:
+            room.queue_message(player_id, {"type": "ability", "id": rng.choice("qwer"),
+                                           "x": rng.uniform(-40, 40), "z": rng.uniform(-40, 40)})
+
+
+class TestEncodeDecode:
+    """apply_delta(base, encode_delta(base, state)) == state"""
+
+    def test_changes_removals_and_order(self):
+        base = {"tick": 1, "effects": [], "players": [{"id": "a", "x": 1}, {"id": "b", "x": 2}],
+                "missiles": [{"id": "1", "x": 0}, {"id": "2", "x": 0}, {"id": "3", "x": 0}],
+                "bombardments": [], "sporeClouds": [], "mutalisks": []}
+        state = {"type": "state", "tick": 2, "effects": [{"type": "kill"}],
+                 "players": [{"id": "a", "x": 1}, {"id": "b", "x": 5}],
+                 "missiles": [{"id": "3", "x": 1}, {"id": "2", "x": 0}, {"id": "4", "x": 9}],
+                 "bombardments": [], "sporeClouds": [], "mutalisks": []}
+        delta = encode_delta(base, state)
+        assert delta["players"] == {"u": [{"x": 5, "id": "b"}]}
+        assert delta["missiles"]["r"] == ["1"]
+        assert delta["missiles"]["o"] == ["3", "2", "4"]
+        assert "bombardments" not in delta
+        assert apply_delta(base, delta) == state
+        assert base["missiles"][0] == {"id": "1", "x": 0}
+        print("SUCCESS: delta carries only changes and rebuilds the state")
+
+
+class TestRoomDeltas:
+    """Delta clients reconstruct exactly what full-state clients receive"""
+
+    def test_reconstruction_matches_full_state(self):
+        async def run(ticks):
+            room = brawl_room()
+            rng = random.Random(5)
+            decoded = {}
+            for n in range(ticks):
+                brawl_inputs(room, rng)
+                room._simulate_tick()
+                room._broadcast_state()
+                await room.flush()
+                full = room.connections["p5"].sent[-1]
+                for player_id, lag in (("p0", 0), ("p1", 3)):
+                    msg = json.loads(room.connections[player_id].sent[-1])
+                    history = decoded.setdefault(player_id, {})
+                    state = msg if msg["type"] == "state" else apply_delta(history[msg["base"]], msg)
+                    # Byte for byte, so 0.0 vs -0.0 or 1 vs 1.0 would show
+                    assert json.dumps(state) == full, (player_id, n)
+                    history[state["tick"]] = state
+                    # p1 acks late, so its baseline trails a few ticks behind
+                    ack = max(history) - lag
+                    if ack in history:
+                        room.queue_message(player_id, {"type": "ack", "tick": ack})
+            return room
+
+        ticks = KEYFRAME_INTERVAL * 2 + 20
+        room = asyncio.run(run(ticks))
+        # One keyframe per interval, plus the ticks before the first usable ack
+        for player_id, lag in (("p0", 0), ("p1", 3)):
+            kinds = [json.loads(t)["type"] for t in room.connections[player_id].sent]
+            assert kinds.count("state") == 3 + lag, (player_id, kinds.count("state"))
+        # Acks never reach the simulation
+        assert not room._pending_messages
+        delta_bytes = sum(map(len, room.connections["p0"].sent))
+        full_bytes = sum(map(len, room.connections["p5"].sent))
+        assert delta_bytes < full_bytes / 2
+        assert room.metrics.bytes_sent == sum(sum(map(len, ws.sent)) for ws in room.connections.values())
+        print(f"SUCCESS: {ticks} ticks rebuilt exactly, {delta_bytes} vs {full_bytes} bytes")
+
+    def test_keyframe_without_usable_ack(self):
+        async def run():
+            room = brawl_room()
+            ws = room.connections["p0"]
+            for _ in range(3):
+                room._simulate_tick()
+                room._broadcast_state()
+                await room.flush()
+            # Never acked: full states only
+            assert all(json.loads(t)["type"] == "state" for t in ws.sent)
+            room.queue_message("p0", {"type": "ack", "tick": room.tick})
+            room._simulate_tick()
+            room._broadcast_state()
+            await room.flush()
+            assert json.loads(ws.sent[-1])["type"] == "delta"
+            # An ack for a tick the room no longer remembers falls back to a keyframe
+            room.queue_message("p1", {"type": "ack", "tick": room.tick + 1000})
+            room.queue_message("p1", {"type": "ack", "tick": "bogus"})
+            room._simulate_tick()
+            room._broadcast_state()
+            await room.flush()
+            assert json.loads(room.connections["p1"].sent[-1])["type"] == "state"
+
+        asyncio.run(run())
+        print("SUCCESS: keyframes sent until a remembered tick is acked")
@@ -0,0 +1,47 @@
+"""
+Tests for slotted entity records, per-room ids and missile/mutalisk pooling
+"""
+
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, Missile, Mutalisk, Player, MISSILE_LIFETIME, TICK_INTERVAL  # noqa: E402
+
+
+class TestEntityRecords:
+    """Entities are slotted records"""
+
+    def test_no_instance_dict(self):
+        for entity in (Player("p", "P"), Missile("1", "p", 0, 0, "q"), Mutalisk("2", "p", 0, 0)):
+            assert not hasattr(entity, "__dict__")
+
+
+class TestEntityPooling:
+    """Finished missiles are recycled but never reuse an id"""
+
+    def test_missiles_recycled_with_fresh_ids(self):
+        room = GameRoom("pool")
+        shooter = room.add_player("a", "A", None, "vanguard")
+        target = room.add_player("b", "B", None, "vanguard")
+        target.x, target.z = 250.0, 250.0
+        shooter.x, shooter.z = -250.0, -250.0
+
+        room._use_missiles(shooter)
+        first_wave = list(room.missiles)
+        first_ids = {m.id for m in first_wave}
+        assert len(first_ids) == len(first_wave)
+
+        # Let the barrage expire so the objects go back to the pool
+        for _ in range(int(MISSILE_LIFETIME / TICK_INTERVAL) + 2):
+            room._update(TICK_INTERVAL)
+        assert len(room.missiles) == 0
+
+        shooter.missile_cooldown = 0
+        room._use_missiles(shooter)
+        second_wave = list(room.missiles)
+        assert {id(m) for m in second_wave} == {id(m) for m in first_wave}
+        assert not first_ids & {m.id for m in second_wave}
+        assert all(m.alive and m.lifetime == MISSILE_LIFETIME for m in second_wave)
+        assert room._missile_pool.reused == len(second_wave)
+        print("SUCCESS: missiles recycled from pool with fresh ids")
@@ -0,0 +1,149 @@
+"""
+Tests for idle-room hibernation: a room at rest stops ticking and resumes with the same simulation
+"""
+
+import asyncio
+import json
+import math
+import sys
+import zlib
+
+import pytest
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, RoomManager  # noqa: E402
+import metrics  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def lobby(vectorized, hibernate_after):
+    room = GameRoom("lobby", vectorized=vectorized, seed=11, hibernate_after=hibernate_after)
+    for i, (ship_class, x) in enumerate([("vanguard", 0.0), ("dreadnought", 10.0),
+                                         ("leviathan", 20.0), ("vanguard", -20.0)]):
+        ship = room.add_player(f"p{i}", f"P{i}", None, ship_class)
+        ship.x, ship.z = x, 0.0
+    # Facing their move targets, so they fly straight there and coast to a stop
+    room.players["p0"].rotation = math.atan2(30.0, 10.0)
+    room.players["p2"].rotation = math.atan2(-60.0, 25.0)
+    return room
+
+
+# (arrival time, action): a skirmish that settles, a kill, a respawn
+# nobody touches, then a long lull until one pilot moves off
+SCRIPT = [
+    (0.013, lambda r: r.queue_message("p0", {"type": "move", "x": 30.0, "z": 10.0})),
+    (0.113, lambda r: r.queue_message("p1", {"type": "fire_start", "x": 20.0, "z": 0.0})),
+    (2.013, lambda r: r.queue_message("p1", {"type": "fire_stop"})),
+    (40.013, lambda r: r._apply_damage(r.players["p3"], 1e6)),
+    (70.013, lambda r: r.queue_message("p2", {"type": "move", "x": -40.0, "z": 25.0})),
+]
+
+
+def run(room, script, until):
+    """Drive the room's game loop on a virtual loop clock up to ``until``,
+    performing each scripted action when it falls due, as the websocket
+    handlers would. Returns how many times the room hibernated."""
+    room._next_tick_at = 0.0
+    script = list(script)
+    wake_at = None
+    naps = 0
+    while True:
+        next_event = script[0][0] if script else math.inf
+        if room.hibernating:
+            next_wake = math.inf if wake_at is None else wake_at
+        else:
+            next_wake = room._next_tick_at
+        now = min(next_event, next_wake)
+        if now > until:
+            break
+        if next_event <= next_wake:
+            _, action = script.pop(0)
+            room.wake(now)
+            action(room)
+        elif room.hibernating:
+            room.wake(now)
+        elif room._serve(now):
+            wake_at = room.hibernate()
+            naps += 1
+    room.wake(until)
+    return naps
+
+
+def state(room):
+    return json.loads(zlib.decompress(room.snapshot()))
+
+
+class TestHibernation:
+    """Rooms at rest sleep, and wake into the state they would have reached"""
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_same_simulation(self, vectorized):
+        ticking = lobby(vectorized, hibernate_after=0.0)
+        sleeping = lobby(vectorized, hibernate_after=2.0)
+        assert run(ticking, SCRIPT, 100.027) == 0
+        naps = run(sleeping, SCRIPT, 100.027)
+        # Settled after the skirmish, after the kill, after the respawn and
+        # after the final move
+        assert naps == 4
+        assert sleeping.tick == ticking.tick
+        assert state(sleeping) == state(ticking)
+        assert sleeping.players["p3"].alive and sleeping.players["p3"].deaths == 1
+        skipped = sleeping.metrics.hibernated_ticks
+        assert skipped > 1000 and sleeping.metrics.ticks + skipped == ticking.metrics.ticks
+        print(f"SUCCESS: {skipped} of {ticking.tick} ticks skipped, same final state")
+
+    def test_rest_needs_quiet(self):
+        room = lobby(False, hibernate_after=2.0)
+        assert room._quiescent()
+        room.players["p1"].energy = 50.0
+        assert not room._quiescent()
+        room.players["p1"].energy = room.players["p1"].max_energy
+        room.players["p0"].warp_cooldown = 1.0
+        assert not room._quiescent()
+        room.players["p0"].warp_cooldown = 0.0
+        room.queue_message("p2", {"type": "fire_stop"})
+        assert not room._quiescent()
+        room._simulate_tick()
+        assert room._quiescent()
+        # Acks steer encoding only and never count as activity
+        room.queue_message("p2", {"type": "ack", "tick": room.tick})
+        assert room._quiescent()
+        print("SUCCESS: only a room with nothing left to simulate is quiescent")
+
+    def test_event_loop(self):
+        async def run_loop():
+            loop = asyncio.get_running_loop()
+            manager = RoomManager(tick_rate=100, snapshot_rate=100, hibernate_after=0.05)
+            room = manager.get_or_create_room("idle")
+            ship = room.add_player("p", "P", FakeWebSocket())
+            await asyncio.sleep(0.2)
+            asleep = room.summary()["hibernating"]
+            text = metrics.render(manager.metric_series())
+            ticks = room.metrics.ticks
+            await asyncio.sleep(0.2)
+            idle_ticks = room.metrics.ticks - ticks
+            room.queue_message("p", {"type": "move", "x": ship.x + 40.0, "z": ship.z})
+            awake = not room.hibernating
+            # Caught up on waking: the room is as many ticks in as time allows
+            start = loop.time() - room.tick * room.tick_interval
+            await asyncio.sleep(0.05)
+            moving = ship.vx != 0.0 or ship.vz != 0.0
+            # A dead ship wakes the room to respawn on time
+            room._apply_damage(ship, 1e6)
+            ship.respawn_timer = 0.5
+            await asyncio.sleep(1.0)
+            respawned = ship.alive
+            room.stop()
+            drift = room.tick - (loop.time() - start) / room.tick_interval
+            return asleep, text, idle_ticks, awake, moving, respawned, drift
+
+        asleep, text, idle_ticks, awake, moving, respawned, drift = asyncio.run(run_loop())
+        assert asleep
+        assert "starbattle_hibernating 1\n" in text
+        assert 'starbattle_room_hibernating{room="idle"} 1\n' in text
+        assert idle_ticks == 0
+        assert awake and moving and respawned
+        # The ticks slept through are made up, so the room keeps time
+        assert abs(drift) < 3
+        print(f"SUCCESS: an idle room ran {idle_ticks} ticks in 0.2 s and woke on input and respawn")
@@ -0,0 +1,138 @@
+"""
+Tests for batched input frames: binary and JSON forms, sequence numbers
+"""
+
+import json
+import random
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom  # noqa: E402
+from input_frames import HEADER, decode_frame, encode_frame  # noqa: E402
+
+
+def brawl_room(seed=9):
+    room = GameRoom("frames", seed=seed)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(4):
+        p = room.add_player(f"p{i}", f"P{i}", None, classes[i % 3])
+        p.x = (i - 2) * 8.0
+        p.z = (i % 2) * 6.0
+    return room
+
+
+def render_frame(rng):
+    """One render frame of input; coordinates in quarter units survive float32 exactly."""
+    messages = []
+    for _ in range(rng.randint(1, 3)):
+        x, z = rng.randint(-160, 160) / 4, rng.randint(-160, 160) / 4
+        roll = rng.random()
+        if roll < 0.45:
+            messages.append({"type": "move", "x": x, "z": z})
+        elif roll < 0.85:
+            messages.append({"type": "fire_aim", "x": x, "z": z})
+        elif roll < 0.9:
+            messages.append({"type": "fire_start", "x": x, "z": z})
+        elif roll < 0.95:
+            messages.append({"type": "fire_stop"})
+        else:
+            messages.append({"type": "ability", "id": rng.choice("qwer"), "x": x, "z": z})
+    return messages
+
+
+class TestFrameCodec:
+    """decode_frame(encode_frame(seq, messages)) gives the messages back"""
+
+    def test_binary_round_trip(self):
+        messages = [
+            {"type": "move", "x": 1.5, "z": -2.25},
+            {"type": "fire_start", "x": 3.0, "z": 4.0},
+            {"type": "fire_aim", "x": -0.5, "z": 0.75},
+            {"type": "fire_stop"},
+            {"type": "ability", "id": "r", "x": 10.0, "z": -10.0},
+        ]
+        data = encode_frame(7, messages + [{"type": "ack", "tick": 1234}])
+        assert len(data) == HEADER.size + 12 * len(messages)
+        assert decode_frame(data) == (7, 1234, messages)
+        print(f"SUCCESS: {len(messages)} commands and an ack in {len(data)} bytes")
+
+    def test_untargeted_ability_cast_at_ship(self):
+        message = {"type": "ability", "id": "w"}
+        assert decode_frame(encode_frame(1, [message])) == (1, None, [message])
+        clouds = []
+        for frame in (encode_frame(1, [message]), json.dumps([1, message])):
+            room = GameRoom("cloud", seed=3)
+            ship = room.add_player("p", "P", None, "leviathan")
+            ship.x, ship.z = -153.5, 145.75
+            room.receive("p", frame)
+            room._simulate_tick()
+            clouds.append([(c.x, c.z) for c in room.spore_clouds])
+        assert clouds[0] == clouds[1] == [(-153.5, 145.75)]
+        print("SUCCESS: an ability without coordinates goes off at the ship, binary or JSON")
+
+    def test_json_forms_and_malformed_frames(self):
+        assert decode_frame('[3, {"type": "fire_stop"}, {"type": "ack", "tick": 8}]') == \
+            (3, 8, [{"type": "fire_stop"}])
+        assert decode_frame('{"type": "fire_stop"}') == (None, None, [{"type": "fire_stop"}])
+        assert decode_frame('{"type": "ack", "tick": 5}') == (None, 5, [])
+        for bad in ("not json", "[]", '["x", {}]', "[1, 2]", "7", b"\x01\x00", encode_frame(1, []) + b"\x01"):
+            try:
+                decode_frame(bad)
+            except ValueError:
+                continue
+            raise AssertionError(f"accepted {bad!r}")
+        print("SUCCESS: JSON arrays and bare messages decode, malformed frames raise ValueError")
+
+
+class TestRoomReceive:
+    """Batched frames drive the room exactly like one message per frame"""
+
+    def test_batched_matches_one_per_frame(self):
+        rng = random.Random(4)
+        batched, single, arrays = brawl_room(), brawl_room(), brawl_room()
+        seqs = {}
+        sent = 0
+        for _ in range(80):
+            # Three render frames per tick
+            for _ in range(3):
+                for player_id in batched.players:
+                    messages = render_frame(rng)
+                    sent += len(messages)
+                    seq = seqs[player_id] = seqs.get(player_id, 0) + 1
+                    batched.receive(player_id, encode_frame(seq, messages))
+                    arrays.receive(player_id, json.dumps([seq] + messages))
+                    for msg in messages:
+                        single.receive(player_id, json.dumps(msg))
+            for room in (batched, single, arrays):
+                room._simulate_tick()
+        expected = json.dumps(single._state_message())
+        assert json.dumps(batched._state_message()) == expected
+        assert json.dumps(arrays._state_message()) == expected
+        assert batched.metrics.input_frames == 80 * 3 * 4
+        assert single.metrics.input_frames == sent
+        assert batched.metrics.inputs_dropped == 0
+        print(f"SUCCESS: {batched.metrics.input_frames} batched frames, same state as "
+              f"{single.metrics.input_frames} single-message frames")
+
+    def test_stale_and_bad_frames_ignored(self):
+        room = brawl_room()
+        room.receive("p0", encode_frame(5, [{"type": "move", "x": 1.0, "z": 1.0}]))
+        room.receive("p0", encode_frame(5, [{"type": "move", "x": 2.0, "z": 2.0}]))
+        room.receive("p0", encode_frame(4, [{"type": "fire_stop"}, {"type": "fire_stop"}]))
+        room.receive("p0", b"\xff")
+        room.receive("p0", "[1, 2, 3]")
+        room.receive("p1", encode_frame(1, [{"type": "fire_stop"}]))
+        assert room._pending_messages.messages == [("p0", {"type": "move", "x": 1.0, "z": 1.0}),
+                                                   ("p1", {"type": "fire_stop"})]
+        assert room.metrics.inputs_dropped == 3
+        assert room.metrics.input_frames == 4
+        print("SUCCESS: repeated and out-of-order sequence numbers and malformed frames dropped")
+
+    def test_ack_in_header_reaches_delta_channel(self):
+        room = brawl_room()
+        room.enable_delta("p0")
+        room.receive("p0", encode_frame(1, [{"type": "ack", "tick": 42}, {"type": "fire_stop"}]))
+        assert room._delta_channels["p0"].acked_tick == 42
+        assert room._pending_messages.messages == [("p0", {"type": "fire_stop"})]
+        print("SUCCESS: the ack rides in the frame header and never reaches the simulation")
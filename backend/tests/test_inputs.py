@@ -0,0 +1,126 @@
+"""
+Tests for per-player input coalescing, rate limiting and the queue cap
+"""
+
+import json
+import random
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom  # noqa: E402
+from inputs import INPUT_BURST, INPUT_RATE, MAX_QUEUED_INPUTS  # noqa: E402
+
+
+def brawl_room(seed=5):
+    room = GameRoom("inputs", seed=seed)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(6):
+        p = room.add_player(f"p{i}", f"P{i}", None, classes[i % 3])
+        p.x = (i - 3) * 8.0
+        p.z = (i % 2) * 6.0
+    return room
+
+
+def noisy_inputs(rng, players):
+    """A tick's worth of mouse-driven input: lots of moves and aims, the odd press."""
+    messages = []
+    for _ in range(40):
+        player_id = rng.choice(players)
+        roll = rng.random()
+        x, z = rng.uniform(-40, 40), rng.uniform(-40, 40)
+        if roll < 0.45:
+            messages.append((player_id, {"type": "move", "x": x, "z": z}))
+        elif roll < 0.9:
+            messages.append((player_id, {"type": "fire_aim", "x": x, "z": z}))
+        elif roll < 0.95:
+            messages.append((player_id, {"type": rng.choice(("fire_start", "fire_stop")), "x": x, "z": z}))
+        else:
+            messages.append((player_id, {"type": "ability", "id": rng.choice("qwer"), "x": x, "z": z}))
+    return messages
+
+
+class TestCoalescing:
+    """Only the latest move and aim per tick survive; presses stay in order"""
+
+    def test_latest_move_and_aim_win(self):
+        room = brawl_room()
+        sequence = [
+            {"type": "move", "x": 1, "z": 1},
+            {"type": "fire_aim", "x": 2, "z": 2},
+            {"type": "move", "x": 3, "z": 3},
+            {"type": "ability", "id": "q"},
+            {"type": "move", "x": 4, "z": 4},
+            {"type": "fire_start", "x": 5, "z": 5},
+            {"type": "fire_aim", "x": 6, "z": 6},
+            {"type": "move", "x": 7, "z": 7},
+            {"type": "fire_aim", "x": 8, "z": 8},
+        ]
+        for msg in sequence:
+            room.queue_message("p0", msg)
+        room.queue_message("p1", {"type": "move", "x": 9, "z": 9})
+        queued = [msg for _, msg in room._pending_messages.messages]
+        assert queued == [
+            {"type": "move", "x": 3, "z": 3},
+            {"type": "fire_aim", "x": 2, "z": 2},
+            {"type": "ability", "id": "q"},
+            {"type": "move", "x": 7, "z": 7},
+            {"type": "fire_start", "x": 5, "z": 5},
+            {"type": "fire_aim", "x": 8, "z": 8},
+            {"type": "move", "x": 9, "z": 9},
+        ]
+        assert room.metrics.inputs_coalesced == 3
+        room._simulate_tick()
+        assert len(room._pending_messages) == 0
+        # A new tick starts a new buffer
+        room.queue_message("p0", {"type": "move", "x": 10, "z": 10})
+        assert len(room._pending_messages) == 1
+        print("SUCCESS: 10 messages queued as 7, presses kept in order")
+
+    def test_same_result_as_every_message(self):
+        coalesced, raw = brawl_room(), brawl_room()
+        rng = random.Random(9)
+        total = 0
+        for _ in range(100):
+            messages = noisy_inputs(rng, list(coalesced.players))
+            total += len(messages)
+            for player_id, msg in messages:
+                coalesced.queue_message(player_id, msg)
+                raw._pending_messages.messages.append((player_id, msg))
+            coalesced._simulate_tick()
+            raw._simulate_tick()
+            assert json.dumps(coalesced._state_message()) == json.dumps(raw._state_message())
+        assert coalesced.metrics.inputs < total / 2
+        assert coalesced.metrics.inputs_coalesced + coalesced.metrics.inputs == total
+        print(f"SUCCESS: {total} messages processed as {coalesced.metrics.inputs}, identical states")
+
+
+class TestLimits:
+    """Token bucket on the simulation clock and a per-tick cap"""
+
+    def test_rate_limit(self):
+        room = brawl_room()
+        for i in range(int(INPUT_BURST) + 50):
+            room.queue_message("p0", {"type": "fire_stop"})
+            if i % MAX_QUEUED_INPUTS == MAX_QUEUED_INPUTS - 1:
+                room._pending_messages.drain()
+        assert room.metrics.inputs_dropped == 50
+        # One simulated second refills INPUT_RATE tokens
+        room.current_time += 1.0
+        for _ in range(int(INPUT_RATE) + 10):
+            room.queue_message("p1", {"type": "move", "x": 0, "z": 0})
+            room.queue_message("p0", {"type": "move", "x": 0, "z": 0})
+        assert room.metrics.inputs_dropped == 60
+        print("SUCCESS: bursts beyond the bucket are dropped until the clock refills it")
+
+    def test_queue_cap(self):
+        room = brawl_room()
+        for _ in range(MAX_QUEUED_INPUTS + 8):
+            room.queue_message("p2", {"type": "ability", "id": "w"})
+        room.queue_message("p3", {"type": "ability", "id": "w"})
+        assert len(room._pending_messages) == MAX_QUEUED_INPUTS + 1
+        assert room.metrics.inputs_dropped == 8
+        # Coalescing into a full queue still takes the newer target
+        room.queue_message("p2", {"type": "move", "x": 1, "z": 1})
+        assert room.metrics.inputs_dropped == 9
+        print(f"SUCCESS: at most {MAX_QUEUED_INPUTS} inputs per player per tick")
@@ -0,0 +1,196 @@
+"""
+Tests for area-of-interest culling, effect relevance and the minimap list
+"""
+
+import asyncio
+import json
+import math
+import random
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '/app/backend')
+
+from binary_codec import SnapshotCodec  # noqa: E402
+from delta import apply_delta  # noqa: E402
+from game_engine import ARENA_SIZE, GameRoom, Player  # noqa: E402
+from interest import INTEREST_RADIUS, MINIMAP_INTERVAL, encode_view, relevant_effects, visibility  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def spread_room(seed=6, players=24):
+    """Ships in small squads all over the arena, so each sees a few others."""
+    room = GameRoom("interest", seed=seed)
+    rng = random.Random(seed)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(players):
+        p = room.add_player(f"p{i}", f"P{i}", FakeWebSocket(), classes[i % 3])
+        squad = i // 4
+        p.x = -250 + (squad % 3) * 250 + rng.uniform(-15, 15)
+        p.z = -200 + (squad // 3) * 400 + rng.uniform(-15, 15)
+    return room
+
+
+def play(room, rng, ticks):
+    for _ in range(ticks):
+        for player_id, p in room.players.items():
+            roll = rng.random()
+            if roll < 0.2:
+                room.queue_message(player_id, {"type": "move", "x": p.x + rng.uniform(-20, 20),
+                                               "z": p.z + rng.uniform(-20, 20)})
+            elif roll < 0.5:
+                room.queue_message(player_id, {"type": "fire_start", "x": p.x + rng.uniform(-30, 30),
+                                               "z": p.z + rng.uniform(-30, 30)})
+            elif roll < 0.6:
+                room.queue_message(player_id, {"type": "ability", "id": rng.choice("qwer"),
+                                               "x": p.x + rng.uniform(-30, 30), "z": p.z + rng.uniform(-30, 30)})
+        room._simulate_tick()
+
+
+def near(entity, ship, slack=0.02):
+    return math.hypot(entity["x"] - ship["x"], entity["z"] - ship["z"]) <= INTEREST_RADIUS + slack
+
+
+class TestVisibility:
+    """Distance masks and effect relevance"""
+
+    def test_masks_per_collection(self):
+        class E:
+            def __init__(self, x, z):
+                self.x, self.z = x, z
+
+        viewers = np.array([(0.0, 0.0), (200.0, 0.0)])
+        masks = visibility(viewers, [[E(0, 0), E(150, 0)], [], [E(100, 0)]])
+        assert [m.shape for m in masks] == [(2, 2), (2, 0), (2, 1)]
+        assert masks[0].tolist() == [[True, False], [False, True]]
+        assert masks[2].tolist() == [[True], [True]]
+        print("SUCCESS: one mask per collection, per viewer")
+
+    def test_effect_relevance(self):
+        far = Player("far", "Far", "vanguard")
+        far.x, far.z = 250.0, 250.0
+        players = {"far": far}
+        effects = [
+            {"type": "explosion", "x": 10, "z": 0, "size": "small"},          # near
+            {"type": "explosion", "x": 200, "z": 0, "size": "small"},         # far
+            {"type": "kill", "killer": "A", "victim": "B"},                   # global
+            {"type": "repair_bots", "playerId": "far"},                       # far ship
+            {"type": "bio_stasis", "playerId": "far", "targetId": "me", "x": 250, "z": 250},  # hits me
+            {"type": "yamato_fire", "playerId": "far", "targetId": "other",
+             "startX": 250, "startZ": 250, "endX": 5, "endZ": 5},             # ends near
+        ]
+        kept = relevant_effects(effects, "me", 0.0, 0.0, players)
+        assert kept == [effects[0], effects[2], effects[4], effects[5]]
+        print("SUCCESS: effects kept when near, global, or involving the viewer")
+
+    def test_view_text_matches_json_dumps(self):
+        room = spread_room(players=8)
+        play(room, random.Random(4), 30)
+        state = room._state_message()
+        keys = ("players", "missiles", "bombardments", "sporeClouds", "mutalisks")
+        fragments = [[json.dumps(d) for d in state[key]] for key in keys]
+        indices = [list(range(0, len(state[key]), 2)) for key in keys]
+        effects = [{"type": "kill", "killer": "A", "victim": "B"}]
+        expected = {"type": "state", "tick": state["tick"]}
+        for key, idx in zip(keys, indices):
+            expected[key] = [state[key][i] for i in idx]
+        expected["effects"] = effects
+        assert encode_view(state["tick"], fragments, indices, effects) == json.dumps(expected)
+        print("SUCCESS: joined view text is byte-identical to json.dumps")
+
+
+class TestCulledSnapshots:
+    """Interest connections see their neighbourhood and a minimap"""
+
+    def test_json_view_and_minimap(self):
+        async def run():
+            room = spread_room()
+            room.enable_interest("p0")
+            rng = random.Random(1)
+            for _ in range(MINIMAP_INTERVAL * 2):
+                play(room, rng, 1)
+                room._broadcast_state()
+                await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        culled = [json.loads(t) for t in room.connections["p0"].sent]
+        full = [json.loads(t) for t in room.connections["p1"].sent]
+        states = [m for m in culled if m["type"] == "state"]
+        minimaps = [m for m in culled if m["type"] == "minimap"]
+        assert len(states) == len(full) == MINIMAP_INTERVAL * 2
+        assert [m["tick"] for m in minimaps] == [full[0]["tick"], full[MINIMAP_INTERVAL]["tick"]]
+        assert not any(m["type"] == "minimap" for m in full)
+
+        seen_entities = 0
+        for mine, everything in zip(states, full):
+            me = next(p for p in mine["players"] if p["id"] == "p0")
+            for key in ("players", "missiles", "bombardments", "sporeClouds", "mutalisks"):
+                ids = {e["id"] for e in mine[key]}
+                expected = {e["id"] for e in everything[key] if near(e, me, slack=-0.02)}
+                assert expected <= ids, key
+                assert all(near(e, me) for e in mine[key]), key
+                seen_entities += len(mine[key])
+            assert len(mine["players"]) < len(everything["players"])
+        last_minimap = minimaps[-1]
+        assert {p[0] for p in last_minimap["players"]} == {p.id for p in room.players.values() if p.alive}
+        assert seen_entities > len(states)
+
+        culled_bytes = sum(map(len, room.connections["p0"].sent))
+        full_bytes = sum(map(len, room.connections["p1"].sent))
+        assert culled_bytes < full_bytes / 2
+        print(f"SUCCESS: culled view {culled_bytes} B vs full {full_bytes} B")
+
+    def test_delta_against_culled_baselines(self):
+        async def run(delta):
+            room = spread_room(seed=8)
+            room.enable_interest("p0")
+            if delta:
+                room.enable_delta("p0")
+            rng = random.Random(2)
+            received = []
+            decoded = {}
+            for _ in range(60):
+                play(room, rng, 1)
+                room._broadcast_state()
+                await room.flush()
+                msg = json.loads(room.connections["p0"].sent[-1])
+                if msg["type"] == "delta":
+                    msg = apply_delta(decoded[msg["base"]], msg)
+                decoded[msg["tick"]] = msg
+                received.append(json.dumps(msg))
+                room.queue_message("p0", {"type": "ack", "tick": msg["tick"]})
+            return received, room
+
+        plain, _ = asyncio.run(run(False))
+        rebuilt, room = asyncio.run(run(True))
+        assert rebuilt == plain
+        kinds = [json.loads(t)["type"] for t in room.connections["p0"].sent]
+        assert kinds.count("delta") > 50
+        print("SUCCESS: deltas against per-connection baselines rebuild the culled view")
+
+    def test_binary_view(self):
+        async def run():
+            room = spread_room(seed=9)
+            room.enable_interest("p3")
+            room.enable_binary("p3")
+            room.enable_binary("p4")
+            play(room, random.Random(3), 20)
+            room._broadcast_state()
+            await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        codec = SnapshotCodec(ARENA_SIZE)
+        mine = room.connections["p3"].sent
+        assert json.loads(mine[0])["type"] == "minimap"
+        roster = json.loads(mine[1])
+        view = codec.decode(mine[2], roster)
+        everything = codec.decode(room.connections["p4"].sent[-1], json.loads(room.connections["p4"].sent[0]))
+        me = next(p for p in view["players"] if p["id"] == "p3")
+        assert 1 < len(view["players"]) < len(everything["players"])
+        for key in ("players", "missiles", "mutalisks"):
+            assert all(near(e, me) for e in view[key])
+        assert len(mine[2]) < len(room.connections["p4"].sent[-1])
+        print("SUCCESS: binary frames are culled per connection too")
@@ -0,0 +1,178 @@
+"""
+Tests for lag compensation: shots and targeting judged against the snapshot the client saw
+"""
+
+import asyncio
+import json
+import sys
+
+import pytest
+
+sys.path.insert(0, '/app/backend')
+
+from binary_codec import SnapshotCodec  # noqa: E402
+from game_engine import (ARENA_SIZE, LASER_BATCH_MIN_SHOOTERS, LASER_HIT_WIDTH,  # noqa: E402
+                         SHIP_MAX_SPEED, GameRoom)
+from input_frames import encode_frame  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def duel(latency, max_rewind=0.25, vectorized=False, shooters=1, ticks=20):
+    """Shooters at x=0 track a ship crossing in front of them at full
+    speed, each aiming where its client last saw it: the state from
+    ``latency`` ticks ago, acked in the same binary frame as the aim.
+    Returns the damage the ship took and how far it moves per tick."""
+    room = GameRoom("lag", vectorized=vectorized, seed=4, max_rewind=max_rewind)
+    target = room.add_player("t", "T", None, "dreadnought")
+    target.x, target.z = 40.0, -30.0
+    target.vx, target.vz = 0.0, SHIP_MAX_SPEED
+    target.rotation = 0.0
+    room.queue_message("t", {"type": "move", "x": 40.0, "z": 500.0})
+    shooter_ids = [f"s{i}" for i in range(shooters)]
+    for i, shooter_id in enumerate(shooter_ids):
+        ship = room.add_player(shooter_id, shooter_id, None, "vanguard")
+        ship.x, ship.z = 0.0, -11.0 + 2.0 * i
+    seen = {room.tick: (target.x, target.z)}
+    for n in range(latency + ticks):
+        view = room.tick - latency
+        if view > 0:
+            x, z = seen[view]
+            fire = "fire_start" if view == 1 else "fire_aim"
+            for shooter_id in shooter_ids:
+                room.receive(shooter_id, encode_frame(n, [{"type": "ack", "tick": view},
+                                                         {"type": fire, "x": x, "z": z}]))
+        if n == latency:
+            health = target.hull + target.shields
+        room._simulate_tick()
+        seen[room.tick] = (target.x, target.z)
+    speed = seen[room.tick][1] - seen[room.tick - 1][1]
+    return health - (target.hull + target.shields), speed
+
+
+def binary_duel(latency, ack, ticks=20):
+    """``duel`` for the shipped client: the shooter reads binary frames
+    ``latency`` ticks late and aims at the ship where the frame shows it,
+    acking the frame's tick when ``ack`` is set. Returns the damage dealt."""
+    async def run():
+        room = GameRoom("binary-lag", seed=4)
+        target = room.add_player("t", "T", None, "dreadnought")
+        target.x, target.z = 40.0, -30.0
+        target.vx, target.vz = 0.0, SHIP_MAX_SPEED
+        target.rotation = 0.0
+        room.queue_message("t", {"type": "move", "x": 40.0, "z": 500.0})
+        ws = FakeWebSocket()
+        shooter = room.add_player("s", "S", ws, "vanguard")
+        shooter.x, shooter.z = 0.0, -11.0
+        room.enable_binary("s")
+        codec = SnapshotCodec(ARENA_SIZE)
+        roster, frames = None, []
+        for n in range(latency + ticks):
+            room._simulate_tick()
+            room._broadcast_state()
+            await room.flush()
+            for message in ws.sent:
+                if isinstance(message, bytes):
+                    frames.append(codec.decode(message, roster))
+                else:
+                    roster = json.loads(message)
+            ws.sent.clear()
+            if n == latency:
+                health = target.hull + target.shields
+            if n >= latency:
+                state = frames[n - latency]
+                seen = next(p for p in state["players"] if p["id"] == "t")
+                fire = "fire_start" if n == latency else "fire_aim"
+                inputs = [{"type": "ack", "tick": state["tick"]}] if ack else []
+                room.receive("s", encode_frame(n, inputs + [{"type": fire, "x": seen["x"], "z": seen["z"]}]))
+        return health - (target.hull + target.shields)
+
+    return asyncio.run(run())
+
+
+class TestLagCompensation:
+    """A laggy client hits what it saw, within the rewind window"""
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    @pytest.mark.parametrize("shooters", [1, LASER_BATCH_MIN_SHOOTERS])
+    def test_hits_at_latency(self, vectorized, shooters):
+        local, speed = duel(0, vectorized=vectorized, shooters=shooters)
+        # 150 ms round trip at 20 Hz: the ship has moved well past the beam
+        assert 3 * speed > LASER_HIT_WIDTH
+        compensated, _ = duel(3, vectorized=vectorized, shooters=shooters)
+        uncompensated, _ = duel(3, max_rewind=0.0, vectorized=vectorized, shooters=shooters)
+        assert local > 0
+        assert compensated == pytest.approx(local)
+        assert uncompensated == 0
+        print(f"SUCCESS: {compensated:.1f} damage at 150 ms, as at 0 ms; {uncompensated:.1f} without rewinding")
+
+    def test_binary_client(self):
+        # Binary snapshots are acked like JSON ones, or nothing is rewound
+        compensated = binary_duel(3, ack=True)
+        uncompensated = binary_duel(3, ack=False)
+        assert compensated > 0
+        assert uncompensated == 0
+        print(f"SUCCESS: {compensated:.1f} damage from acked binary snapshots, {uncompensated:.1f} unacked")
+
+    def test_rewind_window(self):
+        # 0.25 s is 5 ticks; a client 10 ticks behind is only rewound 5
+        compensated, speed = duel(10, max_rewind=0.25)
+        assert 5 * speed > LASER_HIT_WIDTH
+        assert compensated == 0
+        reached, _ = duel(10, max_rewind=0.5)
+        assert reached > 0
+        room = GameRoom("window", max_rewind=0.25)
+        assert room._view_lag({"tick": -1000}) == room.max_rewind_ticks == 5
+        assert room._view_lag({"tick": room.tick + 50}) == 0
+        assert room._view_lag({}) is None
+        print("SUCCESS: rewinds stop at the configured window")
+
+    @pytest.mark.parametrize("ship_class, ability, effect", [
+        ("dreadnought", "w", "yamato_channel"),
+        ("leviathan", "q", "bio_stasis"),
+    ])
+    def test_targeting_at_latency(self, ship_class, ability, effect):
+        def target_of(view_tick):
+            room = GameRoom("aim", seed=2)
+            caster = room.add_player("c", "C", None, ship_class)
+            near_then = room.add_player("a", "A", None, "vanguard")
+            near_now = room.add_player("b", "B", None, "vanguard")
+            caster.x = caster.z = near_then.z = near_now.z = 0.0
+            near_then.x, near_now.x = 10.0, 40.0
+            room._simulate_tick()
+            seen = room.tick
+            near_then.x, near_now.x = 50.0, 20.0
+            room._simulate_tick()
+            room._simulate_tick()
+            if view_tick:
+                room.receive("c", json.dumps([1, {"type": "ack", "tick": seen}, {"type": "ability", "id": ability}]))
+            else:
+                room.queue_message("c", {"type": "ability", "id": ability})
+            room._simulate_tick()
+            return next(e["targetId"] for e in room.effects if e["type"] == effect)
+
+        assert target_of(view_tick=True) == "a"
+        assert target_of(view_tick=False) == "b"
+        print(f"SUCCESS: {effect} picks the target nearest in the client's snapshot")
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_history_preallocated_and_snapshotted(self, vectorized):
+        room = GameRoom("history", vectorized=vectorized, seed=9)
+        ships = [room.add_player(f"p{i}", f"P{i}", None, "vanguard") for i in range(5)]
+        # Leave a hole in the columns, which a restored room packs
+        room.remove_player("p0")
+        ships = ships[1:]
+        arrays = (room._history._x, room._history._z, room._history._alive)
+        for n in range(40):
+            view = max(0, room.tick - 3)
+            for i, ship in enumerate(ships):
+                other = ships[(i + 1) % 4]
+                room.receive(ship.id, encode_frame(n, [{"type": "ack", "tick": view} if view else {},
+                                                       {"type": "fire_start", "x": other.x, "z": other.z}]))
+            room._simulate_tick()
+        assert all(a is b for a, b in zip((room._history._x, room._history._z, room._history._alive), arrays))
+        restored = GameRoom.from_snapshot(room.snapshot(), vectorized=vectorized)
+        for r in (room, restored):
+            for _ in range(10):
+                r._simulate_tick()
+        assert json.dumps(restored._state_message()) == json.dumps(room._state_message())
+        print("SUCCESS: the history ring is reused every tick and survives a snapshot")
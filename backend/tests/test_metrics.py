@@ -0,0 +1,119 @@
+"""
+Tests for per-phase tick instrumentation and the Prometheus text output
+"""
+
+import asyncio
+import json
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, RoomManager  # noqa: E402
+from metrics import Histogram, PHASE_BUCKETS, RoomMetrics, render  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def parse(text):
+    """Prometheus text -> {series: value}, checking every sample has a TYPE"""
+    samples = {}
+    typed = set()
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            typed.add(line.split()[2])
+            continue
+        if line.startswith("#") or not line:
+            continue
+        series, value = line.rsplit(" ", 1)
+        name = series.split("{")[0]
+        base = name
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[:-len(suffix)] in typed:
+                base = name[:-len(suffix)]
+        assert base in typed, line
+        samples[series] = float(value)
+    return samples
+
+
+class TestHistogram:
+    """Fixed buckets, merge and round trip"""
+
+    def test_buckets(self):
+        hist = Histogram()
+        for value in (0.0, PHASE_BUCKETS[0], PHASE_BUCKETS[0] * 1.5, 10.0):
+            hist.observe(value)
+        assert hist.counts[0] == 2
+        assert hist.counts[1] == 1
+        assert hist.counts[-1] == 1
+        assert hist.count == 4
+        merged = Histogram.from_dict(hist.to_dict())
+        merged.merge(hist)
+        assert merged.count == 8 and merged.counts[0] == 4
+        print("SUCCESS: histogram buckets are upper-inclusive")
+
+
+class TestRoomInstrumentation:
+    """Every phase of a tick is timed and counted"""
+
+    def test_phases_and_counters(self):
+        async def run():
+            room = GameRoom("m", seed=1)
+            room.add_player("a", "A", FakeWebSocket(), "leviathan")
+            room.add_player("b", "B", FakeWebSocket(), "vanguard")
+            room.queue_message("a", {"type": "ability", "id": "e"})
+            room.queue_message("b", {"type": "fire_start", "x": 0, "z": 0})
+            room._simulate_tick()
+            room._broadcast_state()
+            await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        m = room.metrics
+        expected = {"inputs", "send", "snapshot", "encode"} | {name for name, _ in room.update_phases}
+        assert set(m.phases) == expected
+        assert all(h.count == 1 for h in m.phases.values())
+        assert m.ticks == 1 and m.inputs == 2 and m.queued_inputs == 2
+        sent = room.connections["a"].sent[0]
+        assert m.snapshots == 1 and m.snapshot_bytes == len(sent.encode("utf-8"))
+        assert m.connections == 2
+        assert m.effects == len(json.loads(sent)["effects"]) > 0
+        print("SUCCESS: phases timed, inputs, bytes, effects and connections counted")
+
+
+class TestRender:
+    """Prometheus exposition per room and aggregated"""
+
+    def test_render_rooms_and_totals(self):
+        manager = RoomManager()
+        rooms = []
+        for rid in ("alpha", 'we"ird'):
+            room = GameRoom(rid, seed=2)
+            room.add_player("a", "A", None)
+            for _ in range(5):
+                room.step()
+            manager.rooms[rid] = room
+            rooms.append(room)
+        samples = parse(render(manager.metric_series(), manager.retired_metrics))
+        assert samples["starbattle_rooms"] == 2
+        assert samples["starbattle_ticks_total"] == 10
+        assert samples['starbattle_room_ticks_total{room="alpha"}'] == 5
+        assert samples['starbattle_room_ticks_total{room="we\\"ird"}'] == 5
+        assert samples['starbattle_phase_seconds_count{phase="lasers"}'] == 10
+        assert samples['starbattle_phase_seconds_bucket{phase="lasers",le="+Inf"}'] == 10
+        assert samples['starbattle_room_missed_ticks_total{room="alpha"}'] == 0
+
+        # Totals survive the room closing
+        rooms[0].players.clear()
+        manager.remove_empty_rooms()
+        samples = parse(render(manager.metric_series(), manager.retired_metrics))
+        assert samples["starbattle_rooms"] == 1
+        assert samples["starbattle_ticks_total"] == 10
+        assert 'starbattle_room_ticks_total{room="alpha"}' not in samples
+        print("SUCCESS: metrics rendered per room and in aggregate")
+
+    def test_metrics_round_trip(self):
+        room = GameRoom("r", seed=3)
+        room.add_player("a", "A", None)
+        room.step()
+        copy = RoomMetrics.from_dict(json.loads(json.dumps(room.metrics.to_dict())))
+        assert render([("r", copy, None)]) == render([("r", room.metrics, None)])
+        print("SUCCESS: metrics survive the shard wire format")
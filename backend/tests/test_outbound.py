@@ -0,0 +1,150 @@
+"""
+Tests for per-connection outbound queues: latest state wins, reliable
+events survive, laggards are disconnected
+"""
+
+import asyncio
+import json
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom  # noqa: E402
+from metrics import RoomMetrics  # noqa: E402
+from outbound import LAGGARD_CLOSE_CODE, STATE, ConnectionWriter  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+class StalledWebSocket(FakeWebSocket):
+    """Every send waits until the test lets it through"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+
+    async def send_text(self, text):
+        await self.gate.wait()
+        self.sent.append(text)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def state(tick, effects=()):
+    return json.dumps({"type": "state", "tick": tick, "effects": list(effects)})
+
+
+class TestConnectionWriter:
+    """Queueing and drop policy of one connection"""
+
+    def test_latest_state_wins_and_events_survive(self):
+        async def run():
+            ws = StalledWebSocket()
+            metrics = RoomMetrics()
+            writer = ConnectionWriter(ws, metrics)
+            kill = {"type": "kill", "killer": "A", "victim": "B"}
+            writer.enqueue(state(1), STATE, [])
+            await asyncio.sleep(0)  # tick 1 is now in flight
+            writer.enqueue(state(2), STATE, [kill, {"type": "explosion", "x": 0, "z": 0}])
+            writer.enqueue('{"type": "roster"}')
+            writer.enqueue(state(3), STATE, [])
+            writer.enqueue(state(4), STATE, [])
+            assert len(writer) == 3
+            ws.gate.set()
+            await writer.drain()
+            return ws, writer, metrics
+
+        ws, writer, metrics = asyncio.run(run())
+        messages = [json.loads(t) for t in ws.sent]
+        assert [m["type"] for m in messages] == ["state", "events", "roster", "state"]
+        assert messages[0]["tick"] == 1 and messages[3]["tick"] == 4
+        assert messages[1]["effects"] == [{"type": "kill", "killer": "A", "victim": "B"}]
+        assert writer.dropped == metrics.dropped_frames == 2
+        assert metrics.bytes_sent == sum(map(len, ws.sent))
+        print("SUCCESS: stale states replaced, kills forwarded, roster kept in order")
+
+    def test_laggard_disconnected(self):
+        async def run():
+            ws = StalledWebSocket()
+            clock = FakeClock()
+            metrics = RoomMetrics()
+            writer = ConnectionWriter(ws, metrics, max_behind=5.0, clock=clock)
+            for tick in range(100):
+                clock.now = tick * 0.05
+                writer.enqueue(state(tick), STATE, [])
+            assert not writer.closed
+            clock.now = 5.2
+            writer.enqueue(state(100), STATE, [])
+            await asyncio.sleep(0)
+            return ws, writer, metrics
+
+        ws, writer, metrics = asyncio.run(run())
+        assert writer.closed and len(writer) == 0
+        assert ws.closed_with == LAGGARD_CLOSE_CODE
+        assert metrics.laggards == 1
+        print(f"SUCCESS: disconnected after {writer.dropped} dropped snapshots")
+
+    def test_reliable_backlog_is_bounded(self):
+        async def run():
+            ws = StalledWebSocket()
+            writer = ConnectionWriter(ws, max_queue=8)
+            for i in range(8):
+                writer.enqueue(json.dumps({"type": "events", "effects": [], "i": i}))
+            assert not writer.closed
+            writer.enqueue(json.dumps({"type": "events", "effects": []}))
+            return writer
+
+        writer = asyncio.run(run())
+        assert writer.closed
+        print("SUCCESS: a connection that cannot take reliable messages is given up on")
+
+
+class TestRoomFanOut:
+    """The room only queues; one stalled client does not hold up the rest"""
+
+    def test_stalled_client_does_not_block_broadcast(self):
+        async def run():
+            room = GameRoom("fanout", seed=3)
+            stalled, fast = StalledWebSocket(), FakeWebSocket()
+            room.add_player("slow", "Slow", stalled, "vanguard")
+            room.add_player("fast", "Fast", fast, "dreadnought")
+            for _ in range(10):
+                room._simulate_tick()
+                room._broadcast_state()
+                await asyncio.sleep(0)
+            assert len(fast.sent) == 10
+            assert stalled.sent == []
+            stalled.gate.set()
+            await room.flush()
+            return room, stalled, fast
+
+        room, stalled, fast = asyncio.run(run())
+        ticks = [json.loads(t)["tick"] for t in stalled.sent]
+        assert ticks == [1, 10]
+        assert room.metrics.dropped_frames == 8
+        assert room.summary()["droppedFrames"] == {"slow": 8, "fast": 0}
+        print("SUCCESS: the fast client got every snapshot, the stalled one the first and latest")
+
+    def test_failed_socket_removed(self):
+        class BrokenWebSocket(FakeWebSocket):
+            async def send_text(self, text):
+                raise ConnectionError("gone")
+
+        async def run():
+            room = GameRoom("broken", seed=3)
+            room.add_player("a", "A", BrokenWebSocket(), "vanguard")
+            room.add_player("b", "B", FakeWebSocket(), "vanguard")
+            for _ in range(2):
+                room._simulate_tick()
+                room._broadcast_state()
+                await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        assert list(room.players) == ["b"]
+        print("SUCCESS: a connection whose socket failed leaves on the next broadcast")
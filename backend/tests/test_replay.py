@@ -0,0 +1,99 @@
+"""
+Tests for match replays: recording, keyframe seeking and replaying inputs
+"""
+
+import json
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom  # noqa: E402
+from replay import KEYFRAME, RECORD, ReplayReader  # noqa: E402
+
+
+def brawl_inputs(room, rng):
+    for player_id in list(room.players):
+        roll = rng.random()
+        x, z = rng.uniform(-40, 40), rng.uniform(-40, 40)
+        if roll < 0.3:
+            room.queue_message(player_id, {"type": "move", "x": x, "z": z})
+        elif roll < 0.5:
+            room.queue_message(player_id, {"type": "fire_start", "x": x, "z": z})
+        elif roll < 0.55:
+            room.queue_message(player_id, {"type": "ability", "id": rng.choice("qwer"), "x": x, "z": z})
+
+
+def without_effects(state):
+    return json.dumps({k: v for k, v in state.items() if k != "effects"})
+
+
+def record_match(path, vectorized=False, ticks=300):
+    """Record a match with players coming and going; returns every tick's state."""
+    room = GameRoom("replay", vectorized=vectorized, seed=21)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(5):
+        room.add_player(f"p{i}", f"P{i}", None, classes[i % 3])
+    recorder = room.start_recording(str(path), keyframe_interval=2.0)
+    rng = random.Random(8)
+    states = {room.tick: room._state_message()}
+    for n in range(ticks):
+        if n == 50:
+            room.add_player("late", "Late", None, "leviathan")
+        if n == 120:
+            room.remove_player("p1")
+        brawl_inputs(room, rng)
+        room._simulate_tick()
+        states[room.tick] = room._state_message()
+    room.stop_recording()
+    recorder.wait()
+    return states
+
+
+class TestReplay:
+    """A replay rebuilds every tick of the recorded match"""
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_states_match_recording(self, tmp_path, vectorized):
+        path = tmp_path / "match.replay"
+        states = record_match(path, vectorized)
+        with ReplayReader(str(path)) as reader:
+            assert (reader.start_tick, reader.end_tick) == (0, 300)
+            assert reader.info["room"] == "replay"
+            replayed = list(reader.states())
+        assert len(replayed) == 300
+        for state in replayed:
+            assert json.dumps(state) == json.dumps(states[state["tick"]]), state["tick"]
+        print(f"SUCCESS: 300 ticks replayed exactly from {path.stat().st_size} bytes")
+
+    def test_seek(self, tmp_path):
+        path = tmp_path / "match.replay"
+        states = record_match(path)
+        with ReplayReader(str(path)) as reader:
+            # One keyframe at the start, every 40 ticks, and one at the end
+            assert reader._keyframe_ticks == [0] + list(range(40, 281, 40)) + [300]
+            for tick in (0, 1, 39, 40, 51, 121, 200, 299, 300):
+                room = reader.seek(tick)
+                assert room.tick == tick
+                assert without_effects(room._state_message()) == without_effects(states[tick]), tick
+            assert "late" in reader.seek(60).players and "p1" not in reader.seek(130).players
+            with pytest.raises(ValueError):
+                reader.seek(301)
+        print("SUCCESS: seeking to any tick restores the nearest keyframe and replays to it")
+
+    def test_truncated_file(self, tmp_path):
+        path = tmp_path / "match.replay"
+        states = record_match(path, ticks=100)
+        data = path.read_bytes()
+        # Cut the final keyframe in half, as a crash mid-write would
+        last = data.rfind(RECORD.pack(KEYFRAME, 100, 0)[:5])
+        path.write_bytes(data[:last + RECORD.size + 10])
+        with ReplayReader(str(path)) as reader:
+            assert reader._keyframe_ticks[-1] == 80
+            # The inputs of the last tick were written before the keyframe
+            end = reader.end_tick
+            assert end == 100
+            assert without_effects(reader.seek(end)._state_message()) == without_effects(states[end])
+        print(f"SUCCESS: a replay cut short still plays up to tick {end} from keyframe 80")
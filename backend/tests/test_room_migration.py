@@ -0,0 +1,162 @@
+"""
+Tests for room snapshots and live migration between RoomManagers
+"""
+
+import asyncio
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, RoomManager, TICK_INTERVAL  # noqa: E402
+
+CLASSES = ("vanguard", "dreadnought", "leviathan")
+
+
+def _new_room(vectorized=False):
+    room = GameRoom("fight", vectorized=vectorized)
+    room.rng.seed(17)
+    for i in range(12):
+        room.add_player(f"p{i}", f"P{i}", None, CLASSES[i % 3])
+    # Pack everyone together so the fight starts at once
+    placement = random.Random(18)
+    for p in room.players.values():
+        p.x = placement.uniform(-40, 40)
+        p.z = placement.uniform(-40, 40)
+    return room
+
+
+def _inputs(room):
+    rng = random.Random(room.tick)
+    messages = []
+    for i in range(12):
+        roll = rng.random()
+        if roll < 0.15:
+            messages.append((f"p{i}", {"type": "move", "x": rng.uniform(-60, 60), "z": rng.uniform(-60, 60)}))
+        elif roll < 0.4:
+            # Everyone gangs up on the first few ships so respawns happen
+            target = room.players[f"p{rng.randrange(3)}"]
+            messages.append((f"p{i}", {"type": "fire_start", "x": target.x, "z": target.z}))
+        elif roll < 0.45:
+            messages.append((f"p{i}", {"type": "fire_stop"}))
+        elif roll < 0.6:
+            messages.append((f"p{i}", {"type": "ability", "id": rng.choice("qwer"),
+                                       "x": rng.uniform(-60, 60), "z": rng.uniform(-60, 60)}))
+    return messages
+
+
+def _step(room):
+    for player_id, msg in _inputs(room):
+        room.queue_message(player_id, msg)
+    room._process_inputs()
+    room._update(TICK_INTERVAL)
+    room.tick += 1
+
+
+def _state(room):
+    return (
+        room.tick,
+        room.current_time,
+        [p.to_dict() for p in room.players.values()],
+        [m.to_dict() for m in room.missiles],
+        [b.to_dict() for b in room.bombardment_zones],
+        [c.to_dict() for c in room.spore_clouds],
+        [m.to_dict() for m in room.mutalisks],
+        list(room.effects),
+    )
+
+
+class TestRoomSnapshot:
+    """A restored room continues exactly like the original"""
+
+    @pytest.mark.parametrize("vectorized", [False, True])
+    def test_migrated_mid_fight_continues_identically(self, vectorized):
+        reference = _new_room(vectorized)
+        migrated = _new_room(vectorized)
+        for _ in range(300):
+            _step(reference)
+            _step(migrated)
+
+        # Mid-fight: projectiles, zones and mutalisks are in flight
+        deaths = sum(p.deaths for p in migrated.players.values())
+        assert deaths > 0
+        assert len(migrated.missiles) + len(migrated.mutalisks) + len(migrated.spore_clouds) > 0
+        # Undelivered effects and queued inputs travel with the room
+        migrated.queue_message("p0", {"type": "fire_stop"})
+        reference.queue_message("p0", {"type": "fire_stop"})
+
+        data = migrated.snapshot()
+        migrated = GameRoom.from_snapshot(data, vectorized=vectorized)
+        assert _state(migrated) == _state(reference)
+
+        # A kill right after the move makes the respawn draw from the
+        # restored RNG
+        for room in (reference, migrated):
+            room._apply_damage(room.players["p1"], 1e6, room.players["p2"])
+        respawns = 0
+        for _ in range(600):
+            before = sum(p.deaths for p in reference.players.values())
+            _step(reference)
+            _step(migrated)
+            respawns += sum(p.deaths for p in reference.players.values()) - before
+            assert _state(migrated) == _state(reference)
+            reference.effects.clear()
+            migrated.effects.clear()
+        assert respawns > 0
+        print(f"SUCCESS: {len(data)} byte snapshot, 600 identical ticks after restore, {respawns} deaths")
+
+    def test_restored_handles_and_ids(self):
+        room = _new_room()
+        for _ in range(200):
+            _step(room)
+        restored = GameRoom.from_snapshot(room.snapshot())
+        assert [m.id for m in restored.missiles] == [m.id for m in room.missiles]
+        assert all(restored.missiles.get(m.handle) is m for m in restored.missiles)
+        assert restored._next_entity_handle == room._next_entity_handle
+        assert restored.connections == {}
+        print("SUCCESS: restored entities keep ids and get live handles")
+
+    def test_rejects_unknown_version(self):
+        import json
+        import zlib
+        doc = json.loads(zlib.decompress(_new_room().snapshot()))
+        doc["v"] = -1
+        with pytest.raises(ValueError):
+            GameRoom.from_snapshot(zlib.compress(json.dumps(doc).encode()))
+        print("SUCCESS: unknown snapshot versions are rejected")
+
+
+class TestRoomManagerMigration:
+    """Rooms move between managers with their connections"""
+
+    def test_export_import(self):
+        async def run():
+            source = RoomManager()
+            target = RoomManager()
+            room = source.get_or_create_room("moving")
+            room.add_player("a", "A", None, "vanguard")
+            await asyncio.sleep(TICK_INTERVAL * 3)
+
+            data = source.export_room("moving")
+            assert "moving" not in source.rooms
+            assert not room.running
+            tick = room.tick
+
+            sent = []
+
+            class Sink:
+                async def send_text(self, text):
+                    sent.append(text)
+
+            moved = target.import_room(data, {"a": Sink()})
+            await asyncio.sleep(TICK_INTERVAL * 3)
+            moved.stop()
+            assert moved.tick > tick
+            assert sent
+            with pytest.raises(ValueError):
+                target.import_room(data)
+
+        asyncio.run(run())
+        print("SUCCESS: room exported from one manager resumes in another")
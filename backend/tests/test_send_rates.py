@@ -0,0 +1,190 @@
+"""
+Tests for separate simulation and snapshot rates, and per-connection send rates
+"""
+
+import asyncio
+import json
+import math
+import random
+import sys
+import time
+
+sys.path.insert(0, '/app/backend')
+
+from delta import apply_delta  # noqa: E402
+from game_engine import GameRoom  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+def brawl_room(**room_options):
+    room = GameRoom("rates", seed=7, **room_options)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(6):
+        p = room.add_player(f"p{i}", f"P{i}", FakeWebSocket(), classes[i % 3])
+        p.x = (i - 3) * 8.0
+        p.z = (i % 2) * 6.0
+    return room
+
+
+def brawl_inputs(room, rng):
+    for player_id in room.players:
+        roll = rng.random()
+        if roll < 0.3:
+            room.queue_message(player_id, {"type": "move", "x": rng.uniform(-40, 40), "z": rng.uniform(-40, 40)})
+        elif roll < 0.6:
+            room.queue_message(player_id, {"type": "fire_start", "x": rng.uniform(-30, 30), "z": rng.uniform(-30, 30)})
+        elif roll < 0.7:
+            room.queue_message(player_id, {"type": "ability", "id": rng.choice("qwer"),
+                                           "x": rng.uniform(-30, 30), "z": rng.uniform(-30, 30)})
+
+
+def travel(tick_rate, seconds=3.0):
+    room = GameRoom("travel", seed=1, tick_rate=tick_rate)
+    ship = room.add_player("a", "A", None, "vanguard")
+    ship.x = ship.z = ship.vx = ship.vz = ship.rotation = 0.0
+    room.queue_message("a", {"type": "move", "x": 0.0, "z": 200.0})
+    for _ in range(round(seconds * tick_rate)):
+        room._simulate_tick()
+    return ship.z
+
+
+class TestRates:
+    """Physics and broadcasts run at their own rates"""
+
+    def test_snapshots_every_few_ticks(self):
+        async def run():
+            room = brawl_room(tick_rate=60, snapshot_rate=20)
+            rng = random.Random(1)
+            for _ in range(60):
+                brawl_inputs(room, rng)
+                room._simulate_tick()
+                if room._snapshot_due():
+                    room._broadcast_state()
+                    await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        assert room.ticks_per_snapshot == 3
+        ticks = [json.loads(t)["tick"] for t in room.connections["p0"].sent]
+        assert ticks == [1] + list(range(3, 61, 3))
+        print(f"SUCCESS: 60 ticks at 60 Hz, {len(ticks)} snapshots")
+
+    def test_ships_fly_the_same_in_seconds(self):
+        at_20, at_60 = travel(20), travel(60)
+        assert at_20 > 100
+        assert abs(at_60 - at_20) / at_20 < 0.03
+        print(f"SUCCESS: 3 s of flight covers {at_20:.1f} at 20 Hz, {at_60:.1f} at 60 Hz")
+
+
+class TestSendRates:
+    """Slow connections get fewer snapshots but every effect"""
+
+    def test_effects_accumulate_between_sends(self):
+        async def run():
+            room = brawl_room()
+            room.set_send_rate("p1", 5)
+            room.set_send_rate("p2", 5)
+            room.enable_binary("p2")
+            room.set_send_rate("p3", 1)
+            rng = random.Random(2)
+            for n in range(80):
+                brawl_inputs(room, rng)
+                room._simulate_tick()
+                if n % 7 == 0:
+                    room.effects.append({"type": "kill", "killer": "P0", "victim": f"P{n % 6}"})
+                room._broadcast_state()
+                await room.flush()
+            return room
+
+        room = asyncio.run(run())
+        assert room.send_rates() == {"p1": 5.0, "p2": 5.0, "p3": 1.0}
+        full = [json.loads(t) for t in room.connections["p0"].sent]
+        slow = [json.loads(t) for t in room.connections["p1"].sent]
+        slowest = [json.loads(t) for t in room.connections["p3"].sent]
+        assert len(full) == 80
+        assert [m["tick"] for m in slow] == [1] + list(range(4, 81, 4))
+        assert [m["tick"] for m in slowest] == [1, 20, 40, 60, 80]
+        all_effects = [e for m in full for e in m["effects"]]
+        assert sum(e["type"] == "kill" for e in all_effects) == 12
+        assert [e for m in slow for e in m["effects"]] == all_effects
+        assert [e for m in slowest for e in m["effects"]] == all_effects
+        by_tick = {m["tick"]: m for m in full}
+        for m in slow:
+            assert {k: v for k, v in m.items() if k != "effects"} == \
+                {k: v for k, v in by_tick[m["tick"]].items() if k != "effects"}
+        # Binary frames at the same rate: the roster, then one frame per send
+        assert len(room.connections["p2"].sent) == 1 + len(slow)
+        print(f"SUCCESS: {len(all_effects)} effects reached 20 Hz, 5 Hz and 1 Hz clients alike")
+
+    def test_delta_at_reduced_rate(self):
+        async def run():
+            room = brawl_room()
+            room.enable_delta("p4")
+            room.set_send_rate("p4", 10)
+            rng = random.Random(3)
+            decoded = {}
+            for _ in range(60):
+                brawl_inputs(room, rng)
+                room._simulate_tick()
+                room._broadcast_state()
+                await room.flush()
+                sent = room.connections["p4"].sent
+                if len(sent) > len(decoded):
+                    msg = json.loads(sent[-1])
+                    if msg["type"] == "delta":
+                        msg = apply_delta(decoded[msg["base"]], msg)
+                    decoded[msg["tick"]] = msg
+                    room.queue_message("p4", {"type": "ack", "tick": msg["tick"]})
+            return room, decoded
+
+        room, decoded = asyncio.run(run())
+        full = {json.loads(t)["tick"]: json.loads(t) for t in room.connections["p0"].sent}
+        kinds = [json.loads(t)["type"] for t in room.connections["p4"].sent]
+        assert len(kinds) == 31 and kinds.count("delta") == 30
+        for tick, state in decoded.items():
+            assert {k: v for k, v in state.items() if k != "effects"} == \
+                {k: v for k, v in full[tick].items() if k != "effects"}
+        effects = [e for tick in sorted(decoded) for e in decoded[tick]["effects"]]
+        assert effects == [e for tick in sorted(full) for e in full[tick]["effects"]]
+        print("SUCCESS: deltas at 10 Hz rebuild the same states and carry every effect")
+
+    def test_rate_is_clamped_to_room(self):
+        room = GameRoom("clamp", tick_rate=30, snapshot_rate=10)
+        room.set_send_rate("a", 50)
+        room.set_send_rate("b", 0.01)
+        assert room.snapshot_rate == 10
+        assert room.send_rates() == {"b": 1.0}
+        assert math.isclose(room.tick_interval, 1 / 30)
+        print("SUCCESS: send rates stay between MIN_SEND_RATE and the room's snapshot rate")
+
+    def test_rate_not_a_number(self):
+        room = GameRoom("nan", snapshot_rate=10)
+        room.set_send_rate("a", float("nan"))
+        room.set_send_rate("b", float("inf"))
+        assert room.send_rates() == {}
+        print("SUCCESS: non-finite send rates leave connections at the room's rate")
+
+
+class TestRateParameter:
+    """?rate= on the websocket endpoint"""
+
+    def test_nan_rate_joins_and_leaves(self, monkeypatch):
+        monkeypatch.setenv("MONGO_URL", "mongodb://localhost:27017")
+        monkeypatch.setenv("DB_NAME", "test")
+        from fastapi.testclient import TestClient
+        import server
+
+        with TestClient(server.app) as client:
+            with client.websocket_connect("/api/ws/nan-rate?name=N&rate=nan") as ws:
+                assert ws.receive_json()["type"] == "init"
+                assert ws.receive_json()["type"] == "state"
+                room = server.room_manager.rooms["nan-rate"]
+                assert list(p.name for p in room.players.values()) == ["N"]
+                assert room.send_rates() == {}
+            # The handler's cleanup ran: no ghost ship is left behind
+            for _ in range(100):
+                if "nan-rate" not in server.room_manager.rooms:
+                    break
+                time.sleep(0.01)
+            assert "nan-rate" not in server.room_manager.rooms
+        print("SUCCESS: rate=nan joins at the room's rate and leaves cleanly")
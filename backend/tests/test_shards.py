@@ -0,0 +1,197 @@
+"""
+Tests for multi-process room sharding
+"""
+
+import asyncio
+import json
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from metrics import render  # noqa: E402
+from shards import ShardRouter, shard_for  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+class RoutedWebSocket(FakeWebSocket):
+    """Decodes the text frames a shard routes to one client"""
+
+    def __init__(self):
+        super().__init__()
+        self.got_state = asyncio.Event()
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+        self.got_state.set()
+
+    def states(self):
+        return [f for f in self.sent if f.get("type") == "state"]
+
+
+def room_ids_for_each_shard(shard_count):
+    found = {}
+    i = 0
+    while len(found) < shard_count:
+        found.setdefault(shard_for(f"room-{i}", shard_count), f"room-{i}")
+        i += 1
+    return [found[i] for i in range(shard_count)]
+
+
+class TestShardFor:
+    """Room placement is stable"""
+
+    def test_stable_and_in_range(self):
+        for n in (1, 2, 7):
+            for i in range(100):
+                index = shard_for(f"room-{i}", n)
+                assert 0 <= index < n
+                assert index == shard_for(f"room-{i}", n)
+        print("SUCCESS: shard placement is stable")
+
+
+class TestShardRouter:
+    """Rooms run in worker processes and stream state back through the front"""
+
+    def test_rooms_routed_to_shards(self):
+        async def run():
+            router = ShardRouter(2)
+            await router.start()
+            try:
+                room_a, room_b = room_ids_for_each_shard(2)
+                ws_a1, ws_a2, ws_b = RoutedWebSocket(), RoutedWebSocket(), RoutedWebSocket()
+                router.join(ws_a1, room_a, "a1", "Alpha", "vanguard")
+                router.join(ws_a2, room_a, "a2", "Bravo", "leviathan")
+                router.join(ws_b, room_b, "b1", "Charlie", "dreadnought")
+                for ws in (ws_a1, ws_a2, ws_b):
+                    await asyncio.wait_for(ws.got_state.wait(), 5)
+
+                rooms = {r["id"]: r for r in await router.list_rooms()}
+                assert set(rooms) == {room_a, room_b}
+                assert rooms[room_a]["shard"] == 0 and rooms[room_b]["shard"] == 1
+                assert sorted(rooms[room_a]["playerNames"]) == ["Alpha", "Bravo"]
+                assert rooms[room_b]["playerCount"] == 1
+
+                series, _ = await router.collect_metrics()
+                assert {rid for rid, _, _ in series} == {room_a, room_b}
+                assert all(m.ticks > 0 and m.snapshots > 0 for _, m, _ in series)
+                assert "starbattle_rooms 2" in render(*await router.collect_metrics())
+
+                # Inputs reach the owning room
+                router.send_input(room_a, "a1", json.dumps({"type": "fire_start"}))
+                router.send_input(room_a, "a1", "not json")
+                for _ in range(100):
+                    await asyncio.sleep(0.02)
+                    me = [p for p in ws_a1.states()[-1]["players"] if p["id"] == "a1"][0]
+                    if me["isFiring"]:
+                        break
+                assert me["isFiring"]
+                assert all(len(s["players"]) == 1 for s in ws_b.states())
+
+                router.leave(room_b, "b1")
+                for _ in range(100):
+                    await asyncio.sleep(0.02)
+                    rooms = {r["id"] for r in await router.list_rooms()}
+                    if room_b not in rooms:
+                        break
+                assert rooms == {room_a}
+            finally:
+                await router.stop()
+            assert router.shards == []
+
+        asyncio.run(run())
+        print("SUCCESS: rooms run in shards, inputs routed, rooms aggregated")
+
+    def test_migrate_room_between_shards(self):
+        async def run():
+            router = ShardRouter(2)
+            await router.start()
+            try:
+                room_id, _ = room_ids_for_each_shard(2)
+                ws_a, ws_b = RoutedWebSocket(), RoutedWebSocket()
+                router.join(ws_a, room_id, "a", "Alpha", "vanguard")
+                router.join(ws_b, room_id, "b", "Bravo", "leviathan")
+                await asyncio.wait_for(ws_a.got_state.wait(), 5)
+                await asyncio.sleep(0.3)
+                router.send_input(room_id, "a", json.dumps({"type": "fire_start", "x": 10, "z": 10}))
+
+                await router.migrate_room(room_id, 1)
+                # Input sent while nothing owns the room is replayed on the target
+                router.send_input(room_id, "b", json.dumps({"type": "move", "x": 5, "z": 5}))
+                await asyncio.sleep(0.5)
+
+                rooms = await router.list_rooms()
+                assert [(r["id"], r["shard"], r["playerCount"]) for r in rooms] == [(room_id, 1, 2)]
+
+                ticks = [s["tick"] for s in ws_a.states()]
+                assert ticks == sorted(ticks)
+                assert len(set(ticks)) == len(ticks)
+                gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+                assert max(gaps) <= 3
+                me = [p for p in ws_a.states()[-1]["players"] if p["id"] == "a"][0]
+                assert me["isFiring"] or me["energy"] < 100
+
+                # Draining shard 1 sends the room back
+                await router.drain_shard(1)
+                rooms = await router.list_rooms()
+                assert [(r["id"], r["shard"]) for r in rooms] == [(room_id, 0)]
+                count = len(ws_b.states())
+                await asyncio.sleep(0.3)
+                assert len(ws_b.states()) > count
+            finally:
+                await router.stop()
+
+        asyncio.run(run())
+        print("SUCCESS: room migrated between shards with clients attached")
+
+    def test_placement_dropped_with_room(self):
+        async def run():
+            router = ShardRouter(2)
+            await router.start()
+            try:
+                room_id, _ = room_ids_for_each_shard(2)
+                ws_a, ws_b = RoutedWebSocket(), RoutedWebSocket()
+                router.join(ws_a, room_id, "a", "Alpha", "vanguard")
+                router.spectate(RoutedWebSocket(), room_id, "viewer")
+                await router.migrate_room(room_id, 1)
+                assert router.placements == {room_id: 1}
+                router.leave(room_id, "a")
+                # Spectators keep the room running where it is
+                assert router.placements == {room_id: 1}
+                router.unspectate(room_id, "viewer")
+                assert router.placements == {}
+                await asyncio.sleep(0.2)
+                assert await router.list_rooms() == []
+
+                # Back on its hashed shard when someone joins again
+                router.join(ws_b, room_id, "b", "Bravo", "leviathan")
+                await asyncio.wait_for(ws_b.got_state.wait(), 5)
+                rooms = await router.list_rooms()
+                assert [(r["id"], r["shard"], r["playerCount"]) for r in rooms] == [(room_id, 0, 1)]
+            finally:
+                await router.stop()
+
+        asyncio.run(run())
+        print("SUCCESS: a migrated room's placement goes when its last connection leaves")
+
+    def test_bad_join_keeps_shard_connected(self):
+        async def run():
+            router = ShardRouter(1)
+            await router.start()
+            try:
+                ws_a, ws_b = RoutedWebSocket(), RoutedWebSocket()
+                router.join(ws_a, "nan-rate", "a", "Alpha", "vanguard")
+                await asyncio.wait_for(ws_a.got_state.wait(), 5)
+                router.join(ws_b, "nan-rate", "b", "Bravo", "vanguard", rate=float("nan"))
+                # A frame the worker cannot handle is logged and skipped
+                router.shards[0].send({"op": "join", "conn": "c"})
+                await asyncio.wait_for(ws_b.got_state.wait(), 5)
+                rooms = await router.list_rooms()
+                assert [(r["id"], r["playerCount"]) for r in rooms] == [("nan-rate", 2)]
+                count = len(ws_a.states())
+                await asyncio.sleep(0.2)
+                assert len(ws_a.states()) > count
+            finally:
+                await router.stop()
+
+        asyncio.run(run())
+        print("SUCCESS: rate=nan and a malformed frame leave the shard's other players connected")
@@ -0,0 +1,86 @@
+"""
+Tests for the vectorized (ShipArrays) movement backend
+Compares vectorized rooms against the scalar path tick by tick
+"""
+
+import math
+import random
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, ArrayPlayer, TICK_INTERVAL, ARENA_SIZE  # noqa: E402
+from ship_arrays import ShipArrays  # noqa: E402
+
+KINEMATIC_FIELDS = ("x", "z", "vx", "vz", "rotation", "has_move_target")
+
+
+def _build_room(vectorized, players=40):
+    random.seed(21)
+    room = GameRoom("physics", vectorized=vectorized)
+    room.rng.seed(21)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(players):
+        room.add_player(f"p{i}", f"p{i}", None, classes[i % 3])
+    return room
+
+
+def _drive(room, rng):
+    for pid in room.players:
+        roll = rng.random()
+        if roll < 0.15:
+            # Targets beyond the walls exercise the arena bounce
+            room.queue_message(pid, {"type": "move", "x": rng.uniform(-400, 400), "z": rng.uniform(-400, 400)})
+        elif roll < 0.17:
+            room.queue_message(pid, {"type": "ability", "id": rng.choice("qw"),
+                                     "x": rng.uniform(-300, 300), "z": rng.uniform(-300, 300)})
+    room._process_inputs()
+    room._update(TICK_INTERVAL)
+
+
+class TestShipArrays:
+    """Slot allocation and Player views"""
+
+    def test_slots_are_reused_and_grow(self):
+        ships = ShipArrays(capacity=2)
+        a, b, c = ships.allocate(), ships.allocate(), ships.allocate()
+        assert len({a, b, c}) == 3
+        assert ships.capacity == 4
+        ships.release(b)
+        assert ships.allocate() == b
+
+    def test_array_player_is_a_view(self):
+        room = _build_room(True, players=2)
+        player = room.players["p0"]
+        assert isinstance(player, ArrayPlayer)
+        player.x = 12.5
+        player.has_move_target = True
+        assert room._ships.data[0, player._slot] == 12.5
+        assert player.has_move_target is True
+        assert isinstance(player.to_dict()["x"], float)
+        room.remove_player("p0")
+        room.add_player("p9", "p9", None)
+        assert room.players["p9"]._slot == player._slot
+
+
+class TestVectorizedEquivalence:
+    """Vectorized movement must match the scalar path within float tolerance"""
+
+    def test_matches_scalar_path(self):
+        scalar = _build_room(False)
+        vector = _build_room(True)
+        rng_s = random.Random(4)
+        rng_v = random.Random(4)
+        for tick in range(150):
+            # Keep respawn positions in lockstep even if float noise shifts a death
+            scalar.rng.seed(tick)
+            _drive(scalar, rng_s)
+            vector.rng.seed(tick)
+            _drive(vector, rng_v)
+            for pid, ps in scalar.players.items():
+                pv = vector.players[pid]
+                for field in KINEMATIC_FIELDS:
+                    a, b = getattr(ps, field), getattr(pv, field)
+                    assert math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9), (tick, pid, field, a, b)
+                assert abs(pv.x) <= ARENA_SIZE and abs(pv.z) <= ARENA_SIZE
+        print("SUCCESS: vectorized movement matches scalar path")
@@ -0,0 +1,122 @@
+"""
+Tests for the generational slot arena used for missiles, zones, clouds and mutalisks
+"""
+
+import random
+import sys
+import time
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, MISSILE_LIFETIME, TICK_INTERVAL  # noqa: E402
+from slot_arena import SlotArena  # noqa: E402
+
+
+class Item:
+    __slots__ = ("value", "handle")
+
+    def __init__(self, value):
+        self.value = value
+
+
+class TestSlotArena:
+    """Swap-remove keeps storage dense and handles stable"""
+
+    def test_add_get_discard(self):
+        arena = SlotArena()
+        items = [Item(i) for i in range(5)]
+        handles = [arena.add(it) for it in items]
+        assert len(arena) == 5
+        assert all(arena.get(h) is it for h, it in zip(handles, items))
+
+        assert arena.discard(items[1])
+        assert not arena.discard(items[1])
+        assert arena.get(handles[1]) is None
+        assert len(arena) == 4
+        # The survivors are still reachable through their original handles
+        for h, it in zip(handles, items):
+            if it is not items[1]:
+                assert arena.get(h) is it
+        assert sorted(it.value for it in arena) == [0, 2, 3, 4]
+        print("SUCCESS: add/get/discard keep handles stable")
+
+    def test_stale_handle_after_slot_reuse(self):
+        arena = SlotArena()
+        old = Item("old")
+        old_handle = arena.add(old)
+        arena.discard(old)
+        new = Item("new")
+        new_handle = arena.add(new)
+        assert new_handle != old_handle
+        assert arena.get(old_handle) is None
+        assert arena.get(new_handle) is new
+        # Re-adding a recycled object gives it a fresh handle too
+        arena.discard(new)
+        arena.add(old)
+        assert arena.get(new_handle) is None
+        assert arena.get(old.handle) is old
+        print("SUCCESS: stale handles do not alias reused slots")
+
+    def test_random_churn_matches_reference(self):
+        rng = random.Random(7)
+        arena = SlotArena()
+        live = {}
+        for step in range(20000):
+            if live and rng.random() < 0.5:
+                handle = rng.choice(list(live))
+                assert arena.discard(live.pop(handle))
+            else:
+                item = Item(step)
+                live[arena.add(item)] = item
+            assert len(arena) == len(live)
+        assert {id(it) for it in arena} == {id(it) for it in live.values()}
+        assert all(arena.get(h) is it for h, it in live.items())
+        print("SUCCESS: arena matches a reference dict under random churn")
+
+
+class TestMissileStress:
+    """Thousands of short-lived missiles churn through the room arena"""
+
+    def test_short_lived_missile_churn(self):
+        room = GameRoom("stress")
+        target = room.add_player("t", "T", None, "dreadnought")
+        target.x, target.z = 0.0, 0.0
+        shooters = []
+        for i in range(20):
+            p = room.add_player(f"s{i}", f"S{i}", None, "vanguard")
+            # Neighbours are hit within a few ticks; missiles that lose
+            # their target retarget or expire
+            p.x, p.z = 5.0 + i * 3.0, 0.0
+            shooters.append(p)
+
+        for p in room.players.values():
+            p.max_hull = p.hull = 1e9
+
+        fired = 0
+        peak = 0
+        start = time.perf_counter()
+        for tick in range(200):
+            for p in shooters:
+                p.missile_cooldown = 0
+                before = len(room.missiles)
+                room._use_missiles(p)
+                fired += len(room.missiles) - before
+            peak = max(peak, len(room.missiles))
+            room._update(TICK_INTERVAL)
+            assert all(m.alive for m in room.missiles)
+            assert len({m.id for m in room.missiles}) == len(room.missiles)
+            assert len({m.handle for m in room.missiles}) == len(room.missiles)
+            assert all(room.missiles.get(m.handle) is m for m in room.missiles)
+        elapsed = time.perf_counter() - start
+
+        assert fired == 200 * 20 * 5
+        assert peak < fired
+        # Every missile fired after the first lifetime came out of the pool
+        assert room._missile_pool.created <= peak + 20 * 5
+        assert room._missile_pool.reused == fired - room._missile_pool.created
+
+        # Stop firing and let the sky clear
+        for _ in range(int(MISSILE_LIFETIME / TICK_INTERVAL) + 2):
+            room._update(TICK_INTERVAL)
+        assert len(room.missiles) == 0
+        print(f"SUCCESS: {fired} missiles churned in {elapsed:.2f}s, peak {peak} live")
@@ -0,0 +1,142 @@
+"""
+Tests for the SpatialGrid proximity index used by GameRoom
+Checks grid queries against brute-force scans and full-room equivalence
+"""
+
+import math
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, ARENA_SIZE, GRID_CELL_SIZE, TICK_INTERVAL  # noqa: E402
+from spatial_grid import SpatialGrid  # noqa: E402
+
+
+class _Point:
+    def __init__(self, pid, x, z, alive=True):
+        self.id = pid
+        self.x = x
+        self.z = z
+        self.alive = alive
+
+
+def _random_points(rng, count):
+    return [
+        _Point(f"p{i}", rng.uniform(-ARENA_SIZE, ARENA_SIZE), rng.uniform(-ARENA_SIZE, ARENA_SIZE),
+               alive=rng.random() > 0.1)
+        for i in range(count)
+    ]
+
+
+def _brute_nearest(points, x, z, exclude_id, max_range):
+    nearest = None
+    nearest_dist = float('inf')
+    for p in points:
+        if p.id == exclude_id or not p.alive:
+            continue
+        d = math.sqrt((p.x - x) ** 2 + (p.z - z) ** 2)
+        if d < nearest_dist and d < max_range:
+            nearest = p
+            nearest_dist = d
+    return nearest
+
+
+@pytest.fixture
+def indexed_grid():
+    original = SpatialGrid.linear_scan_max
+    SpatialGrid.linear_scan_max = 0
+    yield SpatialGrid(ARENA_SIZE, GRID_CELL_SIZE)
+    SpatialGrid.linear_scan_max = original
+
+
+class TestSpatialGridQueries:
+    """Grid queries must return exactly what a full scan returns"""
+
+    def test_nearest_matches_scan(self, indexed_grid):
+        rng = random.Random(7)
+        for count in (1, 5, 40, 200):
+            points = _random_points(rng, count)
+            indexed_grid.rebuild(points)
+            for _ in range(50):
+                x = rng.uniform(-ARENA_SIZE - 10, ARENA_SIZE + 10)
+                z = rng.uniform(-ARENA_SIZE - 10, ARENA_SIZE + 10)
+                exclude = rng.choice(points).id
+                max_range = rng.choice([float('inf'), 60.0, 100.0])
+                expected = _brute_nearest(points, x, z, exclude, max_range)
+                assert indexed_grid.nearest(x, z, exclude, max_range) is expected
+
+    def test_radius_matches_scan(self, indexed_grid):
+        rng = random.Random(11)
+        points = _random_points(rng, 150)
+        indexed_grid.rebuild(points)
+        for _ in range(100):
+            x = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+            z = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+            radius = rng.uniform(5, 80)
+            expected = [
+                p for p in points
+                if p.id != "p0" and p.alive and math.sqrt((p.x - x) ** 2 + (p.z - z) ** 2) < radius
+            ]
+            assert indexed_grid.query_radius(x, z, radius, exclude_id="p0") == expected
+
+    def test_segment_matches_scan(self, indexed_grid):
+        rng = random.Random(13)
+        points = _random_points(rng, 150)
+        indexed_grid.rebuild(points)
+        for _ in range(100):
+            x = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+            z = rng.uniform(-ARENA_SIZE, ARENA_SIZE)
+            angle = rng.uniform(0, 2 * math.pi)
+            ndx, ndz = math.sin(angle), math.cos(angle)
+            expected = []
+            for p in points:
+                if not p.alive:
+                    continue
+                t = (p.x - x) * ndx + (p.z - z) * ndz
+                if t < 0 or t > 80.0:
+                    continue
+                d = math.sqrt((p.x - (x + ndx * t)) ** 2 + (p.z - (z + ndz * t)) ** 2)
+                if d < 3.75:
+                    expected.append(p)
+            assert indexed_grid.query_segment(x, z, ndx, ndz, 80.0, 3.75) == expected
+
+
+def _run_match(linear_scan_max, ticks=200):
+    original = SpatialGrid.linear_scan_max
+    SpatialGrid.linear_scan_max = linear_scan_max
+    try:
+        random.seed(3)
+        room = GameRoom("equivalence")
+        room.rng.seed(3)
+        classes = ("vanguard", "dreadnought", "leviathan")
+        for i in range(30):
+            room.add_player(f"p{i}", f"p{i}", None, classes[i % 3])
+        rng = random.Random(5)
+        for tick in range(ticks):
+            for pid in list(room.players):
+                roll = rng.random()
+                if roll < 0.1:
+                    room.queue_message(pid, {"type": "move", "x": rng.uniform(-300, 300), "z": rng.uniform(-300, 300)})
+                elif roll < 0.15:
+                    room.queue_message(pid, {"type": "fire_start", "x": rng.uniform(-300, 300), "z": rng.uniform(-300, 300)})
+                elif roll < 0.2:
+                    room.queue_message(pid, {"type": "ability", "id": rng.choice("qwer"),
+                                             "x": rng.uniform(-300, 300), "z": rng.uniform(-300, 300)})
+            room._process_inputs()
+            room._update(TICK_INTERVAL)
+        mutalisks = [(m.owner_id, m.x, m.z, m.health) for m in room.mutalisks]
+        missiles = [(m.owner_id, m.x, m.z, m.target_id) for m in room.missiles]
+        return [p.to_dict() for p in room.players.values()], mutalisks, missiles
+    finally:
+        SpatialGrid.linear_scan_max = original
+
+
+class TestGridRoomEquivalence:
+    """A whole match must play out identically with and without the index"""
+
+    def test_room_simulation_identical(self):
+        assert _run_match(0) == _run_match(float('inf'))
+        print("SUCCESS: indexed and full-scan rooms produced identical state")
@@ -0,0 +1,140 @@
+"""
+Tests for spectator relays: one encoded state per snapshot, fanned out to every viewer
+"""
+
+import asyncio
+import json
+import random
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, RoomManager  # noqa: E402
+from spectators import SpectatorRelay, relay_id  # noqa: E402
+from fakes import FakeWebSocket  # noqa: E402
+
+
+class BrokenWebSocket(FakeWebSocket):
+    async def send_text(self, text):
+        raise ConnectionError("gone")
+
+
+def brawl_room():
+    room = GameRoom("watched", seed=3)
+    classes = ("vanguard", "dreadnought", "leviathan")
+    for i in range(6):
+        p = room.add_player(f"p{i}", f"P{i}", FakeWebSocket(), classes[i % 3])
+        p.x = (i - 3) * 8.0
+    room.enable_binary("p0")
+    return room
+
+
+async def play(room, snapshots, rng):
+    for _ in range(snapshots):
+        for player_id in room.players:
+            x, z = rng.uniform(-30, 30), rng.uniform(-30, 30)
+            if rng.random() < 0.2:
+                room.queue_message(player_id, {"type": "ability", "id": rng.choice("qwer"), "x": x, "z": z})
+            else:
+                room.queue_message(player_id, {"type": "fire_start", "x": x, "z": z})
+        for _ in range(room.ticks_per_snapshot):
+            room._simulate_tick()
+        room._broadcast_state()
+        await room.flush()
+
+
+def watch(viewers, snapshots=20, delay=0.0):
+    """Play a room with ``viewers`` spectators; returns the room, the relay
+    and the viewers' websockets."""
+    async def run():
+        room = brawl_room()
+        relay = SpectatorRelay(rate=10.0, delay=delay, metrics=room.metrics)
+        sockets = [FakeWebSocket() for _ in range(viewers)]
+        for i, ws in enumerate(sockets):
+            relay.add(f"v{i}", ws)
+        room.add_relay(relay_id(room.id), relay, relay.rate)
+        await play(room, snapshots, random.Random(5))
+        return room, relay, sockets
+
+    return asyncio.run(run())
+
+
+class TestSpectatorRelay:
+    """Spectators cost the room one connection, however many there are"""
+
+    def test_room_work_independent_of_viewers(self):
+        room_one, _, one = watch(1)
+        room_many, _, many = watch(500)
+        # The relay is the room's only extra connection and writer
+        assert relay_id("watched") in room_many._writers and len(room_many._writers) == 7
+        assert room_one.metrics.snapshot_bytes == room_many.metrics.snapshot_bytes
+        # Every viewer got the very same encoded messages
+        assert len(many[0].sent) == 11
+        assert all(ws.sent == one[0].sent for ws in many)
+        assert all(a is b for ws in many for a, b in zip(ws.sent, many[0].sent))
+        print(f"SUCCESS: 500 viewers share the {len(one[0].sent)} states encoded for one")
+
+    def test_lower_rate_keeps_effects(self):
+        room, relay, sockets = watch(3)
+        states = [json.loads(m) for m in sockets[0].sent]
+        assert all(s["type"] == "state" for s in states)
+        # The first snapshot, then every other one, on the room's ticks
+        period = 2 * room.ticks_per_snapshot
+        ticks = [s["tick"] for s in states]
+        assert ticks == [room.ticks_per_snapshot] + list(range(period, 20 * room.ticks_per_snapshot + 1, period))
+        assert {p["id"] for p in states[-1]["players"]} == set(room.players)
+        # A player at the full rate and the spectators saw the same effects
+        full = [e for m in room.connections["p1"].sent for e in json.loads(m)["effects"]]
+        watched = [e for s in states for e in s["effects"]]
+        assert watched == full and watched
+        print(f"SUCCESS: {len(states)} spectator states at half rate carry all {len(watched)} effects")
+
+    def test_delay(self):
+        async def run():
+            room = brawl_room()
+            relay = SpectatorRelay(rate=20.0, delay=0.1)
+            ws = FakeWebSocket()
+            relay.add("v", ws)
+            room.add_relay(relay_id(room.id), relay, relay.rate)
+            room._simulate_tick()
+            room._broadcast_state()
+            await asyncio.sleep(0.05)
+            held = len(ws.sent)
+            await room.flush()
+            return held, ws.sent
+
+        held, sent = asyncio.run(run())
+        assert held == 0 and len(sent) == 1
+        print("SUCCESS: spectator states are held back by the relay's delay")
+
+    def test_viewer_leaves(self):
+        async def run():
+            room = brawl_room()
+            relay = SpectatorRelay(rate=20.0)
+            relay.add("gone", BrokenWebSocket())
+            ws = FakeWebSocket()
+            relay.add("v", ws)
+            room.add_relay(relay_id(room.id), relay, relay.rate)
+            await play(room, 3, random.Random(1))
+            return room, relay, ws
+
+        room, relay, ws = asyncio.run(run())
+        assert list(relay.viewers) == ["v"] and len(ws.sent) == 3
+        assert relay_id("watched") in room.relays()
+        print("SUCCESS: a failed viewer is dropped without touching the room")
+
+    def test_room_kept_for_spectators(self):
+        async def run():
+            manager = RoomManager()
+            room = manager.get_or_create_room("watched")
+            room.add_player("p", "P", FakeWebSocket())
+            room.add_relay(relay_id("watched"), SpectatorRelay(), 10.0)
+            room.remove_player("p")
+            manager.remove_empty_rooms()
+            kept = "watched" in manager.rooms
+            room.remove_relay(relay_id("watched"))
+            manager.remove_empty_rooms()
+            return kept, "watched" in manager.rooms
+
+        assert asyncio.run(run()) == (True, False)
+        print("SUCCESS: an empty room keeps running while it has spectators")
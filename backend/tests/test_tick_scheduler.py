@@ -0,0 +1,208 @@
+"""
+Tests for the deadline-based game loop scheduler
+"""
+
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import GameRoom, MAX_CATCHUP_TICKS, RoomManager, TICK_INTERVAL  # noqa: E402
+from scheduler import TickScheduler  # noqa: E402
+import metrics  # noqa: E402
+
+
+def make_room(start=100.0):
+    room = GameRoom("sched")
+    room.add_player("a", "A", None, "vanguard")
+    room._next_tick_at = start
+    return room
+
+
+class TestRunDueTicks:
+    """Ticks follow absolute deadlines on the loop clock"""
+
+    def test_on_time_wakeups_step_once(self):
+        room = make_room()
+        for i in range(10):
+            assert room._run_due_ticks(100.0 + i * TICK_INTERVAL) == 1
+        assert room.tick == 10
+        assert room.tick_stats.missed_ticks == 0
+        assert room.tick_stats.skipped_broadcasts == 0
+        print("SUCCESS: on-time wakeups run one step each")
+
+    def test_early_wakeup_does_nothing(self):
+        room = make_room()
+        assert room._run_due_ticks(99.99) == 0
+        assert room.tick == 0
+        assert room.tick_stats.wakeups == 0
+        print("SUCCESS: early wakeup is a no-op")
+
+    def test_overshoot_does_not_accumulate(self):
+        room = make_room()
+        # Every sleep overshoots by 40% of a tick; the deadlines stay put
+        now = 100.0
+        for _ in range(100):
+            room._run_due_ticks(now)
+            now = room._next_tick_at + TICK_INTERVAL * 0.4
+        assert room.tick == 100
+        assert abs(room._next_tick_at - (100.0 + 100 * TICK_INTERVAL)) < 1e-9
+        assert abs(room.tick_stats.last_lateness - TICK_INTERVAL * 0.4) < 1e-9
+        print("SUCCESS: sleep overshoot does not drift the tick rate")
+
+    def test_catch_up_skips_broadcasts_not_simulation(self):
+        room = make_room()
+        steps = room._run_due_ticks(100.0 + 3.5 * TICK_INTERVAL)
+        assert steps == 4
+        assert room.tick == 4
+        assert room.tick_stats.catchup_ticks == 3
+        assert room.tick_stats.skipped_broadcasts == 3
+        assert room.tick_stats.missed_ticks == 0
+        assert abs(room._next_tick_at - (100.0 + 4 * TICK_INTERVAL)) < 1e-9
+        print("SUCCESS: late loop catches up without extra broadcasts")
+
+    def test_catch_up_is_bounded(self):
+        room = make_room()
+        now = 100.0 + 12.5 * TICK_INTERVAL
+        steps = room._run_due_ticks(now)
+        assert steps == MAX_CATCHUP_TICKS
+        assert room.tick == MAX_CATCHUP_TICKS
+        assert room.tick_stats.missed_ticks == 13 - MAX_CATCHUP_TICKS
+        # The schedule resumes at the next deadline after now
+        assert now < room._next_tick_at <= now + TICK_INTERVAL
+        assert room.tick_stats.max_lateness > 12 * TICK_INTERVAL
+        print("SUCCESS: backlog beyond the catch-up budget is dropped and counted")
+
+    def test_jitter_tracks_lateness_variation(self):
+        steady = make_room()
+        noisy = make_room()
+        for i in range(50):
+            steady._run_due_ticks(steady._next_tick_at + 0.002)
+            noisy._run_due_ticks(noisy._next_tick_at + (0.010 if i % 2 else 0.0))
+        assert steady.tick_stats.jitter < 1e-9
+        assert noisy.tick_stats.jitter > 0.005
+        print("SUCCESS: jitter reflects lateness variation")
+
+
+class TestGameLoop:
+    """The asyncio loop keeps the nominal rate"""
+
+    def test_loop_rate(self):
+        async def run():
+            room = GameRoom("loop")
+            room.add_player("a", "A", None, "vanguard")
+            room.start()
+            await asyncio.sleep(TICK_INTERVAL * 20.5)
+            room.stop()
+            return room
+
+        room = asyncio.run(run())
+        assert 19 <= room.tick <= 22
+        assert room.tick_stats.to_dict()["ticks"] == room.tick
+        print(f"SUCCESS: loop ran {room.tick} ticks, stats {room.tick_stats.to_dict()}")
+
+
+class SlowRoom(GameRoom):
+    """A room whose every tick burns ``cost`` seconds of CPU."""
+
+    cost = 0.002
+
+    def _simulate_tick(self):
+        super()._simulate_tick()
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+
+
+def busy_rooms(budget, count=20, seconds=1.0):
+    """Run ``count`` slow rooms on one scheduler while a probe measures how
+    late the event loop gets to a 1 ms timer. Returns the rooms and the
+    probe's worst lateness."""
+    async def run():
+        loop = asyncio.get_running_loop()
+        scheduler = TickScheduler(budget)
+        rooms = [SlowRoom(f"r{i}", hibernate_after=0) for i in range(count)]
+        for room in rooms:
+            room.add_player("a", "A", None, "vanguard")
+            room.start(scheduler)
+        worst = 0.0
+        start = loop.time()
+        end = start + seconds
+        while loop.time() < end:
+            due = loop.time() + 0.001
+            await asyncio.sleep(0.001)
+            worst = max(worst, loop.time() - due)
+        busy = sum(room.tick for room in rooms) * SlowRoom.cost / (loop.time() - start)
+        for room in rooms:
+            room.stop()
+        return rooms, worst, busy
+
+    return asyncio.run(run())
+
+
+class TestTickScheduler:
+    """One scheduler task runs every room of a process"""
+
+    def test_phases_spread_evenly(self):
+        async def run():
+            scheduler = TickScheduler()
+            rooms = [GameRoom(f"r{i}") for i in range(8)]
+            for room in rooms:
+                room.start(scheduler)
+            phases = sorted(round(scheduler.phase(r) / TICK_INTERVAL, 6) for r in rooms)
+            # A leaver's phase is the widest gap, so the next room takes it
+            left = scheduler.phase(rooms[3])
+            rooms[3].stop()
+            newcomer = GameRoom("new")
+            newcomer.start(scheduler)
+            refilled = scheduler.phase(newcomer)
+            deadlines = sorted((r._next_tick_at - rooms[0]._next_tick_at) % TICK_INTERVAL for r in rooms)
+            for room in rooms + [newcomer]:
+                room.stop()
+            return phases, left, refilled, deadlines
+
+        phases, left, refilled, deadlines = asyncio.run(run())
+        assert phases == [i / 8 for i in range(8)]
+        assert refilled == left
+        assert all(abs(d - i * TICK_INTERVAL / 8) < 1e-9 for i, d in enumerate(deadlines))
+        print(f"SUCCESS: 8 rooms tick {TICK_INTERVAL / 8 * 1000:.2f} ms apart")
+
+    def test_one_task_for_all_rooms(self):
+        async def run():
+            baseline = len(asyncio.all_tasks())
+            manager = RoomManager(hibernate_after=0)
+            for i in range(50):
+                manager.get_or_create_room(f"r{i}").add_player("a", "A", None, "vanguard")
+            tasks = len(asyncio.all_tasks()) - baseline
+            await asyncio.sleep(TICK_INTERVAL * 10.5)
+            rooms = list(manager.rooms.values())
+            for room in rooms:
+                room.stop()
+            return tasks, rooms, manager
+
+        tasks, rooms, manager = asyncio.run(run())
+        assert tasks == 1
+        assert all(9 <= room.tick <= 12 for room in rooms)
+        text = metrics.render(manager.metric_series())
+        assert 'starbattle_room_last_lateness_seconds{room="r7"}' in text
+        assert 'starbattle_room_deferred_wakeups_total{room="r7"} 0' in text
+        assert all(room.summary()["tickStats"]["deferredWakeups"] == 0 for room in rooms)
+        print(f"SUCCESS: 50 rooms ticked by one task, {min(r.tick for r in rooms)}+ ticks each")
+
+    def test_budget_keeps_event_loop_responsive(self):
+        # Twenty rooms at 2 ms a tick want 40 ms of every 50 ms interval
+        unbounded, _, unbounded_busy = busy_rooms(budget=float("inf"))
+        bounded, lag, busy = busy_rooms(budget=0.3)
+        assert sum(r.tick_stats.deferred_wakeups for r in unbounded) == 0
+        assert sum(r.tick_stats.deferred_wakeups for r in bounded) > 0
+        assert unbounded_busy > 0.6
+        assert busy < 0.35
+        # A timer falling due waits for at most the wakeup in progress and
+        # the one queued before it, catch-up ticks included
+        assert lag < 2 * MAX_CATCHUP_TICKS * SlowRoom.cost + 0.01
+        # Deferred rooms are served oldest deadline first, so in turn
+        wakeups = [r.tick_stats.wakeups for r in bounded]
+        assert min(wakeups) > 0 and max(wakeups) - min(wakeups) <= 1
+        print(f"SUCCESS: rooms busy {busy:.0%} of the time under a 30% budget ({unbounded_busy:.0%} without), "
+              f"loop lag at most {lag * 1000:.1f} ms")
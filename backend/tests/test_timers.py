@@ -0,0 +1,98 @@
+"""
+Tests for deadline-based cooldowns and lazily evaluated resource regen
+Client-visible values must match the old per-tick countdowns
+"""
+
+import math
+import sys
+
+sys.path.insert(0, '/app/backend')
+
+from game_engine import (  # noqa: E402
+    GameRoom, TICK_INTERVAL, WARP_COOLDOWN, WARP_ENERGY_COST, ENERGY_REGEN_RATE,
+    LASER_ENERGY_COST, SHIELD_REGEN_DELAY, SHIELD_REGEN_RATE, BIO_STASIS_DURATION,
+)
+
+
+def _room_with(*classes):
+    room = GameRoom("timers")
+    players = [room.add_player(f"p{i}", f"p{i}", None, cls) for i, cls in enumerate(classes)]
+    for i, p in enumerate(players):
+        p.x, p.z = i * 20.0, 0.0
+    return room, players
+
+
+def _tick(room, n=1):
+    for _ in range(n):
+        room._process_inputs()
+        room._update(TICK_INTERVAL)
+
+
+class TestCooldownDeadlines:
+    """Cooldowns are deadlines but still read as remaining seconds"""
+
+    def test_countdown_matches_per_tick_decrement(self):
+        room, (vanguard,) = _room_with("vanguard")
+        room.queue_message(vanguard.id, {"type": "ability", "id": "q"})
+        for tick in range(70):
+            _tick(room)
+            # Cast during input processing, then one dt elapses per tick
+            exact = max(0.0, WARP_COOLDOWN - (tick + 1) * TICK_INTERVAL)
+            assert abs(vanguard.warp_cooldown - exact) < 1e-9, tick
+            # Only exact .x5 ties may round differently from the old countdown
+            assert abs(vanguard.to_dict()["warpCooldown"] - exact) <= 0.05 + 1e-9, tick
+        assert vanguard.warp_cooldown == 0
+
+    def test_energy_regen_is_closed_form(self):
+        room, (vanguard,) = _room_with("vanguard")
+        room._use_warp(vanguard)
+        assert vanguard.energy == vanguard.max_energy - WARP_ENERGY_COST
+        _tick(room, 20)
+        assert abs(vanguard.energy - (vanguard.max_energy - WARP_ENERGY_COST + ENERGY_REGEN_RATE * 1.0)) < 1e-9
+        _tick(room, 200)
+        assert vanguard.energy == vanguard.max_energy
+
+    def test_laser_drains_and_stops_at_zero(self):
+        room, (vanguard, _) = _room_with("vanguard", "vanguard")
+        room.queue_message(vanguard.id, {"type": "fire_start", "x": 500.0, "z": 500.0})
+        ticks_to_empty = math.ceil(vanguard.max_energy / (LASER_ENERGY_COST * TICK_INTERVAL))
+        _tick(room, ticks_to_empty - 1)
+        assert vanguard.is_firing
+        _tick(room, 1)
+        assert not vanguard.is_firing
+        assert vanguard.energy == 0.0
+
+
+class TestShieldRegen:
+    """Broken shields wait SHIELD_REGEN_DELAY, then regenerate"""
+
+    def test_broken_shields_delay_then_regen(self):
+        room, (victim,) = _room_with("vanguard")
+        room._apply_damage(victim, victim.max_shields)
+        assert victim.shields == 0 and victim.shield_broken
+        _tick(room, round(SHIELD_REGEN_DELAY / TICK_INTERVAL))
+        assert victim.shields == 0
+        _tick(room, 10)
+        assert not victim.shield_broken
+        assert abs(victim.shields - SHIELD_REGEN_RATE * 10 * TICK_INTERVAL) < 1e-9
+
+
+class TestStunFreezesTimers:
+    """Bio-Stasis freezes the target's cooldowns and regen, as before"""
+
+    def test_stun_pauses_cooldowns(self):
+        room, (leviathan, vanguard) = _room_with("leviathan", "vanguard")
+        room._use_warp(vanguard)
+        _tick(room, 10)
+        before = vanguard.to_dict()
+        before["stunTimer"] = 0.0
+        room._use_bio_stasis(leviathan)
+        stunned_ticks = 0
+        while vanguard.stun_timer > 0:
+            _tick(room)
+            stunned_ticks += 1
+        assert stunned_ticks >= round(BIO_STASIS_DURATION / TICK_INTERVAL)
+        assert vanguard.to_dict() == before
+        _tick(room, 1)
+        assert abs(vanguard.warp_cooldown - (WARP_COOLDOWN - 11 * TICK_INTERVAL)) < 1e-9
+        print("SUCCESS: stun froze cooldowns and regeneration")
@@ -0,0 +1,139 @@
+// Decoder for binary state frames (backend/binary_codec.py).
+//
+// Frames carry fixed little-endian records per entity type; player ids are
+// small net ids resolved through the latest `roster` text message.
+
+const FORMAT_VERSION = 1;
+const HEADER_SIZE = 22;
+const RECORD_SIZE = 12;
+const FLAG_ALIVE = 1;
+const FLAG_FIRING = 2;
+const FLAG_CHANNELING = 4;
+const SHIP_CLASSES = ['vanguard', 'dreadnought', 'leviathan'];
+const TIMER_SCALE = 100;
+const AMOUNT_SCALE = 10;
+const VELOCITY_SCALE = 1000;
+const ROTATION_SCALE = 65536 / (2 * Math.PI);
+
+const round = (value, digits) => {
+  const f = 10 ** digits;
+  return Math.round(value * f) / f;
+};
+
+export function createBinaryDecoder(arenaSize) {
+  const positionScale = 0xffff / (2 * arenaSize);
+  const pos = q => round(q / positionScale - arenaSize, 2);
+  let roster = null;
+  let entries = new Map();
+
+  // Unknown net ids (NO_PLAYER, or a player who left) resolve to null
+  const ref = netId => (entries.has(netId) ? entries.get(netId)[0] : null);
+
+  function setRoster(msg) {
+    roster = msg;
+    entries = new Map(msg.players.map(([netId, id, name]) => [netId, [id, name]]));
+  }
+
+  // Returns the state message, or null when the frame needs a roster
+  // this decoder has not seen.
+  function decode(buffer) {
+    const view = new DataView(buffer);
+    const version = view.getUint8(0);
+    if (version !== FORMAT_VERSION) {
+      throw new Error(`Unsupported binary snapshot version ${version}`);
+    }
+    if (!roster || view.getUint16(6, true) !== roster.version) return null;
+    const tick = view.getUint32(2, true);
+    const counts = [8, 10, 12, 14, 16].map(o => view.getUint16(o, true));
+    const effectsLength = view.getUint32(18, true);
+    let offset = HEADER_SIZE;
+    const u16 = () => {
+      const v = view.getUint16(offset, true);
+      offset += 2;
+      return v;
+    };
+
+    const players = [];
+    for (let i = 0; i < counts[0]; i++) {
+      const [id, name] = entries.get(view.getUint16(offset, true)) || [null, null];
+      const shipClass = SHIP_CLASSES[view.getUint8(offset + 2)];
+      const flags = view.getUint8(offset + 3);
+      offset += 4;
+      const x = pos(u16());
+      const z = pos(u16());
+      const rotation = round(u16() / ROTATION_SCALE, 3);
+      const vx = view.getInt16(offset, true) / VELOCITY_SCALE;
+      const vz = view.getInt16(offset + 2, true) / VELOCITY_SCALE;
+      offset += 4;
+      const p = {
+        id, name, shipClass, x, z, rotation, vx, vz,
+        hull: u16() / AMOUNT_SCALE,
+        maxHull: u16() / AMOUNT_SCALE,
+        shields: u16() / AMOUNT_SCALE,
+        maxShields: u16() / AMOUNT_SCALE,
+        energy: u16() / AMOUNT_SCALE,
+        maxEnergy: u16() / AMOUNT_SCALE,
+        alive: (flags & FLAG_ALIVE) !== 0,
+        isFiring: (flags & FLAG_FIRING) !== 0,
+        fireTargetX: pos(u16()),
+        fireTargetZ: pos(u16()),
+        respawnTimer: u16() / TIMER_SCALE,
+        kills: u16(),
+        deaths: u16(),
+        stunTimer: u16() / TIMER_SCALE,
+        slowTimer: u16() / TIMER_SCALE,
+        armorDebuffTimer: u16() / TIMER_SCALE,
+      };
+      if (shipClass === 'vanguard') {
+        p.warpCooldown = u16() / TIMER_SCALE;
+        p.missileCooldown = u16() / TIMER_SCALE;
+      } else if (shipClass === 'dreadnought') {
+        p.emergencyShieldsCd = u16() / TIMER_SCALE;
+        p.yamatoCd = u16() / TIMER_SCALE;
+        p.repairBotsCd = u16() / TIMER_SCALE;
+        p.bombardmentCd = u16() / TIMER_SCALE;
+        p.isChanneling = (flags & FLAG_CHANNELING) !== 0;
+        p.channelTimer = u16() / TIMER_SCALE;
+        p.channelTargetId = ref(u16());
+        p.repairBotsTimer = u16() / TIMER_SCALE;
+      } else {
+        p.bioStasisCd = u16() / TIMER_SCALE;
+        p.sporeCloudCd = u16() / TIMER_SCALE;
+        p.mutaliskCd = u16() / TIMER_SCALE;
+        p.bileSwellCd = u16() / TIMER_SCALE;
+        p.bioRegenTimer = u16() / TIMER_SCALE;
+      }
+      players.push(p);
+    }
+
+    // Missiles, zones and mutalisks share a 12-byte layout:
+    // u32 id, u16 x, u16 z, then two type-specific u16s
+    const records = (count, build) => {
+      const out = [];
+      for (let i = 0; i < count; i++) {
+        const id = String(view.getUint32(offset, true));
+        const x = pos(view.getUint16(offset + 4, true));
+        const z = pos(view.getUint16(offset + 6, true));
+        out.push(build(id, x, z, view.getUint16(offset + 8, true), view.getUint16(offset + 10, true)));
+        offset += RECORD_SIZE;
+      }
+      return out;
+    };
+    const zone = (id, x, z, radius, timer) => ({ id, x, z, radius: radius / AMOUNT_SCALE, timer: timer / TIMER_SCALE });
+
+    const missiles = records(counts[1], (id, x, z, owner, target) => ({
+      id, x, z, ownerId: ref(owner), targetId: ref(target),
+    }));
+    const bombardments = records(counts[2], zone);
+    const sporeClouds = records(counts[3], zone);
+    const mutalisks = records(counts[4], (id, x, z, owner, health) => ({
+      id, x, z, ownerId: ref(owner), health: health / AMOUNT_SCALE,
+    }));
+    const effects = effectsLength
+      ? JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, offset, effectsLength)))
+      : [];
+    return { type: 'state', tick, players, missiles, bombardments, sporeClouds, mutalisks, effects };
+  }
+
+  return { setRoster, decode };
+}
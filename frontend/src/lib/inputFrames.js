@@ -0,0 +1,86 @@
+// Encoder for batched input frames (backend/input_frames.py).
+//
+// Everything sent during a render frame goes out as one binary frame: an
+// 8-byte header (sequence number, acked snapshot tick or 0) and a 12-byte
+// record per command (op, ability key, flags, a pad byte, x and z as
+// float32), all little-endian. Abilities sent without coordinates leave
+// the TARGETED flag clear, so the server casts them at the ship. Moves and
+// aims only set a target, so a newer one replaces the pending one unless a
+// press came in between, as the server does within a tick. The ack also
+// tells the server which snapshot we were looking at when we aimed, so hits
+// are judged against it.
+
+const HEADER_SIZE = 8;
+const COMMAND_SIZE = 12;
+const OPS = { move: 1, fire_start: 2, fire_stop: 3, fire_aim: 4, ability: 5 };
+const TARGETED = 1;
+const COALESCED = ['move', 'fire_aim'];
+const AIM_BARRIERS = ['fire_start', 'fire_stop'];
+
+export function encodeInputFrame(seq, ack, commands) {
+  const buffer = new ArrayBuffer(HEADER_SIZE + COMMAND_SIZE * commands.length);
+  const view = new DataView(buffer);
+  view.setUint32(0, seq, true);
+  view.setUint32(4, ack || 0, true);
+  commands.forEach((msg, i) => {
+    const offset = HEADER_SIZE + COMMAND_SIZE * i;
+    view.setUint8(offset, OPS[msg.type]);
+    view.setUint8(offset + 1, msg.type === 'ability' ? msg.id.charCodeAt(0) : 0);
+    view.setUint8(offset + 2, msg.x !== undefined ? TARGETED : 0);
+    view.setFloat32(offset + 4, msg.x || 0, true);
+    view.setFloat32(offset + 8, msg.z || 0, true);
+  });
+  return buffer;
+}
+
+// Collects commands and the latest ack, and hands `send` one frame per
+// animation frame in which there was anything to send.
+export function createInputBatcher(send) {
+  let seq = 0;
+  let ack = 0;
+  let commands = [];
+  let slots = {};
+  let scheduled = false;
+
+  const flush = () => {
+    scheduled = false;
+    if (commands.length === 0 && !ack) return;
+    seq += 1;
+    send(encodeInputFrame(seq, ack, commands));
+    ack = 0;
+    commands = [];
+    slots = {};
+  };
+
+  const schedule = () => {
+    if (!scheduled) {
+      scheduled = true;
+      requestAnimationFrame(flush);
+    }
+  };
+
+  return {
+    push(msg) {
+      if (!(msg.type in OPS)) return;
+      if (COALESCED.includes(msg.type)) {
+        const slot = slots[msg.type];
+        if (slot !== undefined) {
+          commands[slot] = msg;
+          return;
+        }
+        slots[msg.type] = commands.length;
+      } else if (AIM_BARRIERS.includes(msg.type)) {
+        delete slots.fire_aim;
+      } else {
+        slots = {};
+      }
+      commands.push(msg);
+      schedule();
+    },
+    ack(tick) {
+      ack = tick;
+      schedule();
+    },
+    flush,
+  };
+}
@@ -0,0 +1,36 @@
+// Inflater for `compress=deflate` connections (backend/compression.py).
+//
+// Once the server has said so in `init`, every message arrives as a binary
+// frame: a 5-byte header (kind, uncompressed length) and the message as
+// the next piece of one raw deflate stream, flushed at the end of each
+// message. Frames must be inflated in the order they arrived.
+
+const HEADER_SIZE = 5;
+const TEXT = 0;
+
+export const supportsDeflate = typeof DecompressionStream !== 'undefined';
+
+// Returns an async function from a frame to its message: a string for text
+// messages, an ArrayBuffer for binary ones.
+export function createInflater() {
+  const stream = new DecompressionStream('deflate-raw');
+  const writer = stream.writable.getWriter();
+  const reader = stream.readable.getReader();
+  const text = new TextDecoder();
+
+  return async (frame) => {
+    const view = new DataView(frame);
+    const kind = view.getUint8(0);
+    const size = view.getUint32(1, true);
+    writer.write(new Uint8Array(frame, HEADER_SIZE));
+    const out = new Uint8Array(size);
+    let received = 0;
+    while (received < size) {
+      const { value, done } = await reader.read();
+      if (done) throw new Error('deflate stream ended');
+      out.set(value, received);
+      received += value.length;
+    }
+    return kind === TEXT ? text.decode(out) : out.buffer;
+  };
+}
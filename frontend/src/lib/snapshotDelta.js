@@ -0,0 +1,54 @@
+// Decoder for delta-compressed state messages (backend/delta.py).
+//
+// A delta names the baseline tick it was encoded against. For every entity
+// collection it carries `u` (new entities in full, or the changed fields
+// plus `id` of existing ones), `r` (removed ids) and `o` (the id order,
+// only when it is not "baseline order minus removed, then new").
+
+export const COLLECTIONS = ['players', 'missiles', 'bombardments', 'sporeClouds', 'mutalisks'];
+
+// Reconstructed states kept as baselines; the server keeps 40
+const HISTORY_SIZE = 64;
+
+export function applyDelta(base, msg) {
+  const state = { type: 'state', tick: msg.tick };
+  for (const key of COLLECTIONS) {
+    const diff = msg[key];
+    if (!diff) {
+      state[key] = base[key];
+      continue;
+    }
+    const byId = new Map(base[key].map(e => [e.id, e]));
+    for (const id of diff.r || []) {
+      byId.delete(id);
+    }
+    for (const update of diff.u || []) {
+      const entity = byId.get(update.id);
+      byId.set(update.id, entity ? { ...entity, ...update } : update);
+    }
+    state[key] = diff.o ? diff.o.map(id => byId.get(id)) : Array.from(byId.values());
+  }
+  state.effects = msg.effects;
+  return state;
+}
+
+// Turns `state` and `delta` messages into full states. Returns null for a
+// delta whose baseline is unknown; the server falls back to a full state
+// once acks stop referencing it.
+export function createSnapshotDecoder() {
+  const history = new Map();
+
+  return function decode(msg) {
+    let state = msg;
+    if (msg.type === 'delta') {
+      const base = history.get(msg.base);
+      if (!base) return null;
+      state = applyDelta(base, msg);
+    }
+    history.set(state.tick, state);
+    if (history.size > HISTORY_SIZE) {
+      history.delete(history.keys().next().value);
+    }
+    return state;
+  };
+}
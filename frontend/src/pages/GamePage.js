@@ -4,9 +4,28 @@ import GameCanvas from '@/components/game/GameCanvas';
 import HUD from '@/components/game/HUD';
 import KillFeed from '@/components/game/KillFeed';
 import Minimap from '@/components/game/Minimap';
+import { createBinaryDecoder } from '@/lib/binarySnapshot';
+import { createInputBatcher } from '@/lib/inputFrames';
+import { createInflater, supportsDeflate } from '@/lib/snapshotCompression';
+import { createSnapshotDecoder } from '@/lib/snapshotDelta';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const WS_URL = BACKEND_URL.replace(/^http/, 'ws');
+// 'binary' frames, or 'json' (delta-compressed) as the fallback
+const SNAPSHOT_CODEC = process.env.REACT_APP_SNAPSHOT_CODEC || 'binary';
+const CODEC_QUERY = SNAPSHOT_CODEC === 'binary' ? 'codec=binary' : 'delta=1';
+// Snapshots per second to ask for, below the room's rate (e.g. on mobile);
+// effects in between are still all delivered
+const SEND_RATE = process.env.REACT_APP_SNAPSHOT_RATE;
+// Set to 'deflate' to have frames compressed, where the server does not
+// already deflate them at the transport level
+const COMPRESSION = supportsDeflate && process.env.REACT_APP_SNAPSHOT_COMPRESSION === 'deflate';
+const STREAM_QUERY = CODEC_QUERY
+  // Snapshots only carry what is near the ship; the radar gets a coarse
+  // list of every ship a couple of times a second
+  + '&interest=1'
+  + (SEND_RATE ? `&rate=${SEND_RATE}` : '')
+  + (COMPRESSION ? '&compress=deflate' : '');
 
 export default function GamePage() {
   const location = useLocation();
@@ -19,7 +38,9 @@ export default function GamePage() {
   const [gameState, setGameState] = useState(null);
   const [arenaSize, setArenaSize] = useState(300);
   const [killEvents, setKillEvents] = useState([]);
+  const [radarPlayers, setRadarPlayers] = useState([]);
   const wsRef = useRef(null);
+  const inputsRef = useRef(null);
 
   useEffect(() => {
     if (!playerName) {
@@ -28,42 +49,102 @@ export default function GamePage() {
     }
 
     const ws = new WebSocket(
-      `${WS_URL}/api/ws/default?name=${encodeURIComponent(playerName)}&ship_class=${shipClass}`
+      `${WS_URL}/api/ws/default?name=${encodeURIComponent(playerName)}&ship_class=${shipClass}&${STREAM_QUERY}`
     );
+    ws.binaryType = 'arraybuffer';
     wsRef.current = ws;
+    // Inputs and acks go out as one frame per animation frame
+    const inputs = createInputBatcher((frame) => {
+      if (ws.readyState === WebSocket.OPEN) ws.send(frame);
+    });
+    inputsRef.current = inputs;
+    const decodeSnapshot = createSnapshotDecoder();
+    // Created on init, which carries the arena size; the roster may come first
+    let binaryDecoder = null;
+    let roster = null;
+
+    const applyEffects = (effects) => {
+      const kills = (effects || []).filter(e => e.type === 'kill');
+      if (kills.length > 0) {
+        setKillEvents(prev => [...kills, ...prev].slice(0, 10));
+      }
+    };
+
+    const applyState = (state) => {
+      setGameState(state);
+      applyEffects(state.effects);
+    };
 
     ws.onopen = () => setConnected(true);
     ws.onclose = () => setConnected(false);
     ws.onerror = () => setConnected(false);
 
-    ws.onmessage = (event) => {
+    // Set on init when the server compresses what follows
+    let inflate = null;
+    let inflating = Promise.resolve();
+
+    const handleMessage = (data) => {
       try {
-        const msg = JSON.parse(event.data);
+        if (data instanceof ArrayBuffer) {
+          const state = binaryDecoder && binaryDecoder.decode(data);
+          if (!state) return;
+          // Acknowledge so shots are judged against this snapshot
+          inputs.ack(state.tick);
+          applyState(state);
+          return;
+        }
+        const msg = JSON.parse(data);
         if (msg.type === 'init') {
+          if (msg.compression === 'deflate') inflate = createInflater();
           setPlayerId(msg.playerId);
           setArenaSize(msg.arenaSize);
-        } else if (msg.type === 'state') {
-          setGameState(msg);
-          const kills = (msg.effects || []).filter(e => e.type === 'kill');
-          if (kills.length > 0) {
-            setKillEvents(prev => [...kills, ...prev].slice(0, 10));
-          }
+          binaryDecoder = createBinaryDecoder(msg.arenaSize);
+          if (roster) binaryDecoder.setRoster(roster);
+        } else if (msg.type === 'minimap') {
+          setRadarPlayers(msg.players.map(([id, x, z]) => ({ id, x, z, alive: true })));
+        } else if (msg.type === 'events') {
+          // Kills and joins from snapshots skipped while we lagged behind
+          applyEffects(msg.effects);
+        } else if (msg.type === 'roster') {
+          roster = msg;
+          if (binaryDecoder) binaryDecoder.setRoster(msg);
+        } else if (msg.type === 'state' || msg.type === 'delta') {
+          const state = decodeSnapshot(msg);
+          if (!state) return;
+          // Acknowledge so the next delta is encoded against this tick
+          inputs.ack(state.tick);
+          applyState(state);
         }
       } catch (err) {
         console.error('WS parse error:', err);
       }
     };
 
+    ws.onmessage = (event) => {
+      if (inflate && event.data instanceof ArrayBuffer) {
+        // Inflation is async; keep frames in the order they arrived
+        inflating = inflating
+          .then(() => inflate(event.data))
+          .then(handleMessage, (err) => console.error('WS inflate error:', err));
+        return;
+      }
+      handleMessage(event.data);
+    };
+
     return () => ws.close();
   }, [playerName, shipClass, navigate]);
 
   const sendMessage = useCallback((msg) => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
-      wsRef.current.send(JSON.stringify(msg));
+      inputsRef.current.push(msg);
     }
   }, []);
 
   const localPlayer = gameState?.players?.find(p => p.id === playerId);
+  // The radar list is coarse; draw our own ship from the live state
+  const minimapPlayers = localPlayer
+    ? [...radarPlayers.filter(p => p.id !== playerId), localPlayer]
+    : radarPlayers;
 
   return (
     <div className="game-container" data-testid="game-page">
@@ -75,7 +156,7 @@ export default function GamePage() {
       />
       {localPlayer && <HUD player={localPlayer} />}
       <Minimap
-        players={gameState?.players || []}
+        players={minimapPlayers}
         localPlayerId={playerId}
         arenaSize={arenaSize}
       />